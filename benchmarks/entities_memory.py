@@ -0,0 +1,76 @@
+'''
+    Benchmark of entity memory usage.
+
+    Compares per-instance memory of ``__slots__`` based Content Block
+    and Content Binding entities with equivalent ``__dict__`` based
+    classes, as entities were defined before, measured with
+    ``tracemalloc`` over many instances.
+
+    Usage: python benchmarks/entities_memory.py [instances]
+
+    Run it from the repository root with cabby installed or
+    with ``PYTHONPATH=.``
+'''
+import sys
+import tracemalloc
+from datetime import datetime
+
+from cabby import entities
+
+
+class DictContentBinding(object):
+    raw = None
+
+    def __init__(self, id, subtypes=None):
+        self.id = id
+        self.subtypes = subtypes or []
+
+
+class DictContentBlock(object):
+    raw = None
+
+    def __init__(self, content, content_binding, timestamp):
+        self.content = content
+        self.binding = content_binding
+        self.timestamp = timestamp
+
+
+def create_blocks(block_cls, binding_cls, instances):
+    # Content and timestamp are shared, to measure entities only
+    content = b'content'
+    timestamp = datetime(2015, 1, 22)
+    return [
+        block_cls(content, binding_cls('urn:stix.mitre.org:xml:1.1.1'),
+                  timestamp)
+        for _ in range(instances)]
+
+
+def measure(block_cls, binding_cls, instances):
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        blocks = create_blocks(block_cls, binding_cls, instances)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(blocks) == instances
+    return float(after - before) / instances
+
+
+def main(instances=100000):
+    results = {}
+    for name, block_cls, binding_cls in (
+            ('__dict__ entities', DictContentBlock, DictContentBinding),
+            ('__slots__ entities', entities.ContentBlock,
+             entities.ContentBinding)):
+        results[name] = measure(block_cls, binding_cls, instances)
+        print('{:<20} {:.0f} bytes per block with binding'.format(
+            name, results[name]))
+
+    print('Saving: {:.0%}'.format(
+        1 - results['__slots__ entities'] / results['__dict__ entities']))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,105 @@
+'''
+    Benchmark of Poll Response stream parsing.
+
+    Compares the response parser, which only passes Content Block and
+    message elements to Python, with per-element ``local-name()`` XPath
+    dispatch over all parser events, on a Poll Response with deeply
+    nested STIX content.
+
+    Usage: python benchmarks/stream_parser.py [blocks] [depth]
+
+    Run it from the repository root with cabby installed or
+    with ``PYTHONPATH=.``
+'''
+import sys
+import timeit
+
+from lxml import etree
+
+from cabby import dispatcher
+from cabby.constants import XML_11_BINDING
+
+POLL_RESPONSE_START = (
+    '<taxii_11:Poll_Response '
+    'xmlns:taxii_11="http://taxii.mitre.org/messages/taxii_xml_binding-1.1" '
+    'message_id="1" in_response_to="1" collection_name="collection" '
+    'more="false" result_part_number="1">')
+
+CONTENT_BLOCK = '''
+    <taxii_11:Content_Block>
+        <taxii_11:Content_Binding binding_id="urn:stix.mitre.org:xml:1.1.1"/>
+        <taxii_11:Content>{content}</taxii_11:Content>
+        <taxii_11:Timestamp_Label>2015-01-22T15:28:49.947928+00:00</taxii_11:Timestamp_Label>
+    </taxii_11:Content_Block>'''
+
+STIX_PACKAGE = (
+    '<stix:STIX_Package xmlns:stix="http://stix.mitre.org/stix-1" '
+    'xmlns:indicator="http://stix.mitre.org/Indicator-2" '
+    'id="example:package-{index}">{nested}</stix:STIX_Package>')
+
+NESTED_ELEMENT = (
+    '<indicator:Observable id="o{level}"><indicator:Title>title {level}'
+    '</indicator:Title><indicator:Description>description'
+    '</indicator:Description>{nested}</indicator:Observable>')
+
+
+def generate_poll_response(blocks, depth):
+    nested = ''
+    for level in range(depth):
+        nested = NESTED_ELEMENT.format(level=level, nested=nested)
+
+    content_blocks = ''.join(
+        CONTENT_BLOCK.format(
+            content=STIX_PACKAGE.format(index=index, nested=nested))
+        for index in range(blocks))
+
+    return (POLL_RESPONSE_START + content_blocks +
+            '</taxii_11:Poll_Response>').encode('utf-8')
+
+
+def parse_with_xpath_dispatch(body):
+    # Per-element dispatch over all parser events
+    parser = etree.XMLPullParser(events=('start', 'end'))
+    parser.feed(body)
+    parser.close()
+
+    count = 0
+    for action, elem in parser.read_events():
+        if action == 'end':
+            tag = elem.xpath('local-name()')
+            if tag == 'Content_Block':
+                count += 1
+                elem.clear()
+    return count
+
+
+def parse_with_tag_filter(body):
+    # Content Blocks are not converted, to measure dispatch only
+    parser = dispatcher.ResponseParser(
+        {'X-TAXII-Content-Type': XML_11_BINDING}, XML_11_BINDING,
+        content_block_factory=lambda namespace, elem: namespace)
+    objects = parser.feed(body) + parser.close()
+    return len(objects) - 2
+
+
+def main(blocks=1000, depth=20):
+    body = generate_poll_response(blocks, depth)
+
+    assert parse_with_xpath_dispatch(body) == blocks
+    assert parse_with_tag_filter(body) == blocks
+
+    print('Poll Response: {} blocks, nesting depth {}, {:.1f} MB'.format(
+        blocks, depth, len(body) / 1024.0 / 1024))
+
+    results = {}
+    for func in (parse_with_xpath_dispatch, parse_with_tag_filter):
+        results[func] = min(timeit.repeat(
+            lambda: func(body), number=1, repeat=5))
+        print('{:<28} {:.3f}s'.format(func.__name__, results[func]))
+
+    print('Speedup: {:.1f}x'.format(
+        results[parse_with_xpath_dispatch] / results[parse_with_tag_filter]))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -5,6 +5,7 @@ from ._version import __version__  # noqa: used in setup.py
 
 from .client10 import Client10
 from .client11 import Client11
+from .aio import AsyncClient10, AsyncClient11
 
 
 try:
@@ -14,7 +15,8 @@ except ImportError:     # Python 2.7
 
 
 def create_client(host=None, port=None, discovery_path=None, use_https=False,
-                  discovery_url=None, version="1.1", headers=None):
+                  discovery_url=None, version="1.1", headers=None,
+                  pool_connections=None, pool_maxsize=None):
     '''Create a client instance (TAXII version specific).
 
     ``host``, ``port``, ``use_https``, ``discovery_path`` values
@@ -29,11 +31,54 @@ def create_client(host=None, port=None, discovery_path=None, use_https=False,
                                  and use_https.
     :param string version: TAXII version (1.1 or 1.0)
     :param dict headers: additional headers to pass with TAXII messages
+    :param int pool_connections: number of per-host connection pools
+                                 to keep in the client's session
+    :param int pool_maxsize: maximum number of connections kept open
+                             per host
 
     :return: client instance
     :rtype: :py:class:`cabby.client11.Client11` or
             :py:class:`cabby.client10.Client10`
     '''
+    params = _get_client_params(
+        host, port, discovery_path, use_https, discovery_url, headers,
+        pool_connections, pool_maxsize)
+
+    if version == '1.1':
+        return Client11(**params)
+    elif version == '1.0':
+        return Client10(**params)
+    else:
+        raise ValueError("TAXII version %s is not supported" % version)
+
+
+def create_async_client(host=None, port=None, discovery_path=None,
+                        use_https=False, discovery_url=None, version="1.1",
+                        headers=None, pool_connections=None,
+                        pool_maxsize=None):
+    '''Create an asynchronous client instance (TAXII version specific).
+
+    Accepts the same parameters as :py:func:`cabby.create_client`.
+    Requires `aiohttp` package, installed with ``cabby[async]`` extra.
+
+    :return: client instance
+    :rtype: :py:class:`cabby.aio.AsyncClient11` or
+            :py:class:`cabby.aio.AsyncClient10`
+    '''
+    params = _get_client_params(
+        host, port, discovery_path, use_https, discovery_url, headers,
+        pool_connections, pool_maxsize)
+
+    if version == '1.1':
+        return AsyncClient11(**params)
+    elif version == '1.0':
+        return AsyncClient10(**params)
+    else:
+        raise ValueError("TAXII version %s is not supported" % version)
+
+
+def _get_client_params(host, port, discovery_path, use_https, discovery_url,
+                       headers, pool_connections, pool_maxsize):
     if discovery_url:
         parsed = urlparse(discovery_url)
         if not host and parsed.hostname:
@@ -52,9 +97,9 @@ def create_client(host=None, port=None, discovery_path=None, use_https=False,
         discovery_path=discovery_path,
         headers=headers)
 
-    if version == '1.1':
-        return Client11(**params)
-    elif version == '1.0':
-        return Client10(**params)
-    else:
-        raise ValueError("TAXII version %s is not supported" % version)
+    if pool_connections:
+        params['pool_connections'] = pool_connections
+    if pool_maxsize:
+        params['pool_maxsize'] = pool_maxsize
+
+    return params
@@ -1,10 +1,15 @@
 from furl import furl
+import functools
 import logging
+import threading
 
 import libtaxii
 
-from . import dispatcher, utils
-from .converters import to_detailed_service_instance_entity
+from . import concurrency, dispatcher, utils
+from . import constants as const
+from .converters import (
+    get_content_block_parser, to_detailed_service_instance_entity)
+from .entities import ContentBlock, PushStatus
 from .exceptions import (
     AmbiguousServicesError,
     ClientException,
@@ -12,7 +17,6 @@ from .exceptions import (
     ServiceNotFoundError,
     UnsuccessfulStatusError,
 )
-from six.moves import map
 
 
 class AbstractClient(object):
@@ -28,7 +32,10 @@ class AbstractClient(object):
     taxii_version = None
 
     def __init__(self, host=None, discovery_path=None, port=None,
-                 use_https=False, headers=None, timeout=None):
+                 use_https=False, headers=None, timeout=None,
+                 pool_connections=dispatcher.DEFAULT_POOLSIZE,
+                 pool_maxsize=dispatcher.DEFAULT_POOLSIZE,
+                 chunk_size=dispatcher.DEFAULT_CHUNK_SIZE):
 
         self.host = host
         self.port = port
@@ -52,6 +59,29 @@ class AbstractClient(object):
         self.headers = headers or {}
         self.timeout = timeout
 
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+
+        # Size of response body chunks fed to the XML parser
+        self.chunk_size = chunk_size
+
+        # Content Blocks parser, 'libtaxii', 'fast' or 'lazy',
+        # see `converters.CONTENT_BLOCK_PARSERS`
+        self.content_block_parser = 'libtaxii'
+
+        # Attach underlying libtaxii objects to entities as ``raw``
+        self.keep_raw = True
+
+        # Compress request bodies of at least ``compression_threshold``
+        # bytes with gzip. Servers have to accept gzip Content-Encoding
+        self.compress_requests = False
+        self.compression_threshold = dispatcher.DEFAULT_COMPRESSION_THRESHOLD
+
+        self._session = None
+        self._session_params = None
+        # Guards session creation, requests may run in worker threads
+        self._session_lock = threading.Lock()
+
         self.log = logging.getLogger(
             "{}.{}".format(self.__module__, self.__class__.__name__))
 
@@ -134,7 +164,7 @@ class AbstractClient(object):
         Obtain JWT token using provided JWT session,
         url, username and password.
         '''
-        session = session or self.prepare_generic_session()
+        session = session or self._get_session()
         self.jwt_token = dispatcher.obtain_jwt_token(
             session,
             self._prepare_url(self.jwt_url),
@@ -160,14 +190,83 @@ class AbstractClient(object):
             ca_cert=self.ca_cert,
             verify_ssl=self.verify_ssl,
             jwt_token=self.jwt_token,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
         )
 
-    def _execute_request(self, request, uri=None, service_type=None):
+    def _get_session_params(self):
+        return (
+            self.proxies and dict(self.proxies),
+            dict(self.headers),
+            self.username,
+            self.password,
+            self.jwt_url,
+            self.cert_file,
+            self.key_file,
+            self.key_password,
+            self.ca_cert,
+            self.verify_ssl,
+            self.pool_connections,
+            self.pool_maxsize,
+        )
+
+    def _get_session(self):
+        '''
+        Get long-lived session shared by all requests of this client.
+
+        The session keeps a pool of open connections and is only rebuilt
+        when authentication, proxy, TLS or pool settings change.
+        '''
+        params = self._get_session_params()
+
+        session = self._session
+        if session is None or params != self._session_params:
+            with self._session_lock:
+                if (self._session is None
+                        or params != self._session_params):
+                    self._close_session()
+                    self._session = self.prepare_generic_session()
+                    self._session_params = params
+                session = self._session
+
+        if self.jwt_token:
+            dispatcher.set_jwt_token(session, self.jwt_token)
+
+        return session
+
+    def close(self):
+        '''
+        Close the client's HTTP session and release pooled connections.
+
+        The client can still be used afterwards, a new session
+        will be created on the next request.
+        '''
+        with self._session_lock:
+            self._close_session()
+
+    def _close_session(self):
+        if self._session is not None:
+            dispatcher.close_session(self._session)
+
+        self._session = None
+        self._session_params = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _execute_request(self, request, uri=None, service_type=None,
+                         content_block_factory=None, content_blocks=None):
         '''
         Execute generic TAXII request.
 
         A service is defined by ``uri`` parameter or is chosen from pre-cached
-        services by ``service_type``.
+        services by ``service_type``. Content blocks are built with
+        ``content_block_factory`` if provided, or with the client's
+        ``content_block_parser`` otherwise. ``content_blocks`` are streamed
+        as the last children of the request message.
         '''
         if not uri and not service_type:
             raise NoURIProvidedError('URI or service_type needed')
@@ -181,7 +280,11 @@ class AbstractClient(object):
             raise ValueError(
                 'Key file is encrypted but key password was not provided')
 
-        session = self.prepare_generic_session()
+        if content_block_factory is None:
+            content_block_factory = get_content_block_parser(
+                self.content_block_parser, keep_raw=self.keep_raw)
+
+        session = self._get_session()
 
         uses_jwt = self.jwt_url and self.username and self.password
         if uses_jwt and not self.jwt_token:
@@ -194,12 +297,23 @@ class AbstractClient(object):
                 request,
                 taxii_binding=self.taxii_binding,
                 timeout=self.timeout,
+                chunk_size=self.chunk_size,
+                content_block_factory=content_block_factory,
+                content_blocks=content_blocks,
+                compression_threshold=(
+                    self.compression_threshold
+                    if self.compress_requests else None),
             )
 
+        # Content blocks read from an iterator can not be sent again
+        can_retry = content_blocks is None or (
+            iter(content_blocks) is not content_blocks)
+
         try:
             return do_request()
         except UnsuccessfulStatusError as exc:
-            if uses_jwt and exc.status == libtaxii.ST_UNAUTHORIZED:
+            if (uses_jwt and can_retry
+                    and exc.status == libtaxii.ST_UNAUTHORIZED):
                 # An authorization error may indicate JWT token expiry:
                 # transparently try to refresh it, then retry the request.
                 self.refresh_jwt_token(session=session)
@@ -212,7 +326,9 @@ class AbstractClient(object):
 
     def _get_service(self, service_type):
         candidates = self.get_services(service_type=service_type)
+        return self._select_service(candidates, service_type)
 
+    def _select_service(self, candidates, service_type):
         if not candidates:
             raise ServiceNotFoundError(
                 "Service with type '{}' is not advertised"
@@ -265,6 +381,10 @@ class AbstractClient(object):
                 self.log.error('Can not autodiscover advertised services')
                 raise e
 
+        return self._filter_services(services, service_type, service_types)
+
+    def _filter_services(self, services, service_type=None,
+                         service_types=None):
         if service_type:
             return [s for s in services if s.type == service_type]
         elif service_types:
@@ -307,9 +427,12 @@ class AbstractClient(object):
 
         response = self._discovery_request(uri)
 
-        services = list(map(
-            to_detailed_service_instance_entity,
-            response.service_instances))
+        return self._handle_discovery_response(response, cache=cache)
+
+    def _handle_discovery_response(self, response, cache=True):
+        services = [
+            to_detailed_service_instance_entity(s, keep_raw=self.keep_raw)
+            for s in response.service_instances]
 
         self.log.info("%d services discovered", len(services))
 
@@ -318,6 +441,298 @@ class AbstractClient(object):
 
         return services
 
+    def poll_sharded(self, collection_name, begin_date, end_date=None,
+                     shards=4, workers=4, ordered=True, subscription_id=None,
+                     content_bindings=None, uri=None):
+        '''
+        Poll content from Polling Service, splitting the time window
+        into sub-windows that are polled concurrently.
+
+        ``[begin_date, end_date]`` window is split into ``shards`` equal
+        sub-windows, each of them is polled with :py:meth:`poll` in a pool
+        of ``workers`` threads sharing the client's connection pool.
+
+        If ``ordered`` is True, blocks are yielded ordered by timestamp
+        label. Every sub-window is then buffered in memory before its
+        blocks are yielded, at most ``workers`` sub-windows at a time.
+        Otherwise blocks are yielded as soon as they arrive.
+
+        :param str collection_name: collection to poll
+        :param datetime begin_date: ask only for content blocks created
+               after `begin_date` (exclusive)
+        :param datetime end_date: ask only for content blocks created
+               before `end_date` (inclusive), current UTC time by default
+        :param int shards: number of sub-windows to split the window into
+        :param int workers: number of sub-windows polled concurrently
+        :param bool ordered: yield blocks ordered by timestamp label
+        :param str subscription_id: ID of the existing subscription
+        :param list content_bindings: list of stings or
+               :py:class:`cabby.entities.ContentBinding` objects
+        :param str uri: URI path to a specific Polling Service
+
+        :raises ValueError:
+                if URI provided is invalid or schema is not supported
+        :raises `cabby.exceptions.HTTPError`:
+                if HTTP error happened
+        :raises `cabby.exceptions.UnsuccessfulStatusError`:
+                if Status Message received and status_type is not `SUCCESS`
+        :raises `cabby.exceptions.ServiceNotFoundError`:
+                if no service found
+        :raises `cabby.exceptions.AmbiguousServicesError`:
+                more than one service with type specified
+        :raises `cabby.exceptions.NoURIProvidedError`:
+                no URI provided and client can't discover services
+        '''
+        windows = utils.split_time_window(
+            begin_date, end_date or utils.get_utc_now(), shards)
+
+        # Resolve Polling Service once instead of discovering
+        # services in every worker
+        uri = uri or self._get_service(const.SVC_POLL).address
+
+        return self._poll_windows(
+            collection_name, windows, workers, ordered,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings,
+            uri=uri)
+
+    def _poll_windows(self, collection_name, windows, workers, ordered,
+                      **kwargs):
+        polls = self._window_polls(collection_name, windows, **kwargs)
+
+        if ordered:
+            def fetch_window(poll):
+                return sorted(poll(), key=_timestamp_sort_key)
+
+            for blocks in concurrency.map_in_order(
+                    fetch_window, polls, workers):
+                for block in blocks:
+                    yield block
+        else:
+            for block in concurrency.merge_as_completed(polls, workers):
+                yield block
+
+    def _window_polls(self, collection_name, windows, **kwargs):
+        # Functions starting a poll of every window
+        return [
+            functools.partial(
+                self.poll, collection_name,
+                begin_date=window[0], end_date=window[1], **kwargs)
+            for window in windows]
+
+    def poll_batches(self, collection_name, size=1000, max_bytes=None,
+                     **kwargs):
+        '''
+        Poll content from Polling Service, yielding lists of content
+        blocks instead of single blocks.
+
+        Batches contain at most ``size`` blocks and at most ``max_bytes``
+        bytes of content, any of the limits can be ``None``. A block
+        larger than ``max_bytes`` is yielded as a batch on its own.
+        Other arguments are passed to ``poll``.
+
+        :param str collection_name: collection to poll
+        :param int size: maximum number of blocks in a batch
+        :param int max_bytes: maximum total content size of a batch
+
+        :raises ValueError:
+                if both limits are ``None`` or not positive
+        '''
+        return utils.batch_content_blocks(
+            self.poll(collection_name, **kwargs), size, max_bytes)
+
+    def poll_incremental(self, collection_name, checkpoint_store,
+                         begin_date=None, end_date=None, size=1000,
+                         max_bytes=None, subscription_id=None,
+                         content_bindings=None, uri=None):
+        '''
+        Poll content newer than the stored checkpoint, in batches.
+
+        Polling starts after the timestamp stored in ``checkpoint_store``
+        for this Polling Service, collection and subscription, or after
+        ``begin_date`` if no checkpoint is stored yet. Batches are yielded
+        as by :py:meth:`poll_batches`.
+
+        Requesting the next batch acknowledges the previous one. Blocks
+        of a result may share timestamp labels and arrive in any order,
+        so the checkpoint only advances once every batch of the poll
+        result is acknowledged: to the inclusive end timestamp of the
+        result or the highest timestamp label received, whichever is
+        later. If the consumer stops iterating or fails while processing
+        a batch, unacknowledged content is polled again by the next
+        incremental poll.
+
+        Progress of multi-part results is stored after every completely
+        acknowledged part, batches then do not span result parts. If the
+        previous incremental poll stopped in the middle of a result,
+        polling continues with the first part not completely
+        acknowledged, or starts over if the server does not have the
+        result anymore.
+
+        :param str collection_name: collection to poll
+        :param checkpoint_store: a
+               :py:class:`cabby.checkpoints.CheckpointStore` instance
+        :param datetime begin_date: ask only for content blocks created
+               after `begin_date` (exclusive) if no checkpoint is stored
+        :param datetime end_date: ask only for content blocks created
+               before `end_date` (inclusive)
+        :param int size: maximum number of blocks in a batch
+        :param int max_bytes: maximum total content size of a batch
+        :param str subscription_id: ID of the existing subscription
+        :param list content_bindings: list of stings or
+               :py:class:`cabby.entities.ContentBinding` objects
+        :param str uri: URI path to a specific Polling Service
+
+        :raises ValueError:
+                if URI provided is invalid or schema is not supported
+        :raises `cabby.exceptions.HTTPError`:
+                if HTTP error happened
+        :raises `cabby.exceptions.UnsuccessfulStatusError`:
+                if Status Message received and status_type is not `SUCCESS`
+        :raises `cabby.exceptions.ServiceNotFoundError`:
+                if no service found
+        :raises `cabby.exceptions.AmbiguousServicesError`:
+                more than one service with type specified
+        :raises `cabby.exceptions.NoURIProvidedError`:
+                no URI provided and client can't discover services
+        '''
+        uri = uri or self._get_service(const.SVC_POLL).address
+        progress = IncrementalPollProgress(
+            checkpoint_store,
+            (self._prepare_url(uri), collection_name, subscription_id or ''),
+            self.log)
+
+        parts = self._poll_result_parts(
+            collection_name, checkpoint_store, progress.key,
+            begin_date=progress.checkpoint or begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings,
+            uri=uri)
+
+        for blocks, part in parts:
+            for batch in utils.batch_content_blocks(blocks, size, max_bytes):
+                yield batch
+                progress.acknowledge(batch)
+
+            progress.acknowledge_part(part)
+
+        progress.acknowledge_result(part)
+
+    def _poll_result_parts(self, collection_name, checkpoint_store, key,
+                           uri=None, **kwargs):
+        '''
+        Poll content, yielding ``(blocks, part)`` pairs for every part of
+        the poll result. ``part`` dict is filled with ``result_id``,
+        ``part_number``, ``more`` and ``end`` (inclusive end timestamp)
+        values once ``blocks`` are consumed.
+        '''
+        # Results are not split into parts in TAXII 1.0
+        yield self.poll(collection_name, uri=uri, **kwargs), {}
+
+    def _push_many(self, blocks, max_blocks, max_bytes, uri=None,
+                   collection_names=None, workers=1):
+        statuses = list(self._push_messages(
+            blocks, max_blocks, max_bytes, uri=uri,
+            collection_names=collection_names, workers=workers))
+
+        self.log.debug(
+            "%d content blocks pushed in %d messages",
+            sum(s.blocks for s in statuses if s.success), len(statuses))
+
+        return statuses
+
+    def _push_messages(self, blocks, max_blocks, max_bytes, uri=None,
+                       collection_names=None, workers=1):
+        '''
+        Pack blocks into Inbox Messages and push them, at most
+        ``workers`` at a time, yielding their statuses in order.
+        Blocks are read only when a worker is free.
+        '''
+        # Blocks are converted when their message is packed, so that
+        # a block failing to convert fails only its own message
+        batches = utils.batch_content_blocks(
+            (_to_content_block_entity(b) for b in blocks),
+            max_blocks, max_bytes)
+
+        # Resolve Inbox Service once for all messages
+        uri = uri or self._get_service(const.SVC_INBOX).address
+
+        return concurrency.map_in_order(
+            lambda message_blocks: self._push_message(
+                message_blocks, uri, collection_names=collection_names),
+            batches, workers)
+
+    def _push_message(self, message_blocks, uri, collection_names=None):
+        inbox_message, status = self._prepare_push_message(
+            message_blocks, collection_names=collection_names)
+
+        if inbox_message is not None:
+            try:
+                self._execute_request(inbox_message, uri=uri,
+                                      service_type=const.SVC_INBOX)
+            except UnsuccessfulStatusError as e:
+                status.status = e.status
+                status.message = e.raw.message
+                status.error = e
+                if self.keep_raw:
+                    status.raw = e.raw
+            except (ClientException,) + dispatcher.TRANSPORT_ERRORS as e:
+                status.status = None
+                status.error = e
+
+        if status.error is not None:
+            self.log.warning(
+                "Inbox Message %s with %d content blocks failed: %s",
+                status.message_id, status.blocks, status.error)
+
+        return status
+
+    def _prepare_push_message(self, message_blocks, collection_names=None):
+        '''
+        Pack content blocks into an Inbox Message and create its status.
+        If a block can not be converted, the message is ``None`` and
+        the status reports the error.
+        '''
+        try:
+            content_blocks = [
+                self._to_inbox_content_block(b) for b in message_blocks]
+        except UnicodeDecodeError as e:
+            return None, PushStatus(
+                self._generate_id(), len(message_blocks), status=None,
+                error=e)
+
+        inbox_message = self._pack_inbox_message(
+            content_blocks, collection_names=collection_names)
+
+        return inbox_message, PushStatus(
+            inbox_message.message_id, len(content_blocks))
+
+    def _push_stream(self, blocks, uri=None, collection_names=None):
+        inbox_message = self._pack_inbox_message(
+            [], collection_names=collection_names)
+        content_blocks = (self._to_inbox_content_block(b) for b in blocks)
+
+        self._execute_request(inbox_message, uri=uri,
+                              service_type=const.SVC_INBOX,
+                              content_blocks=content_blocks)
+
+        self.log.debug("Content blocks successfully pushed")
+
+    def _to_inbox_content_block(self, block):
+        if isinstance(block, ContentBlock):
+            content, binding, timestamp = (
+                block.content, block.binding, block.timestamp)
+        else:
+            content, binding, timestamp = (tuple(block) + (None,))[:3]
+
+        if isinstance(content, bytes):
+            # libtaxii serializes bytes content with its repr
+            content = content.decode('utf-8')
+
+        return self._prepare_content_block(
+            content, binding, timestamp=timestamp)
+
     def __repr__(self):
         t = '{name}(host={host}, port={port}, discovery_path={discovery_path})'
         return t.format(
@@ -326,3 +741,65 @@ class AbstractClient(object):
             port=self.port,
             discovery_path=self.discovery_path,
         )
+
+
+def _to_content_block_entity(block):
+    # Content blocks are pushed as entities or
+    # (content, binding[, timestamp]) tuples
+    if isinstance(block, ContentBlock):
+        return block
+    content, binding, timestamp = (tuple(block) + (None,))[:3]
+    return ContentBlock(content, binding, timestamp)
+
+
+def _timestamp_sort_key(block):
+    # Timestamp label is optional, blocks without it go first
+    return (block.timestamp is not None, block.timestamp or 0)
+
+
+def _latest(timestamps):
+    # Latest of the timestamps that are not None
+    return max((t for t in timestamps if t is not None), default=None)
+
+
+class IncrementalPollProgress(object):
+    '''
+    Checkpoint bookkeeping of an incremental poll, shared by synchronous
+    and asynchronous clients, see
+    :py:meth:`AbstractClient.poll_incremental`.
+
+    Blocks of a result may share timestamp labels and arrive in any
+    order, so the checkpoint advances only once every batch of the
+    result is acknowledged.
+    '''
+
+    def __init__(self, checkpoint_store, key, log):
+        self.checkpoint_store = checkpoint_store
+        self.key = key
+
+        self.checkpoint = checkpoint_store.get(key)
+        if self.checkpoint:
+            log.info("Resuming poll after checkpoint %s", self.checkpoint)
+
+        # Highest timestamp of the result acknowledged so far
+        self._result_end = None
+
+    def acknowledge(self, batch):
+        self._result_end = _latest(
+            [self._result_end] + [b.timestamp for b in batch])
+
+    def acknowledge_part(self, part):
+        # All batches of the part are acknowledged
+        if part.get('more'):
+            self.checkpoint_store.set_fulfilment(
+                self.key, part['result_id'], part['part_number'])
+
+    def acknowledge_result(self, part):
+        # All batches of the result are acknowledged, blocks up to its end
+        # can not be missed when polling after it
+        result_end = _latest([self._result_end, part.get('end')])
+        if result_end and (
+                not self.checkpoint or result_end > self.checkpoint):
+            self.checkpoint_store.set(self.key, result_end)
+
+        self.checkpoint_store.delete_fulfilment(self.key)
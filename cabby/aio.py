@@ -0,0 +1,1082 @@
+'''
+    Asynchronous TAXII clients, based on `aiohttp`.
+
+    Request messages are built by the synchronous clients and
+    responses are parsed by :py:mod:`cabby.dispatcher`, only
+    the transport is asynchronous.
+'''
+from datetime import timedelta
+import asyncio
+import json
+import ssl
+
+import libtaxii
+import libtaxii.messages_11 as tm11
+from furl import furl
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import constants as const
+from . import concurrency, dispatcher, utils
+from ._version import __version__ as cabby_version
+from .abstract import (
+    IncrementalPollProgress, _timestamp_sort_key, _to_content_block_entity
+)
+from .client10 import Client10
+from .client11 import Client11, _update_result_part
+from .converters import (
+    extract_raw_content_block, get_content_block_parser,
+    to_collection_entities, to_content_block_count_entity,
+    to_subscription_response_entity
+)
+from .entities import ContentBlock
+from .exceptions import (
+    ClientException, NoURIProvidedError, NotSupportedError,
+    UnsuccessfulStatusError
+)
+
+
+async def _parse_chunks(response, parser, chunk_size):
+    # Content Blocks are emitted as soon as their closing tags are received
+    try:
+        async for chunk in response.content.iter_chunked(chunk_size):
+            for obj in parser.feed(chunk):
+                yield obj
+
+        for obj in parser.close():
+            yield obj
+    finally:
+        response.release()
+
+
+async def _aiter(items):
+    # Regular and asynchronous iterables are accepted alike
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def _collect(items):
+    return [item async for item in items]
+
+
+async def _batch_content_blocks(blocks, batcher):
+    # Asynchronous iteration of utils.batch_content_blocks
+
+    async for block in blocks:
+        for batch in batcher.add(block):
+            yield batch
+
+    batch = batcher.flush()
+    if batch:
+        yield batch
+
+
+async def _serialize_message_stream(message, content_blocks):
+    # Asynchronous iteration of dispatcher.serialize_message_stream
+    head, tail = dispatcher.serialize_message_stream(message, [])
+
+    yield head
+    async for block in content_blocks:
+        yield block.to_xml()
+    yield tail
+
+
+async def _compress_request_stream(chunks, threshold):
+    # Asynchronous iteration of dispatcher.compress_request_body
+    compressor = dispatcher.RequestBodyCompressor(threshold)
+    head = b''
+
+    async for chunk in chunks:
+        head += compressor.feed(chunk)
+        if compressor.compressing:
+            break
+    else:
+        # Whole stream is below the threshold
+        return compressor.close(), {}
+
+    async def compress_chunks():
+        if head:
+            yield head
+        async for chunk in chunks:
+            data = compressor.feed(chunk)
+            if data:
+                yield data
+        yield compressor.close()
+
+    return compress_chunks(), {'Content-Encoding': 'gzip'}
+
+
+class AsyncClientMixin(object):
+    '''
+    Asynchronous transport for TAXII clients.
+
+    Provides coroutine versions of the request execution, service
+    discovery, concurrent polling and pushing methods of
+    :py:class:`cabby.abstract.AbstractClient`.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        if aiohttp is None:
+            raise ImportError(
+                'aiohttp is required for asynchronous clients, '
+                'install it with "pip install cabby[async]"')
+
+        super(AsyncClientMixin, self).__init__(*args, **kwargs)
+
+        self._async_session = None
+
+    def _create_ssl_context(self):
+        # Same semantics as 'verify' attribute of requests session,
+        # see 'dispatcher.get_generic_session'
+        verify = self.ca_cert or self.verify_ssl
+
+        if verify and not isinstance(verify, bool):
+            context = ssl.create_default_context(cafile=verify)
+        else:
+            context = ssl.create_default_context()
+
+        if not verify:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+
+        if self.cert_file and self.key_file:
+            context.load_cert_chain(
+                self.cert_file, self.key_file, password=self.key_password)
+
+        return context
+
+    async def _get_session(self):
+        '''
+        Get long-lived aiohttp session shared by all requests of this client.
+
+        The session is rebuilt when authentication, proxy, TLS or pool
+        settings change.
+        '''
+        params = self._get_session_params()
+
+        if self._async_session is None or params != self._session_params:
+            await self.close()
+
+            headers = dict(self.headers)
+            headers['User-Agent'] = 'Cabby {}'.format(cabby_version)
+
+            auth = None
+            if self.username and self.password and not self.jwt_url:
+                auth = aiohttp.BasicAuth(self.username, self.password)
+
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_connections * self.pool_maxsize,
+                limit_per_host=self.pool_maxsize,
+                ssl=self._create_ssl_context())
+
+            self._async_session = aiohttp.ClientSession(
+                connector=connector, headers=headers, auth=auth)
+            self._session_params = params
+
+        return self._async_session
+
+    async def close(self):
+        '''
+        Close the client's HTTP session and release pooled connections.
+        '''
+        if self._async_session is not None:
+            await self._async_session.close()
+
+        self._async_session = None
+        self._session_params = None
+
+    def __enter__(self):
+        # The session can only be closed in a coroutine
+        raise TypeError(
+            'Use "async with" instead of "with" for asynchronous clients')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_request_kwargs(self, url):
+        kwargs = {}
+
+        proxy = (self.proxies or {}).get(furl(url).scheme)
+        if proxy:
+            kwargs['proxy'] = proxy
+
+        if self.timeout:
+            kwargs['timeout'] = aiohttp.ClientTimeout(
+                sock_connect=self.timeout, sock_read=self.timeout)
+
+        return kwargs
+
+    async def refresh_jwt_token(self, session=None):
+        '''
+        Obtain JWT token using provided JWT session,
+        url, username and password.
+        '''
+        session = session or await self._get_session()
+        url = self._prepare_url(self.jwt_url)
+
+        self.log.info("Obtaining JWT token from %s", url)
+
+        request_data = json.dumps(
+            {'username': self.username, 'password': self.password})
+
+        response = await session.post(
+            url,
+            data=request_data.encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            **self._get_request_kwargs(url))
+
+        async with response:
+            if not response.ok:
+                dispatcher.raise_http_error(response.status)
+            body = await response.read()
+
+        self.jwt_token = dispatcher.get_jwt_token_from_response(body)
+        return self.jwt_token
+
+    async def _send_taxii_request(self, session, url, request,
+                                  content_block_factory=None,
+                                  content_blocks=None):
+        self.log.info("Sending %s to %s", request.message_type, url)
+
+        if content_blocks is not None:
+            request_body = _serialize_message_stream(request, content_blocks)
+        else:
+            request_body = dispatcher.serialize_request(request)
+
+        headers = dispatcher.get_taxii_headers(
+            url_scheme=furl(url).scheme,
+            message_binding=self.taxii_binding)
+
+        if self.jwt_token:
+            headers['Authorization'] = 'Bearer {}'.format(self.jwt_token)
+
+        if self.compress_requests:
+            if content_blocks is not None:
+                request_body, encoding_headers = (
+                    await _compress_request_stream(
+                        request_body, self.compression_threshold))
+            else:
+                request_body, encoding_headers = (
+                    dispatcher.compress_request_body(
+                        request_body, self.compression_threshold))
+            headers.update(encoding_headers)
+
+        response = await session.post(
+            url, data=request_body, headers=headers,
+            **self._get_request_kwargs(url))
+
+        try:
+            if not response.ok:
+                dispatcher.raise_http_error(response.status)
+
+            parser = dispatcher.ResponseParser(
+                response.headers, version=request.version,
+                content_block_factory=content_block_factory)
+            objects = _parse_chunks(response, parser, self.chunk_size)
+
+            obj = await objects.__anext__()
+        except Exception:
+            response.release()
+            raise
+
+        if obj == const.STREAM_MARKER:
+            return objects
+
+        await objects.aclose()
+        return dispatcher.check_status(obj)
+
+    async def _execute_request(self, request, uri=None, service_type=None,
+                               content_block_factory=None,
+                               content_blocks=None):
+        '''
+        Execute generic TAXII request.
+
+        A service is defined by ``uri`` parameter or is chosen from pre-cached
+        services by ``service_type``. Content blocks are built with
+        ``content_block_factory`` if provided, or with the client's
+        ``content_block_parser`` otherwise. ``content_blocks``, an
+        asynchronous iterable, are streamed as the last children of
+        the request message.
+        '''
+        if not uri and not service_type:
+            raise NoURIProvidedError('URI or service_type needed')
+        elif not uri:
+            service = await self._get_service(service_type)
+            uri = service.address
+
+        if (self.key_file
+                and not self.key_password
+                and utils.if_key_encrypted(self.key_file)):
+            raise ValueError(
+                'Key file is encrypted but key password was not provided')
+
+        if content_block_factory is None:
+            content_block_factory = get_content_block_parser(
+                self.content_block_parser, keep_raw=self.keep_raw)
+
+        session = await self._get_session()
+
+        uses_jwt = self.jwt_url and self.username and self.password
+        if uses_jwt and not self.jwt_token:
+            await self.refresh_jwt_token(session=session)
+
+        url = self._prepare_url(uri)
+
+        def send_request():
+            return self._send_taxii_request(
+                session, url, request,
+                content_block_factory=content_block_factory,
+                content_blocks=content_blocks)
+
+        try:
+            return await send_request()
+        except UnsuccessfulStatusError as exc:
+            # Streamed content blocks can not be sent again
+            if (uses_jwt and content_blocks is None
+                    and exc.status == libtaxii.ST_UNAUTHORIZED):
+                # An authorization error may indicate JWT token expiry:
+                # transparently try to refresh it, then retry the request.
+                await self.refresh_jwt_token(session=session)
+                return await send_request()
+            else:
+                raise
+
+    async def _get_service(self, service_type):
+        candidates = await self.get_services(service_type=service_type)
+        return self._select_service(candidates, service_type)
+
+    async def get_services(self, service_type=None, service_types=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.abstract.AbstractClient.get_services`.
+        '''
+        if self.services:
+            services = self.services
+        else:
+            try:
+                services = await self.discover_services()
+            except ClientException as e:
+                self.log.error('Can not autodiscover advertised services')
+                raise e
+
+        return self._filter_services(services, service_type, service_types)
+
+    async def discover_services(self, uri=None, cache=True):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.abstract.AbstractClient.discover_services`.
+        '''
+        uri = uri or self.discovery_path
+
+        if not uri:
+            raise NoURIProvidedError('Discovery service URI is not specified')
+
+        response = await self._execute_request(
+            self._prepare_discovery_request(), uri=uri)
+
+        return self._handle_discovery_response(response, cache=cache)
+
+    async def poll_sharded(self, collection_name, begin_date, end_date=None,
+                           shards=4, workers=4, ordered=True,
+                           subscription_id=None, content_bindings=None,
+                           uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.abstract.AbstractClient.poll_sharded`.
+
+        Sub-windows are polled by at most ``workers`` concurrent tasks.
+        '''
+        windows = utils.split_time_window(
+            begin_date, end_date or utils.get_utc_now(), shards)
+
+        # Resolve Polling Service once instead of discovering
+        # services in every task
+        uri = uri or (await self._get_service(const.SVC_POLL)).address
+
+        blocks = self._poll_windows(
+            collection_name, windows, workers, ordered,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings,
+            uri=uri)
+        try:
+            async for block in blocks:
+                yield block
+        finally:
+            await blocks.aclose()
+
+    async def _poll_windows(self, collection_name, windows, workers, ordered,
+                            **kwargs):
+        polls = self._window_polls(collection_name, windows, **kwargs)
+
+        if ordered:
+            async def fetch_window(poll):
+                return sorted(await _collect(poll()), key=_timestamp_sort_key)
+
+            results = concurrency.map_in_order_async(
+                fetch_window, _aiter(polls), workers)
+            try:
+                async for blocks in results:
+                    for block in blocks:
+                        yield block
+            finally:
+                await results.aclose()
+        else:
+            results = concurrency.merge_as_completed_async(polls, workers)
+            try:
+                async for block in results:
+                    yield block
+            finally:
+                await results.aclose()
+
+    async def poll_batches(self, collection_name, size=1000, max_bytes=None,
+                           **kwargs):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.abstract.AbstractClient.poll_batches`.
+        '''
+        batches = _batch_content_blocks(
+            self.poll(collection_name, **kwargs),
+            utils.ContentBlockBatcher(size, max_bytes))
+        async for batch in batches:
+            yield batch
+
+    async def poll_incremental(self, collection_name, checkpoint_store,
+                               begin_date=None, end_date=None, size=1000,
+                               max_bytes=None, subscription_id=None,
+                               content_bindings=None, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.abstract.AbstractClient.poll_incremental`.
+
+        ``checkpoint_store`` is called synchronously.
+        '''
+        uri = uri or (await self._get_service(const.SVC_POLL)).address
+        progress = IncrementalPollProgress(
+            checkpoint_store,
+            (self._prepare_url(uri), collection_name, subscription_id or ''),
+            self.log)
+
+        parts = self._poll_result_parts(
+            collection_name, checkpoint_store, progress.key,
+            begin_date=progress.checkpoint or begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings,
+            uri=uri)
+
+        async for blocks, part in parts:
+            batches = _batch_content_blocks(
+                blocks, utils.ContentBlockBatcher(size, max_bytes))
+            async for batch in batches:
+                yield batch
+                progress.acknowledge(batch)
+
+            progress.acknowledge_part(part)
+
+        progress.acknowledge_result(part)
+
+    async def _poll_result_parts(self, collection_name, checkpoint_store, key,
+                                 uri=None, **kwargs):
+        # Results are not split into parts in TAXII 1.0
+        yield self.poll(collection_name, uri=uri, **kwargs), {}
+
+    async def _push_many(self, blocks, max_blocks, max_bytes, uri=None,
+                         collection_names=None, workers=1):
+        batcher = utils.ContentBlockBatcher(max_blocks, max_bytes)
+
+        batches = _batch_content_blocks(
+            (_to_content_block_entity(b) async for b in _aiter(blocks)),
+            batcher)
+
+        # Resolve Inbox Service once for all messages
+        uri = uri or (await self._get_service(const.SVC_INBOX)).address
+
+        statuses = await _collect(concurrency.map_in_order_async(
+            lambda message_blocks: self._push_message(
+                message_blocks, uri, collection_names=collection_names),
+            batches, workers))
+
+        self.log.debug(
+            "%d content blocks pushed in %d messages",
+            sum(s.blocks for s in statuses if s.success), len(statuses))
+
+        return statuses
+
+    async def _push_message(self, message_blocks, uri,
+                            collection_names=None):
+        inbox_message, status = self._prepare_push_message(
+            message_blocks, collection_names=collection_names)
+
+        if inbox_message is not None:
+            try:
+                await self._execute_request(inbox_message, uri=uri,
+                                            service_type=const.SVC_INBOX)
+            except UnsuccessfulStatusError as e:
+                status.status = e.status
+                status.message = e.raw.message
+                status.error = e
+                if self.keep_raw:
+                    status.raw = e.raw
+            except (ClientException, aiohttp.ClientError,
+                    asyncio.TimeoutError) as e:
+                status.status = None
+                status.error = e
+
+        if status.error is not None:
+            self.log.warning(
+                "Inbox Message %s with %d content blocks failed: %s",
+                status.message_id, status.blocks, status.error)
+
+        return status
+
+    async def _push_stream(self, blocks, uri=None, collection_names=None):
+        inbox_message = self._pack_inbox_message(
+            [], collection_names=collection_names)
+        content_blocks = (
+            self._to_inbox_content_block(b) async for b in _aiter(blocks))
+
+        await self._execute_request(inbox_message, uri=uri,
+                                    service_type=const.SVC_INBOX,
+                                    content_blocks=content_blocks)
+
+        self.log.debug("Content blocks successfully pushed")
+
+
+class AsyncClient11(AsyncClientMixin, Client11):
+    '''Asynchronous client implementation for TAXII Specification v1.1
+
+    Use :py:meth:`cabby.create_async_client` to create client instances.
+    All methods sending TAXII requests are coroutines, polling methods
+    and :py:meth:`fulfilment` are asynchronous generators.
+    '''
+
+    async def _subscription_request(self, action, collection_name,
+                                    subscription_id=None, uri=None):
+        request = self._prepare_subscription_request(
+            action, collection_name, subscription_id=subscription_id)
+        response = await self._execute_request(
+            request, uri=uri,
+            service_type=const.SVC_COLLECTION_MANAGEMENT)
+
+        return to_subscription_response_entity(
+            response, version=11, keep_raw=self.keep_raw)
+
+    async def get_subscription_status(self, collection_name,
+                                      subscription_id=None, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.get_subscription_status`.
+        '''
+        return await self._subscription_request(
+            const.ACT_STATUS, collection_name,
+            subscription_id=subscription_id, uri=uri)
+
+    async def pause_subscription(self, collection_name, subscription_id,
+                                 uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.pause_subscription`.
+        '''
+        return await self._subscription_request(
+            const.ACT_PAUSE, collection_name,
+            subscription_id=subscription_id, uri=uri)
+
+    async def resume_subscription(self, collection_name, subscription_id,
+                                  uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.resume_subscription`.
+        '''
+        return await self._subscription_request(
+            const.ACT_RESUME, collection_name,
+            subscription_id=subscription_id, uri=uri)
+
+    async def unsubscribe(self, collection_name, subscription_id, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.unsubscribe`.
+        '''
+        return await self._subscription_request(
+            const.ACT_UNSUBSCRIBE, collection_name,
+            subscription_id=subscription_id, uri=uri)
+
+    async def subscribe(self, collection_name, count_only=False,
+                        inbox_service=None, content_bindings=None, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.subscribe`.
+        '''
+        request = self._prepare_subscribe_request(
+            collection_name, count_only=count_only,
+            inbox_service=inbox_service, content_bindings=content_bindings)
+        response = await self._execute_request(
+            request, uri=uri,
+            service_type=const.SVC_COLLECTION_MANAGEMENT)
+
+        return to_subscription_response_entity(
+            response, version=11, keep_raw=self.keep_raw)
+
+    async def get_collections(self, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.get_collections`.
+        '''
+        response = await self._execute_request(
+            self._prepare_collections_request(), uri=uri,
+            service_type=const.SVC_COLLECTION_MANAGEMENT)
+
+        return to_collection_entities(
+            response.collection_informations, version=11,
+            keep_raw=self.keep_raw)
+
+    async def push(self, content, content_binding, collection_names=None,
+                   timestamp=None, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.push`.
+        '''
+        inbox_message = self._prepare_inbox_message(
+            content, content_binding, collection_names=collection_names,
+            timestamp=timestamp)
+
+        await self._execute_request(
+            inbox_message, uri=uri, service_type=const.SVC_INBOX)
+
+        self.log.debug("Content block successfully pushed")
+
+    async def get_content_count(self, collection_name, begin_date=None,
+                                end_date=None, subscription_id=None,
+                                inbox_service=None, content_bindings=None,
+                                uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.get_content_count`.
+        '''
+        request = self._prepare_poll_request(
+            collection_name,
+            begin_date=begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            inbox_service=inbox_service,
+            content_bindings=content_bindings,
+            count_only=True
+        )
+        stream = await self._execute_request(
+            request, uri=uri, service_type=const.SVC_POLL)
+
+        async for obj in stream:
+            if isinstance(obj, tm11.PollResponse):
+                return to_content_block_count_entity(
+                    obj.record_count, keep_raw=self.keep_raw)
+
+    async def poll(self, collection_name, begin_date=None, end_date=None,
+                   subscription_id=None, inbox_service=None,
+                   content_bindings=None, uri=None):
+        '''
+        Asynchronous version of :py:meth:`cabby.client11.Client11.poll`.
+
+        Result parts of a multipart response are fetched one after another.
+        '''
+        request = self._prepare_poll_request(
+            collection_name,
+            begin_date=begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            inbox_service=inbox_service,
+            content_bindings=content_bindings,
+            count_only=False
+        )
+        stream = await self._execute_request(
+            request, uri=uri, service_type=const.SVC_POLL)
+
+        response = None
+        try:
+            async for obj in stream:
+                if isinstance(obj, ContentBlock):
+                    yield obj
+                else:
+                    response = obj
+        finally:
+            # Release the connection if the consumer stops early
+            await stream.aclose()
+
+        if response and response.more:
+            part = response.result_part_number + 1
+            more = True
+
+            while more:
+                request = self._prepare_fulfilment_request(
+                    collection_name, response.result_id, part)
+                stream = await self._execute_request(
+                    request, uri=uri, service_type=const.SVC_POLL)
+
+                more = False
+                try:
+                    async for obj in stream:
+                        if isinstance(obj, tm11.PollResponse):
+                            more = obj.more
+                        elif isinstance(obj, ContentBlock):
+                            yield obj
+                finally:
+                    await stream.aclose()
+
+                part += 1
+
+    async def fulfilment(self, collection_name, result_id, part_number=1,
+                         uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.fulfilment`.
+        '''
+        request = self._prepare_fulfilment_request(
+            collection_name, result_id, part_number)
+        stream = await self._execute_request(
+            request, uri=uri, service_type=const.SVC_POLL)
+
+        async for obj in stream:
+            if isinstance(obj, ContentBlock):
+                yield obj
+
+    async def poll_raw(self, collection_name, begin_date=None, end_date=None,
+                       subscription_id=None, inbox_service=None,
+                       content_bindings=None, uri=None):
+        '''
+        Asynchronous version of :py:meth:`cabby.client11.Client11.poll_raw`.
+        '''
+        request = self._prepare_poll_request(
+            collection_name,
+            begin_date=begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            inbox_service=inbox_service,
+            content_bindings=content_bindings,
+            count_only=False
+        )
+        part = None
+
+        while True:
+            stream = await self._execute_request(
+                request, uri=uri, service_type=const.SVC_POLL,
+                content_block_factory=extract_raw_content_block)
+
+            response = None
+            async for obj in stream:
+                if isinstance(obj, tm11.PollResponse):
+                    response = obj
+                else:
+                    yield obj
+
+            if not response or not response.more:
+                break
+
+            part = (part or response.result_part_number) + 1
+            request = self._prepare_fulfilment_request(
+                collection_name, response.result_id, part)
+
+    async def plan_poll_windows(self, collection_name, begin_date,
+                                end_date=None, max_count=10000,
+                                min_window=timedelta(seconds=1),
+                                subscription_id=None, content_bindings=None,
+                                uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.plan_poll_windows`.
+
+        Both halves of a split window are counted concurrently.
+        '''
+        if max_count < 1:
+            raise ValueError('Maximum count should be positive')
+
+        end_date = end_date or utils.get_utc_now()
+        uri = uri or (await self._get_service(const.SVC_POLL)).address
+
+        async def plan(window):
+            count = await self.get_content_count(
+                collection_name,
+                begin_date=window[0],
+                end_date=window[1],
+                subscription_id=subscription_id,
+                content_bindings=content_bindings,
+                uri=uri)
+
+            too_large = count is not None and (
+                count.count > max_count or count.is_partial)
+
+            if too_large and window[1] - window[0] > min_window:
+                halves = await asyncio.gather(*[
+                    plan(half) for half in
+                    utils.split_time_window(window[0], window[1], 2)])
+                return halves[0] + halves[1]
+            return [window]
+
+        window, = utils.split_time_window(begin_date, end_date, 1)
+        windows = await plan(window)
+
+        self.log.info("Poll window split into %d windows", len(windows))
+
+        return windows
+
+    async def poll_adaptive(self, collection_name, begin_date, end_date=None,
+                            max_count=10000, min_window=timedelta(seconds=1),
+                            workers=1, ordered=True, subscription_id=None,
+                            content_bindings=None, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.poll_adaptive`.
+
+        Windows are polled by at most ``workers`` concurrent tasks.
+        '''
+        uri = uri or (await self._get_service(const.SVC_POLL)).address
+
+        windows = await self.plan_poll_windows(
+            collection_name, begin_date,
+            end_date=end_date,
+            max_count=max_count,
+            min_window=min_window,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings,
+            uri=uri)
+
+        blocks = self._poll_windows(
+            collection_name, windows, workers, ordered,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings,
+            uri=uri)
+        try:
+            async for block in blocks:
+                yield block
+        finally:
+            await blocks.aclose()
+
+    async def _poll_result_parts(self, collection_name, checkpoint_store, key,
+                                 uri=None, **kwargs):
+        first_part = None
+
+        request = self._resume_result_request(
+            collection_name, checkpoint_store, key)
+        if request is not None:
+            try:
+                first_part = await self._request_result_part(request, uri)
+            except UnsuccessfulStatusError as e:
+                self._discard_result_progress(e, checkpoint_store, key)
+
+        if first_part is None:
+            request = self._prepare_poll_request(
+                collection_name, count_only=False, **kwargs)
+            first_part = await self._request_result_part(request, uri)
+
+        blocks, part = first_part
+        yield blocks, part
+
+        request = self._next_part_request(collection_name, part)
+        while request is not None:
+            blocks, part = await self._request_result_part(request, uri)
+            yield blocks, part
+            request = self._next_part_request(collection_name, part)
+
+    async def _request_result_part(self, request, uri=None):
+        stream = await self._execute_request(
+            request, uri=uri, service_type=const.SVC_POLL)
+        part = {}
+
+        async def iter_blocks():
+            async for obj in stream:
+                if isinstance(obj, tm11.PollResponse):
+                    _update_result_part(part, obj)
+                else:
+                    yield obj
+
+        return iter_blocks(), part
+
+    def _fetch_part(self, *args, **kwargs):
+        # Thread-based prefetching would block the event loop
+        raise NotImplementedError(
+            'Result parts are not prefetched by asynchronous clients')
+
+    def _prefetch_parts(self, *args, **kwargs):
+        raise NotImplementedError(
+            'Result parts are not prefetched by asynchronous clients')
+
+    async def push_many(self, blocks, collection_names=None, max_blocks=100,
+                        max_bytes=None, workers=1, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.push_many`.
+
+        ``blocks`` can also be an asynchronous iterable. Messages are
+        pushed by at most ``workers`` concurrent tasks.
+        '''
+        return await self._push_many(
+            blocks, max_blocks, max_bytes, uri=uri,
+            collection_names=collection_names, workers=workers)
+
+    async def push_stream(self, blocks, collection_names=None, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client11.Client11.push_stream`.
+
+        ``blocks`` can also be an asynchronous iterable.
+        '''
+        await self._push_stream(
+            blocks, uri=uri, collection_names=collection_names)
+
+
+class AsyncClient10(AsyncClientMixin, Client10):
+    '''Asynchronous client implementation for TAXII Specification v1.0
+
+    Use :py:meth:`cabby.create_async_client` to create client instances.
+    All methods sending TAXII requests are coroutines, polling methods
+    are asynchronous generators.
+    '''
+
+    async def _subscription_request(self, action, collection_name,
+                                    subscription_id=None, uri=None):
+        request = self._prepare_subscription_request(
+            action, collection_name, subscription_id=subscription_id)
+        response = await self._execute_request(
+            request, uri=uri, service_type=const.SVC_FEED_MANAGEMENT)
+
+        return to_subscription_response_entity(
+            response, version=10, keep_raw=self.keep_raw)
+
+    async def get_subscription_status(self, collection_name,
+                                      subscription_id=None, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client10.Client10.get_subscription_status`.
+        '''
+        return await self._subscription_request(
+            const.ACT_STATUS, collection_name,
+            subscription_id=subscription_id, uri=uri)
+
+    async def unsubscribe(self, collection_name, subscription_id, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client10.Client10.unsubscribe`.
+        '''
+        return await self._subscription_request(
+            const.ACT_UNSUBSCRIBE, collection_name,
+            subscription_id=subscription_id, uri=uri)
+
+    async def subscribe(self, collection_name, inbox_service=None,
+                        content_bindings=None, uri=None, count_only=False):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client10.Client10.subscribe`.
+        '''
+        request = self._prepare_subscribe_request(
+            collection_name, inbox_service=inbox_service,
+            content_bindings=content_bindings)
+        response = await self._execute_request(
+            request, uri=uri, service_type=const.SVC_FEED_MANAGEMENT)
+
+        return to_subscription_response_entity(
+            response, version=10, keep_raw=self.keep_raw)
+
+    async def push(self, content, content_binding, uri=None, timestamp=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client10.Client10.push`.
+        '''
+        inbox_message = self._prepare_inbox_message(
+            content, content_binding, timestamp=timestamp)
+
+        await self._execute_request(
+            inbox_message, uri=uri, service_type=const.SVC_INBOX)
+
+        self.log.debug("Content block successfully pushed")
+
+    async def get_collections(self, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client10.Client10.get_collections`.
+        '''
+        response = await self._execute_request(
+            self._prepare_collections_request(), uri=uri,
+            service_type=const.SVC_FEED_MANAGEMENT)
+
+        return to_collection_entities(
+            response.feed_informations, version=10, keep_raw=self.keep_raw)
+
+    async def get_content_count(self, *args, **kwargs):
+        '''Not supported in TAXII 1.0
+
+        :raises `cabby.exceptions.NotSupportedError`:
+                not supported in TAXII 1.0
+        '''
+        raise NotSupportedError(self.taxii_version)
+
+    async def poll(self, collection_name, begin_date=None, end_date=None,
+                   subscription_id=None, content_bindings=None, uri=None):
+        '''
+        Asynchronous version of :py:meth:`cabby.client10.Client10.poll`.
+        '''
+        request = self._prepare_poll_request(
+            collection_name,
+            begin_date=begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings)
+        stream = await self._execute_request(
+            request, uri=uri, service_type=const.SVC_POLL)
+
+        async for obj in stream:
+            if isinstance(obj, ContentBlock):
+                yield obj
+
+    async def fulfilment(self, *args, **kwargs):
+        '''Not supported in TAXII 1.0
+
+        :raises `cabby.exceptions.NotSupportedError`:
+        '''
+        raise NotSupportedError(self.taxii_version)
+
+    async def poll_raw(self, collection_name, begin_date=None, end_date=None,
+                       subscription_id=None, content_bindings=None, uri=None):
+        '''
+        Asynchronous version of :py:meth:`cabby.client10.Client10.poll_raw`.
+        '''
+        request = self._prepare_poll_request(
+            collection_name,
+            begin_date=begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings)
+        stream = await self._execute_request(
+            request, uri=uri, service_type=const.SVC_POLL,
+            content_block_factory=extract_raw_content_block)
+
+        async for obj in stream:
+            if isinstance(obj, tuple):
+                yield obj
+
+    async def push_many(self, blocks, max_blocks=100, max_bytes=None,
+                        workers=1, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client10.Client10.push_many`.
+
+        ``blocks`` can also be an asynchronous iterable. Messages are
+        pushed by at most ``workers`` concurrent tasks.
+        '''
+        return await self._push_many(
+            blocks, max_blocks, max_bytes, uri=uri, workers=workers)
+
+    async def push_stream(self, blocks, uri=None):
+        '''
+        Asynchronous version of
+        :py:meth:`cabby.client10.Client10.push_stream`.
+
+        ``blocks`` can also be an asynchronous iterable.
+        '''
+        await self._push_stream(blocks, uri=uri)
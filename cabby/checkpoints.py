@@ -0,0 +1,269 @@
+'''
+Checkpoint stores persisting the highest content block timestamp label
+consumed from a collection, used by incremental polling to resume
+where the previous poll stopped.
+
+Stores also keep progress of unfinished multi-part poll results, so
+that polling can continue with the next result part.
+
+Checkpoints are keyed by ``(server, collection, subscription)`` tuples,
+where ``server`` is Polling Service URL and ``subscription`` is
+subscription ID or an empty string.
+'''
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+from .entities import parse_timestamp_label
+
+
+class CheckpointStore(object):
+    '''
+    Checkpoint store interface.
+
+    Implementations store timestamps of the last consumed content
+    blocks, as timezone aware datetimes, under checkpoint keys.
+    '''
+
+    def get(self, key):
+        '''
+        Get checkpoint timestamp.
+
+        :param tuple key: ``(server, collection, subscription)`` tuple
+        :return: timestamp or ``None`` if no checkpoint is stored
+        :rtype: datetime
+        '''
+        raise NotImplementedError()
+
+    def set(self, key, timestamp):
+        '''
+        Store checkpoint timestamp, replacing previous one.
+
+        :param tuple key: ``(server, collection, subscription)`` tuple
+        :param datetime timestamp: timestamp label of the last consumed
+               content block
+        '''
+        raise NotImplementedError()
+
+    def get_fulfilment(self, key):
+        '''
+        Get progress of an unfinished multi-part poll result.
+
+        :param tuple key: ``(server, collection, subscription)`` tuple
+        :return: ``(result_id, part_number)`` tuple with the number of
+                 the last completed part, or ``None``
+        '''
+        raise NotImplementedError()
+
+    def set_fulfilment(self, key, result_id, part_number):
+        '''
+        Store progress of an unfinished multi-part poll result.
+
+        :param tuple key: ``(server, collection, subscription)`` tuple
+        :param str result_id: poll result ID
+        :param int part_number: number of the last completed part
+        '''
+        raise NotImplementedError()
+
+    def delete_fulfilment(self, key):
+        '''
+        Forget progress of a finished or expired poll result.
+
+        :param tuple key: ``(server, collection, subscription)`` tuple
+        '''
+        raise NotImplementedError()
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    '''
+    Checkpoint store keeping checkpoints in memory only.
+    '''
+
+    def __init__(self):
+        self._checkpoints = {}
+        self._fulfilments = {}
+
+    def get(self, key):
+        return self._checkpoints.get(tuple(key))
+
+    def set(self, key, timestamp):
+        self._checkpoints[tuple(key)] = timestamp
+
+    def get_fulfilment(self, key):
+        return self._fulfilments.get(tuple(key))
+
+    def set_fulfilment(self, key, result_id, part_number):
+        self._fulfilments[tuple(key)] = (result_id, part_number)
+
+    def delete_fulfilment(self, key):
+        self._fulfilments.pop(tuple(key), None)
+
+
+class FileCheckpointStore(CheckpointStore):
+    '''
+    Checkpoint store keeping checkpoints in a JSON file.
+
+    The file is replaced atomically on every update, so it is never
+    left partially written.
+
+    :param str path: path to the JSON file, created on first update
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except IOError:
+            return {}
+
+    def _save(self, checkpoints):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(checkpoints, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def _get_entry(self, key):
+        with self._lock:
+            return self._load().get(_join_key(key), {})
+
+    def _update_entry(self, key, **values):
+        with self._lock:
+            checkpoints = self._load()
+            checkpoints.setdefault(_join_key(key), {}).update(values)
+            self._save(checkpoints)
+
+    def get(self, key):
+        return parse_timestamp_label(self._get_entry(key).get('timestamp'))
+
+    def set(self, key, timestamp):
+        self._update_entry(key, timestamp=timestamp.isoformat())
+
+    def get_fulfilment(self, key):
+        entry = self._get_entry(key)
+        if entry.get('result_id') is None:
+            return None
+        return entry['result_id'], entry['part_number']
+
+    def set_fulfilment(self, key, result_id, part_number):
+        self._update_entry(key, result_id=result_id, part_number=part_number)
+
+    def delete_fulfilment(self, key):
+        self._update_entry(key, result_id=None, part_number=None)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    '''
+    Checkpoint store keeping checkpoints in an SQLite database.
+
+    :param str path: path to the database file, created if missing
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS checkpoints ('
+                    'server TEXT NOT NULL, '
+                    'collection TEXT NOT NULL, '
+                    'subscription TEXT NOT NULL, '
+                    'timestamp TEXT NOT NULL, '
+                    'PRIMARY KEY (server, collection, subscription))')
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS fulfilments ('
+                    'server TEXT NOT NULL, '
+                    'collection TEXT NOT NULL, '
+                    'subscription TEXT NOT NULL, '
+                    'result_id TEXT NOT NULL, '
+                    'part_number INTEGER NOT NULL, '
+                    'PRIMARY KEY (server, collection, subscription))')
+        finally:
+            connection.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                'SELECT timestamp FROM checkpoints WHERE '
+                'server = ? AND collection = ? AND subscription = ?',
+                tuple(key)).fetchone()
+        finally:
+            connection.close()
+        return parse_timestamp_label(row[0]) if row else None
+
+    def set(self, key, timestamp):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO checkpoints '
+                    '(server, collection, subscription, timestamp) '
+                    'VALUES (?, ?, ?, ?)',
+                    tuple(key) + (timestamp.isoformat(),))
+        finally:
+            connection.close()
+
+    def get_fulfilment(self, key):
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                'SELECT result_id, part_number FROM fulfilments WHERE '
+                'server = ? AND collection = ? AND subscription = ?',
+                tuple(key)).fetchone()
+        finally:
+            connection.close()
+        return tuple(row) if row else None
+
+    def set_fulfilment(self, key, result_id, part_number):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO fulfilments '
+                    '(server, collection, subscription, result_id, '
+                    'part_number) VALUES (?, ?, ?, ?, ?)',
+                    tuple(key) + (result_id, part_number))
+        finally:
+            connection.close()
+
+    def delete_fulfilment(self, key):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    'DELETE FROM fulfilments WHERE '
+                    'server = ? AND collection = ? AND subscription = ?',
+                    tuple(key))
+        finally:
+            connection.close()
+
+
+def open_checkpoint_store(path):
+    '''
+    Open checkpoint store in a file, an SQLite database if file name
+    ends with ``.db``, ``.sqlite`` or ``.sqlite3``, JSON file otherwise.
+    '''
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return SQLiteCheckpointStore(path)
+    return FileCheckpointStore(path)
+
+
+def _join_key(key):
+    # Collection names may contain any character
+    return json.dumps(list(key))
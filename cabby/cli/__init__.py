@@ -5,4 +5,5 @@ from .collections import fetch_collections
 from .poll import poll_content
 from .push import push_content
 from .proxy import proxy_content
+from .scheduler import run_scheduler
 from .subscriptions import manage_subscription
@@ -176,6 +176,8 @@ def run_client(parser, run_func):
         run_func(client, args.uri, args)
     except Exception as e:
         log.error(e, exc_info=args.verbose)
+    finally:
+        client.close()
 
 
 def configure_color_logging(level, logger_name=None):
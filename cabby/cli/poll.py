@@ -6,6 +6,7 @@ import logging
 import hashlib
 import dateutil.parser
 
+from ..checkpoints import open_checkpoint_store
 from .commons import run_client, get_basic_arg_parser
 
 log = logging.getLogger(__name__)
@@ -53,6 +54,13 @@ def extend_arguments(parser):
         "-s", "--subscription", dest="subscription_id",
         help="ID of an existing subscription")
 
+    parser.add_argument(
+        "--checkpoint", dest="checkpoint",
+        help=("file to keep the timestamp of the last polled content block "
+              "in, polling resumes after it on next runs. SQLite database "
+              "if the name ends with .db, .sqlite or .sqlite3, "
+              "JSON file otherwise"))
+
     parser.add_argument(
         "--count-only", dest="count_only", action='store_true',
         help="retrieve only count of content blocks")
@@ -130,14 +138,30 @@ def _runner(client, path, args):
 
         return
 
-    blocks = client.poll(
-        collection_name=args.collection,
-        begin_date=begin,
-        end_date=end,
-        subscription_id=args.subscription_id,
-        uri=path,
-        content_bindings=bindings,
-    )
+    # Raw messages are printed with --raw and hashed for file names
+    client.keep_raw = args.as_raw or bool(args.dest_dir)
+
+    if args.checkpoint:
+        # A batch is checkpointed once all its blocks are processed
+        batches = client.poll_incremental(
+            collection_name=args.collection,
+            checkpoint_store=open_checkpoint_store(args.checkpoint),
+            begin_date=begin,
+            end_date=end,
+            subscription_id=args.subscription_id,
+            uri=path,
+            content_bindings=bindings,
+        )
+        blocks = (block for batch in batches for block in batch)
+    else:
+        blocks = client.poll(
+            collection_name=args.collection,
+            begin_date=begin,
+            end_date=end,
+            subscription_id=args.subscription_id,
+            uri=path,
+            content_bindings=bindings,
+        )
 
     counter = 0
 
@@ -194,6 +194,8 @@ def run_client(parser, run_func):
 
     poll_client = create_client(version=args.poll_taxii_version,
                                 headers=poll_headers)
+    # Only content of polled blocks is pushed further
+    poll_client.keep_raw = False
     inbox_client = create_client(version=args.inbox_taxii_version,
                                  headers=inbox_headers)
 
@@ -239,6 +241,9 @@ def run_client(parser, run_func):
         run_func(poll_client, inbox_client, args)
     except Exception as e:
         log.error(e, exc_info=args.verbose)
+    finally:
+        poll_client.close()
+        inbox_client.close()
 
 
 def proxy_content():
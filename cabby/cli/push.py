@@ -33,6 +33,10 @@ def extend_arguments(parser):
         action='append',
         help="names of the destination collections")
 
+    parser.add_argument(
+        "--gzip", dest="gzip", action='store_true',
+        help="compress request body with gzip")
+
     return parser
 
 
@@ -48,6 +52,7 @@ def _runner(client, path, args):
     else:
         binding = None
 
+    client.compress_requests = args.gzip
     client.push(content, binding, collection_names=args.collections, uri=path)
 
     log.info("Content block successfully pushed")
@@ -0,0 +1,166 @@
+import argparse
+import json
+import logging
+import signal
+import sys
+
+from .. import create_client
+from ..checkpoints import open_checkpoint_store
+from ..scheduler import Scheduler
+from ..sinks import create_sink
+from .commons import configure_color_logging
+
+log = logging.getLogger(__name__)
+
+CLIENT_PARAMS = [
+    'host', 'port', 'discovery_path', 'use_https', 'discovery_url',
+    'version', 'headers']
+
+AUTH_PARAMS = [
+    'ca_cert', 'cert_file', 'key_file', 'key_password', 'username',
+    'password', 'jwt_auth_url', 'verify_ssl']
+
+POLL_PARAMS = ['uri', 'subscription_id', 'content_bindings']
+
+DEFAULT_SINK = 'stdout'
+
+CONFIG_EXAMPLE = '''
+Configuration is a JSON file, for example:
+
+{
+  "workers": 8,
+  "jitter": 0.1,
+  "checkpoint": "/var/lib/taxii/checkpoints.db",
+  "sinks": {
+    "archive": {"type": "directory", "path": "/var/lib/taxii/content"}
+  },
+  "servers": {
+    "example": {
+      "host": "taxii.example.com",
+      "use_https": true,
+      "discovery_path": "/services/discovery",
+      "username": "user",
+      "password": "secret",
+      "max_concurrency": 2,
+      "collections": [
+        {"name": "collection-a", "interval": 300, "sink": "archive"},
+        {"name": "collection-b", "interval": 3600}
+      ]
+    }
+  }
+}
+
+Content of collections without a sink is written to standard output.
+Sink "type" is "stream", "directory" or a "module:ClassName" path of
+a cabby.sinks.Sink subclass, other keys are passed to the sink class.
+'''
+
+
+def get_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Poll TAXII collections on intervals",
+        epilog=CONFIG_EXAMPLE,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument(
+        "-c", "--config", dest="config", required=True,
+        help="path to JSON configuration file")
+
+    parser.add_argument(
+        "-v", "--verbose", dest="verbose",
+        action='store_true',
+        help="verbose mode")
+
+    return parser
+
+
+def create_server_client(config):
+    max_concurrency = config.get('max_concurrency', 1)
+
+    client = create_client(
+        pool_maxsize=max_concurrency,
+        **{key: config[key] for key in CLIENT_PARAMS if key in config})
+
+    client.set_auth(
+        **{key: config[key] for key in AUTH_PARAMS if key in config})
+
+    client.timeout = config.get('timeout')
+    if config.get('proxies'):
+        client.set_proxies(config['proxies'])
+
+    client.content_block_parser = config.get(
+        'content_block_parser', client.content_block_parser)
+    # Sinks only store content
+    client.keep_raw = False
+
+    return client
+
+
+def create_scheduler(config):
+    '''
+    Create :py:class:`cabby.scheduler.Scheduler` from configuration dict.
+    Returns the scheduler and the clients and sinks to close after it
+    stopped.
+    '''
+    checkpoint_store = (
+        open_checkpoint_store(config['checkpoint'])
+        if config.get('checkpoint') else None)
+
+    scheduler = Scheduler(
+        checkpoint_store=checkpoint_store,
+        workers=config.get('workers', 4),
+        jitter=config.get('jitter', 0.1),
+        batch_size=config.get('batch_size', 1000))
+
+    clients = []
+    sinks = {DEFAULT_SINK: create_sink('stream')}
+    for name, params in config.get('sinks', {}).items():
+        params = dict(params)
+        sinks[name] = create_sink(params.pop('type'), **params)
+
+    for server_name, server_config in config['servers'].items():
+        client = create_server_client(server_config)
+        clients.append(client)
+        scheduler.add_server(
+            server_name, client,
+            max_concurrency=server_config.get('max_concurrency', 1))
+
+        for collection in server_config['collections']:
+            sink_name = collection.get('sink', DEFAULT_SINK)
+            if sink_name not in sinks:
+                raise ValueError('Unknown sink "{}"'.format(sink_name))
+
+            scheduler.add_job(
+                server_name, collection['name'], collection['interval'],
+                sinks[sink_name],
+                **{key: collection[key]
+                   for key in POLL_PARAMS if key in collection})
+
+    return scheduler, clients + list(sinks.values())
+
+
+def run_scheduler():
+    args = get_arg_parser().parse_args()
+
+    level = logging.DEBUG if args.verbose else logging.INFO
+    configure_color_logging(level=level)
+
+    try:
+        with open(args.config) as f:
+            scheduler, resources = create_scheduler(json.load(f))
+    except (IOError, KeyError, TypeError, ValueError) as e:
+        log.error("Invalid configuration: %s", e, exc_info=args.verbose)
+        sys.exit(1)
+
+    def stop(signum, frame):
+        log.info("Stopping, waiting for running polls")
+        scheduler.stop()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        scheduler.run()
+    finally:
+        for resource in resources:
+            resource.close()
@@ -4,9 +4,10 @@ import libtaxii.messages_10 as tm10
 from . import constants as const
 from .abstract import AbstractClient
 from .converters import (
-    to_subscription_response_entity, to_content_block_entity,
-    to_collection_entities
+    to_subscription_response_entity, to_collection_entities,
+    extract_raw_content_block
 )
+from .entities import ContentBlock
 from .exceptions import NotSupportedError
 from .utils import (
     pack_content_bindings, get_utc_now, pack_content_binding
@@ -22,13 +23,16 @@ class Client10(AbstractClient):
     taxii_binding = const.XML_10_BINDING
     services_version = const.TAXII_SERVICES_10
 
+    def _prepare_discovery_request(self):
+        return tm10.DiscoveryRequest(message_id=self._generate_id())
+
     def _discovery_request(self, uri):
-        request = tm10.DiscoveryRequest(message_id=self._generate_id())
+        request = self._prepare_discovery_request()
         response = self._execute_request(request, uri=uri)
         return response
 
-    def __subscription_status_request(self, action, collection_name,
-                                      subscription_id=None, uri=None):
+    def _prepare_subscription_request(self, action, collection_name,
+                                      subscription_id=None):
         request_parameters = dict(
             message_id=self._generate_id(),
             action=action,
@@ -36,11 +40,17 @@ class Client10(AbstractClient):
             subscription_id=subscription_id
         )
 
-        request = tm10.ManageFeedSubscriptionRequest(**request_parameters)
+        return tm10.ManageFeedSubscriptionRequest(**request_parameters)
+
+    def __subscription_status_request(self, action, collection_name,
+                                      subscription_id=None, uri=None):
+        request = self._prepare_subscription_request(
+            action, collection_name, subscription_id=subscription_id)
         response = self._execute_request(
             request, uri=uri, service_type=const.SVC_FEED_MANAGEMENT)
 
-        return to_subscription_response_entity(response, version=10)
+        return to_subscription_response_entity(
+            response, version=10, keep_raw=self.keep_raw)
 
     def get_subscription_status(self, collection_name, subscription_id=None,
                                 uri=None):
@@ -152,6 +162,17 @@ class Client10(AbstractClient):
                 no URI provided and client can't discover services
         '''
 
+        request = self._prepare_subscribe_request(
+            collection_name, inbox_service=inbox_service,
+            content_bindings=content_bindings)
+        response = self._execute_request(
+            request, uri=uri, service_type=const.SVC_FEED_MANAGEMENT)
+
+        return to_subscription_response_entity(
+            response, version=10, keep_raw=self.keep_raw)
+
+    def _prepare_subscribe_request(self, collection_name, count_only=False,
+                                   inbox_service=None, content_bindings=None):
         request_parameters = dict(
             message_id=self._generate_id(),
             action=const.ACT_SUBSCRIBE,
@@ -173,11 +194,7 @@ class Client10(AbstractClient):
 
             request_parameters['delivery_parameters'] = delivery_parameters
 
-        request = tm10.ManageFeedSubscriptionRequest(**request_parameters)
-        response = self._execute_request(
-            request, uri=uri, service_type=const.SVC_FEED_MANAGEMENT)
-
-        return to_subscription_response_entity(response, version=10)
+        return tm10.ManageFeedSubscriptionRequest(**request_parameters)
 
     def push(self, content, content_binding, uri=None, timestamp=None):
         '''Push content into Inbox Service.
@@ -210,18 +227,109 @@ class Client10(AbstractClient):
                 no URI provided and client can't discover services
         '''
 
-        content_block = tm10.ContentBlock(
+        inbox_message = self._prepare_inbox_message(
+            content, content_binding, timestamp=timestamp)
+
+        self._execute_request(inbox_message, uri=uri,
+                              service_type=const.SVC_INBOX)
+        self.log.debug("Content block successfully pushed")
+
+    def push_many(self, blocks, max_blocks=100, max_bytes=None, workers=1,
+                  uri=None):
+        '''Push many content blocks into Inbox Service, packing them
+        into Inbox Messages.
+
+        Every Inbox Message holds at most ``max_blocks`` content blocks
+        with at most ``max_bytes`` bytes of content in total, any of the
+        limits can be ``None``. A message rejected by the server does not
+        stop pushing, its status is reported instead, as is a message
+        that failed with an HTTP or connection error.
+
+        With ``workers`` greater than 1, messages are pushed concurrently
+        over the client's connection pool, which should then keep at least
+        ``workers`` connections (``pool_maxsize``). Blocks are read from
+        ``blocks`` only when a worker is free to push them.
+
+        if ``uri`` is not provided, client will try to discover services and
+        find Inbox Service among them.
+
+        :param blocks: iterable of :py:class:`cabby.entities.ContentBlock`
+               entities or ``(content, content_binding)`` and
+               ``(content, content_binding, timestamp)`` tuples
+        :param int max_blocks: maximum number of blocks in a message
+        :param int max_bytes: maximum total content size of a message
+        :param int workers: number of messages pushed concurrently
+        :param str uri: URI path to a specific Inbox Service
+
+        :raises ValueError:
+                if URI provided is invalid or schema is not supported,
+                or if both limits are ``None`` or not positive
+        :raises `cabby.exceptions.HTTPError`:
+                if HTTP error happened while discovering services
+        :raises `cabby.exceptions.ServiceNotFoundError`:
+                if no service found
+        :raises `cabby.exceptions.AmbiguousServicesError`:
+                more than one service with type specified
+        :raises `cabby.exceptions.NoURIProvidedError`:
+                no URI provided and client can't discover services
+
+        :return: status of every Inbox Message sent
+        :rtype: list of :py:class:`cabby.entities.PushStatus`
+        '''
+        return self._push_many(
+            blocks, max_blocks, max_bytes, uri=uri, workers=workers)
+
+    def push_stream(self, blocks, uri=None):
+        '''Push content blocks into Inbox Service in one Inbox Message,
+        streaming it.
+
+        The message is serialized while it is sent, with chunked transfer
+        encoding, reading and serializing one content block at a time,
+        so neither the message nor its body is held in memory at once.
+        As streamed blocks can not be sent again, the request is not
+        retried if JWT token expired.
+
+        if ``uri`` is not provided, client will try to discover services and
+        find Inbox Service among them.
+
+        :param blocks: iterable of :py:class:`cabby.entities.ContentBlock`
+               entities or ``(content, content_binding)`` and
+               ``(content, content_binding, timestamp)`` tuples
+        :param str uri: URI path to a specific Inbox Service
+
+        :raises ValueError:
+                if URI provided is invalid or schema is not supported
+        :raises `cabby.exceptions.HTTPError`:
+                if HTTP error happened
+        :raises `cabby.exceptions.UnsuccessfulStatusError`:
+                if Status Message received and status_type is not `SUCCESS`
+        :raises `cabby.exceptions.ServiceNotFoundError`:
+                if no service found
+        :raises `cabby.exceptions.AmbiguousServicesError`:
+                more than one service with type specified
+        :raises `cabby.exceptions.NoURIProvidedError`:
+                no URI provided and client can't discover services
+        '''
+        self._push_stream(blocks, uri=uri)
+
+    def _prepare_content_block(self, content, content_binding,
+                               timestamp=None):
+        return tm10.ContentBlock(
             content=content,
             content_binding=pack_content_binding(content_binding, version=10),
             timestamp_label=timestamp or get_utc_now()
         )
 
-        inbox_message = tm10.InboxMessage(message_id=self._generate_id(),
-                                          content_blocks=[content_block])
+    def _pack_inbox_message(self, content_blocks, collection_names=None):
+        return tm10.InboxMessage(message_id=self._generate_id(),
+                                 content_blocks=content_blocks)
 
-        self._execute_request(inbox_message, uri=uri,
-                              service_type=const.SVC_INBOX)
-        self.log.debug("Content block successfully pushed")
+    def _prepare_inbox_message(self, content, content_binding,
+                               collection_names=None, timestamp=None):
+        content_block = self._prepare_content_block(
+            content, content_binding, timestamp=timestamp)
+
+        return self._pack_inbox_message([content_block])
 
     def get_collections(self, uri=None):
         '''Get collections from Feed Management Service.
@@ -248,11 +356,15 @@ class Client10(AbstractClient):
                 no URI provided and client can't discover services
         '''
 
-        request = tm10.FeedInformationRequest(message_id=self._generate_id())
+        request = self._prepare_collections_request()
         response = self._execute_request(
             request, uri=uri, service_type=const.SVC_FEED_MANAGEMENT)
 
-        return to_collection_entities(response.feed_informations, version=10)
+        return to_collection_entities(
+            response.feed_informations, version=10, keep_raw=self.keep_raw)
+
+    def _prepare_collections_request(self):
+        return tm10.FeedInformationRequest(message_id=self._generate_id())
 
     def get_content_count(self, *args, **kwargs):
         '''Not supported in TAXII 1.0
@@ -296,6 +408,59 @@ class Client10(AbstractClient):
                 no URI provided and client can't discover services
         '''
 
+        request = self._prepare_poll_request(
+            collection_name,
+            begin_date=begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings)
+        stream = self._execute_request(request, uri=uri,
+                                       service_type=const.SVC_POLL)
+        for obj in stream:
+            if isinstance(obj, ContentBlock):
+                yield obj
+
+    def poll_raw(self, collection_name, begin_date=None, end_date=None,
+                 subscription_id=None, content_bindings=None, uri=None):
+        '''Poll content from Polling Service without building objects.
+
+        Yields ``(binding_id, timestamp, content)`` tuples, where
+        ``timestamp`` is Timestamp Label string as received (or ``None``)
+        and ``content`` is bytes. Suited for mirroring content, as no
+        libtaxii objects, entities or datetimes are created.
+
+        Arguments are the same as for :py:meth:`poll`.
+
+        :raises ValueError:
+                if URI provided is invalid or schema is not supported
+        :raises `cabby.exceptions.HTTPError`:
+                if HTTP error happened
+        :raises `cabby.exceptions.UnsuccessfulStatusError`:
+                if Status Message received and status_type is not `SUCCESS`
+        :raises `cabby.exceptions.ServiceNotFoundError`:
+                if no service found
+        :raises `cabby.exceptions.AmbiguousServicesError`:
+                more than one service with type specified
+        :raises `cabby.exceptions.NoURIProvidedError`:
+                no URI provided and client can't discover services
+        '''
+
+        request = self._prepare_poll_request(
+            collection_name,
+            begin_date=begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings)
+        stream = self._execute_request(
+            request, uri=uri, service_type=const.SVC_POLL,
+            content_block_factory=extract_raw_content_block)
+        for obj in stream:
+            if isinstance(obj, tuple):
+                yield obj
+
+    def _prepare_poll_request(self, collection_name, begin_date=None,
+                              end_date=None, subscription_id=None,
+                              content_bindings=None):
         _bindings = pack_content_bindings(content_bindings, version=10)
         data = dict(
             message_id=self._generate_id(),
@@ -308,12 +473,7 @@ class Client10(AbstractClient):
         if subscription_id:
             data['subscription_id'] = subscription_id
 
-        request = tm10.PollRequest(**data)
-        stream = self._execute_request(request, uri=uri,
-                                       service_type=const.SVC_POLL)
-        for obj in stream:
-            if isinstance(obj, tm10.ContentBlock):
-                yield to_content_block_entity(obj)
+        return tm10.PollRequest(**data)
 
     def fulfilment(self, *args, **kwargs):
         '''Not supported in TAXII 1.0
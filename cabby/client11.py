@@ -1,15 +1,23 @@
 
+from collections import deque
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import libtaxii
 import libtaxii.messages_11 as tm11
 
 from . import constants as const
 from .abstract import AbstractClient
-from .entities import ContentBlockCount
 from .converters import (
-    to_subscription_response_entity, to_content_block_entity,
-    to_collection_entities
+    to_subscription_response_entity, to_collection_entities,
+    to_content_block_count_entity, extract_raw_content_block
 )
+from .entities import ContentBlock
+from .exceptions import UnsuccessfulStatusError
 from .utils import (
-    pack_content_bindings, get_utc_now, pack_content_binding
+    pack_content_bindings, get_utc_now, pack_content_binding,
+    split_time_window
 )
 
 
@@ -22,14 +30,16 @@ class Client11(AbstractClient):
     taxii_binding = const.XML_11_BINDING
     services_version = const.TAXII_SERVICES_11
 
+    def _prepare_discovery_request(self):
+        return tm11.DiscoveryRequest(message_id=self._generate_id())
+
     def _discovery_request(self, uri):
-        request = tm11.DiscoveryRequest(message_id=self._generate_id())
+        request = self._prepare_discovery_request()
         response = self._execute_request(request, uri=uri)
         return response
 
-    def __subscription_status_request(self, action, collection_name,
-                                      subscription_id=None, uri=None):
-
+    def _prepare_subscription_request(self, action, collection_name,
+                                      subscription_id=None):
         request_params = dict(
             message_id=self._generate_id(),
             action=action,
@@ -37,12 +47,19 @@ class Client11(AbstractClient):
             subscription_id=subscription_id
         )
 
-        request = tm11.ManageCollectionSubscriptionRequest(**request_params)
+        return tm11.ManageCollectionSubscriptionRequest(**request_params)
+
+    def __subscription_status_request(self, action, collection_name,
+                                      subscription_id=None, uri=None):
+
+        request = self._prepare_subscription_request(
+            action, collection_name, subscription_id=subscription_id)
         response = self._execute_request(
             request, uri=uri,
             service_type=const.SVC_COLLECTION_MANAGEMENT)
 
-        return to_subscription_response_entity(response, version=11)
+        return to_subscription_response_entity(
+            response, version=11, keep_raw=self.keep_raw)
 
     def get_subscription_status(self, collection_name,
                                 subscription_id=None, uri=None):
@@ -219,6 +236,19 @@ class Client11(AbstractClient):
                 no URI provided and client can't discover services
         '''
 
+        request = self._prepare_subscribe_request(
+            collection_name, count_only=count_only,
+            inbox_service=inbox_service, content_bindings=content_bindings)
+        response = self._execute_request(
+            request, uri=uri,
+            service_type=const.SVC_COLLECTION_MANAGEMENT)
+
+        return to_subscription_response_entity(
+            response, version=11, keep_raw=self.keep_raw)
+
+    def _prepare_subscribe_request(self, collection_name, count_only=False,
+                                   inbox_service=None, content_bindings=None):
+
         response_type = const.RT_COUNT_ONLY if count_only else const.RT_FULL
 
         sparams = tm11.SubscriptionParameters(
@@ -243,12 +273,7 @@ class Client11(AbstractClient):
                 delivery_message_binding=binding
             )
 
-        request = tm11.ManageCollectionSubscriptionRequest(**rparams)
-        response = self._execute_request(
-            request, uri=uri,
-            service_type=const.SVC_COLLECTION_MANAGEMENT)
-
-        return to_subscription_response_entity(response, version=11)
+        return tm11.ManageCollectionSubscriptionRequest(**rparams)
 
     def get_collections(self, uri=None):
         '''Get collections from Collection Management Service.
@@ -275,15 +300,19 @@ class Client11(AbstractClient):
                 no URI provided and client can't discover services
         '''
 
-        request = tm11.CollectionInformationRequest(
-            message_id=self._generate_id())
+        request = self._prepare_collections_request()
 
         response = self._execute_request(
             request, uri=uri,
             service_type=const.SVC_COLLECTION_MANAGEMENT)
 
-        return to_collection_entities(response.collection_informations,
-                                      version=11)
+        return to_collection_entities(
+            response.collection_informations, version=11,
+            keep_raw=self.keep_raw)
+
+    def _prepare_collections_request(self):
+        return tm11.CollectionInformationRequest(
+            message_id=self._generate_id())
 
     def push(self, content, content_binding, collection_names=None,
              timestamp=None, uri=None):
@@ -316,22 +345,123 @@ class Client11(AbstractClient):
                 no URI provided and client can't discover services
         '''
 
-        content_block = tm11.ContentBlock(
+        inbox_message = self._prepare_inbox_message(
+            content, content_binding, collection_names=collection_names,
+            timestamp=timestamp)
+
+        self._execute_request(inbox_message, uri=uri,
+                              service_type=const.SVC_INBOX)
+
+        self.log.debug("Content block successfully pushed")
+
+    def push_many(self, blocks, collection_names=None, max_blocks=100,
+                  max_bytes=None, workers=1, uri=None):
+        '''Push many content blocks into Inbox Service, packing them
+        into Inbox Messages.
+
+        Every Inbox Message holds at most ``max_blocks`` content blocks
+        with at most ``max_bytes`` bytes of content in total, any of the
+        limits can be ``None``. A block larger than ``max_bytes`` is sent
+        in a message on its own. A message rejected by the server does not
+        stop pushing, its status is reported instead, as is a message
+        that failed with an HTTP or connection error.
+
+        With ``workers`` greater than 1, messages are pushed concurrently
+        over the client's connection pool, which should then keep at least
+        ``workers`` connections (``pool_maxsize``). Blocks are read from
+        ``blocks`` only when a worker is free to push them.
+
+        if ``uri`` is not provided, client will try to discover
+        services and find Inbox Service among them.
+
+        :param blocks: iterable of :py:class:`cabby.entities.ContentBlock`
+               entities or ``(content, content_binding)`` and
+               ``(content, content_binding, timestamp)`` tuples
+        :param list collection_names:
+                destination collection names
+        :param int max_blocks: maximum number of blocks in a message
+        :param int max_bytes: maximum total content size of a message
+        :param int workers: number of messages pushed concurrently
+        :param str uri: URI path to a specific Inbox Service
+
+        :raises ValueError:
+                if URI provided is invalid or schema is not supported,
+                or if both limits are ``None`` or not positive
+        :raises `cabby.exceptions.HTTPError`:
+                if HTTP error happened while discovering services
+        :raises `cabby.exceptions.ServiceNotFoundError`:
+                if no service found
+        :raises `cabby.exceptions.AmbiguousServicesError`:
+                more than one service with type specified
+        :raises `cabby.exceptions.NoURIProvidedError`:
+                no URI provided and client can't discover services
+
+        :return: status of every Inbox Message sent
+        :rtype: list of :py:class:`cabby.entities.PushStatus`
+        '''
+        return self._push_many(
+            blocks, max_blocks, max_bytes, uri=uri,
+            collection_names=collection_names, workers=workers)
+
+    def push_stream(self, blocks, collection_names=None, uri=None):
+        '''Push content blocks into Inbox Service in one Inbox Message,
+        streaming it.
+
+        The message is serialized while it is sent, with chunked transfer
+        encoding, reading and serializing one content block at a time,
+        so neither the message nor its body is held in memory at once.
+        As streamed blocks can not be sent again, the request is not
+        retried if JWT token expired.
+
+        if ``uri`` is not provided, client will try to discover
+        services and find Inbox Service among them.
+
+        :param blocks: iterable of :py:class:`cabby.entities.ContentBlock`
+               entities or ``(content, content_binding)`` and
+               ``(content, content_binding, timestamp)`` tuples
+        :param list collection_names:
+                destination collection names
+        :param str uri: URI path to a specific Inbox Service
+
+        :raises ValueError:
+                if URI provided is invalid or schema is not supported
+        :raises `cabby.exceptions.HTTPError`:
+                if HTTP error happened
+        :raises `cabby.exceptions.UnsuccessfulStatusError`:
+                if Status Message received and status_type is not `SUCCESS`
+        :raises `cabby.exceptions.ServiceNotFoundError`:
+                if no service found
+        :raises `cabby.exceptions.AmbiguousServicesError`:
+                more than one service with type specified
+        :raises `cabby.exceptions.NoURIProvidedError`:
+                no URI provided and client can't discover services
+        '''
+        self._push_stream(blocks, uri=uri, collection_names=collection_names)
+
+    def _prepare_content_block(self, content, content_binding,
+                               timestamp=None):
+        return tm11.ContentBlock(
             content=content,
             content_binding=pack_content_binding(content_binding, version=11),
             timestamp_label=timestamp or get_utc_now()
         )
 
+    def _pack_inbox_message(self, content_blocks, collection_names=None):
         inbox_message = tm11.InboxMessage(message_id=self._generate_id(),
-                                          content_blocks=[content_block])
+                                          content_blocks=content_blocks)
 
         if collection_names:
             inbox_message.destination_collection_names.extend(collection_names)
 
-        self._execute_request(inbox_message, uri=uri,
-                              service_type=const.SVC_INBOX)
+        return inbox_message
 
-        self.log.debug("Content block successfully pushed")
+    def _prepare_inbox_message(self, content, content_binding,
+                               collection_names=None, timestamp=None):
+        content_block = self._prepare_content_block(
+            content, content_binding, timestamp=timestamp)
+
+        return self._pack_inbox_message(
+            [content_block], collection_names=collection_names)
 
     def _prepare_poll_request(self, collection_name, begin_date=None,
                               end_date=None, subscription_id=None,
@@ -425,17 +555,134 @@ class Client11(AbstractClient):
 
         for obj in response:
             if isinstance(obj, tm11.PollResponse):
-                if obj.record_count:
-                    return ContentBlockCount(
-                        count=obj.record_count.record_count,
-                        is_partial=obj.record_count.partial_count
-                    )
-                else:
-                    return None
+                return to_content_block_count_entity(
+                    obj.record_count, keep_raw=self.keep_raw)
+
+    def plan_poll_windows(self, collection_name, begin_date, end_date=None,
+                          max_count=10000, min_window=timedelta(seconds=1),
+                          subscription_id=None, content_bindings=None,
+                          uri=None):
+        '''Split time window into sub-windows small enough to be polled.
+
+        Content blocks in ``[begin_date, end_date]`` window are counted
+        with :py:meth:`get_content_count` and the window is bisected
+        until every sub-window holds at most ``max_count`` blocks.
+        Partial counts are treated as too large. Windows shorter than
+        ``min_window`` are not split further, whatever their count.
+
+        :param str collection_name: collection to poll
+        :param datetime begin_date: ask only for content blocks created
+               after `begin_date` (exclusive)
+        :param datetime end_date: ask only for content blocks created
+               before `end_date` (inclusive), current UTC time by default
+        :param int max_count: target maximum number of blocks in a window
+        :param timedelta min_window: shortest window to split
+        :param str subscription_id: ID of the existing subscription
+        :param list content_bindings: list of stings or
+               :py:class:`cabby.entities.ContentBinding` objects
+        :param str uri: URI path to a specific Polling Service
+
+        :raises ValueError:
+                if ``max_count`` is not positive or the window is empty
+
+        :return: contiguous ``(begin_date, end_date)`` windows in
+                 chronological order
+        :rtype: list
+        '''
+        if max_count < 1:
+            raise ValueError('Maximum count should be positive')
+
+        end_date = end_date or get_utc_now()
+        uri = uri or self._get_service(const.SVC_POLL).address
+
+        windows = []
+        pending = split_time_window(begin_date, end_date, 1)
+
+        while pending:
+            window = pending.pop()
+            count = self.get_content_count(
+                collection_name,
+                begin_date=window[0],
+                end_date=window[1],
+                subscription_id=subscription_id,
+                content_bindings=content_bindings,
+                uri=uri)
+
+            too_large = count is not None and (
+                count.count > max_count or count.is_partial)
+
+            if too_large and window[1] - window[0] > min_window:
+                # Earlier half is checked first
+                pending.extend(reversed(
+                    split_time_window(window[0], window[1], 2)))
+            else:
+                windows.append(window)
+
+        self.log.info("Poll window split into %d windows", len(windows))
+
+        return windows
+
+    def poll_adaptive(self, collection_name, begin_date, end_date=None,
+                      max_count=10000, min_window=timedelta(seconds=1),
+                      workers=1, ordered=True, subscription_id=None,
+                      content_bindings=None, uri=None):
+        '''Poll content from Polling Service in windows bounded by
+        content count.
+
+        The window is split with :py:meth:`plan_poll_windows` and
+        sub-windows are polled with :py:meth:`poll` in a pool of
+        ``workers`` threads, as in
+        :py:meth:`cabby.abstract.AbstractClient.poll_sharded`.
+        With ``ordered`` set, at most ``workers`` windows of at most
+        ``max_count`` blocks are buffered at a time.
+
+        :param str collection_name: collection to poll
+        :param datetime begin_date: ask only for content blocks created
+               after `begin_date` (exclusive)
+        :param datetime end_date: ask only for content blocks created
+               before `end_date` (inclusive), current UTC time by default
+        :param int max_count: target maximum number of blocks in a window
+        :param timedelta min_window: shortest window to split
+        :param int workers: number of windows polled concurrently
+        :param bool ordered: yield blocks ordered by timestamp label
+        :param str subscription_id: ID of the existing subscription
+        :param list content_bindings: list of stings or
+               :py:class:`cabby.entities.ContentBinding` objects
+        :param str uri: URI path to a specific Polling Service
+
+        :raises ValueError:
+                if URI provided is invalid or schema is not supported
+        :raises `cabby.exceptions.HTTPError`:
+                if HTTP error happened
+        :raises `cabby.exceptions.UnsuccessfulStatusError`:
+                if Status Message received and status_type is not `SUCCESS`
+        :raises `cabby.exceptions.ServiceNotFoundError`:
+                if no service found
+        :raises `cabby.exceptions.AmbiguousServicesError`:
+                more than one service with type specified
+        :raises `cabby.exceptions.NoURIProvidedError`:
+                no URI provided and client can't discover services
+        '''
+        uri = uri or self._get_service(const.SVC_POLL).address
+
+        windows = self.plan_poll_windows(
+            collection_name, begin_date,
+            end_date=end_date,
+            max_count=max_count,
+            min_window=min_window,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings,
+            uri=uri)
+
+        return self._poll_windows(
+            collection_name, windows, workers, ordered,
+            subscription_id=subscription_id,
+            content_bindings=content_bindings,
+            uri=uri)
 
     def poll(self, collection_name, begin_date=None, end_date=None,
              subscription_id=None, inbox_service=None,
-             content_bindings=None, uri=None):
+             content_bindings=None, uri=None, prefetch=None):
         '''Poll content from Polling Service.
 
         if ``uri`` is not provided, client will try to discover services and
@@ -456,6 +703,14 @@ class Client11(AbstractClient):
         :param list content_bindings: list of stings or
                :py:class:`cabby.entities.ContentBinding` objects
         :param str uri: URI path to a specific Inbox Service
+        :param int prefetch: number of result parts to request concurrently
+               when the response is served in multiple parts. Only parts
+               known to exist are requested: the part after a part with
+               ``more`` flag, and parts within the exact record count of
+               the result, assuming parts of the first part's size.
+               Blocks are still yielded in part order, at most
+               ``prefetch`` parts are buffered in memory. Should not
+               exceed client's ``pool_maxsize``.
 
         :raises ValueError:
                 if URI provided is invalid or schema is not supported
@@ -484,14 +739,27 @@ class Client11(AbstractClient):
         stream = self._execute_request(request, uri=uri,
                                        service_type=const.SVC_POLL)
         response = None
+        first_part_size = 0
         for obj in stream:
-            if isinstance(obj, tm11.ContentBlock):
-                yield to_content_block_entity(obj)
+            if isinstance(obj, ContentBlock):
+                first_part_size += 1
+                yield obj
             else:
                 response = obj
                 break
 
-        if response and response.more:
+        if response and response.more and prefetch:
+            parts = self._prefetch_parts(
+                collection_name, response.result_id,
+                response.result_part_number + 1, prefetch,
+                last_part=self._estimate_last_part(
+                    response, first_part_size),
+                uri=uri)
+            for blocks in parts:
+                for block in blocks:
+                    yield block
+
+        elif response and response.more:
             part = response.result_part_number
 
             while True:
@@ -513,6 +781,63 @@ class Client11(AbstractClient):
                 if not has_data:
                     break
 
+    def poll_raw(self, collection_name, begin_date=None, end_date=None,
+                 subscription_id=None, inbox_service=None,
+                 content_bindings=None, uri=None):
+        '''Poll content from Polling Service without building objects.
+
+        Yields ``(binding_id, timestamp, content)`` tuples, where
+        ``timestamp`` is Timestamp Label string as received (or ``None``)
+        and ``content`` is bytes. Suited for mirroring content, as no
+        libtaxii objects, entities or datetimes are created. Result parts
+        are fetched one by one with Poll Fulfillment requests.
+
+        Arguments are the same as for :py:meth:`poll`.
+
+        :raises ValueError:
+                if URI provided is invalid or schema is not supported
+        :raises `cabby.exceptions.HTTPError`:
+                if HTTP error happened
+        :raises `cabby.exceptions.UnsuccessfulStatusError`:
+                if Status Message received and status_type is not `SUCCESS`
+        :raises `cabby.exceptions.ServiceNotFoundError`:
+                if no service found
+        :raises `cabby.exceptions.AmbiguousServicesError`:
+                more than one service with type specified
+        :raises `cabby.exceptions.NoURIProvidedError`:
+                no URI provided and client can't discover services
+        '''
+
+        request = self._prepare_poll_request(
+            collection_name,
+            begin_date=begin_date,
+            end_date=end_date,
+            subscription_id=subscription_id,
+            inbox_service=inbox_service,
+            content_bindings=content_bindings,
+            count_only=False
+        )
+        part = None
+
+        while True:
+            stream = self._execute_request(
+                request, uri=uri, service_type=const.SVC_POLL,
+                content_block_factory=extract_raw_content_block)
+
+            response = None
+            for obj in stream:
+                if isinstance(obj, tm11.PollResponse):
+                    response = obj
+                else:
+                    yield obj
+
+            if not response or not response.more:
+                break
+
+            part = (part or response.result_part_number) + 1
+            request = self._prepare_fulfilment_request(
+                collection_name, response.result_id, part)
+
     def fulfilment(self, collection_name, result_id, part_number=1, uri=None):
         '''Poll content from Polling Service as a part of fulfilment process.
 
@@ -538,20 +863,192 @@ class Client11(AbstractClient):
                 no URI provided and client can't discover services
         '''
 
-        request = tm11.PollFulfillmentRequest(
+        request = self._prepare_fulfilment_request(
+            collection_name, result_id, part_number)
+
+        stream = self._execute_request(request, uri=uri,
+                                       service_type=const.SVC_POLL)
+
+        for obj in stream:
+            if isinstance(obj, tm11.PollResponse):
+                # Verify if more ContentBlocks are available
+                if not obj.more:
+                    yield
+            elif isinstance(obj, ContentBlock):
+                yield obj
+
+    def _prepare_fulfilment_request(self, collection_name, result_id,
+                                    part_number):
+        return tm11.PollFulfillmentRequest(
             message_id=self._generate_id(),
             collection_name=collection_name,
             result_id=result_id,
             result_part_number=part_number
         )
 
+    def _fetch_part(self, collection_name, result_id, part_number, uri=None,
+                    stopped=None):
+        request = self._prepare_fulfilment_request(
+            collection_name, result_id, part_number)
+
         stream = self._execute_request(request, uri=uri,
                                        service_type=const.SVC_POLL)
 
+        blocks = []
+        more = False
         for obj in stream:
+            if stopped is not None and stopped.is_set():
+                # Nobody waits for the part anymore, drop the response
+                stream.close()
+                break
             if isinstance(obj, tm11.PollResponse):
-                # Verify if more ContentBlocks are available
-                if not obj.more:
-                    yield
-            elif isinstance(obj, tm11.ContentBlock):
-                yield to_content_block_entity(obj)
+                more = obj.more
+            elif isinstance(obj, ContentBlock):
+                blocks.append(obj)
+
+        return blocks, more
+
+    @staticmethod
+    def _estimate_last_part(response, part_size):
+        # Last part number implied by the exact record count of a result
+        # served in parts of ``part_size`` blocks
+        record_count = response.record_count
+        if (not part_size or record_count is None
+                or record_count.partial_count):
+            return None
+
+        parts = -(-record_count.record_count // part_size)
+        return response.result_part_number + parts - 1
+
+    def _poll_result_parts(self, collection_name, checkpoint_store, key,
+                           uri=None, **kwargs):
+        first_part = None
+
+        request = self._resume_result_request(
+            collection_name, checkpoint_store, key)
+        if request is not None:
+            try:
+                first_part = self._request_result_part(request, uri)
+            except UnsuccessfulStatusError as e:
+                self._discard_result_progress(e, checkpoint_store, key)
+
+        if first_part is None:
+            request = self._prepare_poll_request(
+                collection_name, count_only=False, **kwargs)
+            first_part = self._request_result_part(request, uri)
+
+        blocks, part = first_part
+        yield blocks, part
+
+        request = self._next_part_request(collection_name, part)
+        while request is not None:
+            blocks, part = self._request_result_part(request, uri)
+            yield blocks, part
+            request = self._next_part_request(collection_name, part)
+
+    def _resume_result_request(self, collection_name, checkpoint_store, key):
+        # Request for the first part of the result not completely
+        # acknowledged by the previous incremental poll, if any
+        progress = checkpoint_store.get_fulfilment(key)
+        if not progress:
+            return None
+
+        result_id, part_number = progress
+        self.log.info("Resuming poll result %s from part %d",
+                      result_id, part_number + 1)
+        return self._prepare_fulfilment_request(
+            collection_name, result_id, part_number + 1)
+
+    def _discard_result_progress(self, error, checkpoint_store, key):
+        # Poll again if the server does not have the result anymore
+        if error.status not in (libtaxii.ST_NOT_FOUND,
+                                libtaxii.ST_INVALID_RESPONSE_PART):
+            raise error
+        self.log.warning(
+            "Poll result %s is not available, polling again",
+            checkpoint_store.get_fulfilment(key)[0])
+        checkpoint_store.delete_fulfilment(key)
+
+    def _next_part_request(self, collection_name, part):
+        # Request for the part following a consumed ``part``, if any
+        if not part.get('more'):
+            return None
+        return self._prepare_fulfilment_request(
+            collection_name, part['result_id'], part['part_number'] + 1)
+
+    def _request_result_part(self, request, uri=None):
+        stream = self._execute_request(request, uri=uri,
+                                       service_type=const.SVC_POLL)
+        part = {}
+
+        def iter_blocks():
+            for obj in stream:
+                if isinstance(obj, tm11.PollResponse):
+                    _update_result_part(part, obj)
+                else:
+                    yield obj
+
+        return iter_blocks(), part
+
+    def _prefetch_parts(self, collection_name, result_id, first_part,
+                        prefetch, last_part=None, uri=None):
+        '''
+        Fetch result parts concurrently, keeping up to ``prefetch``
+        Poll Fulfillment requests in flight, and yield lists of blocks
+        in part order.
+
+        ``first_part`` is known to exist, as are parts up to
+        ``last_part`` if provided. Further parts are requested only
+        after a previous part reports there is more.
+        '''
+        executor = ThreadPoolExecutor(max_workers=prefetch)
+        stopped = threading.Event()
+        pending = deque()
+        next_part = first_part
+        known_last_part = max(first_part, last_part or first_part)
+
+        def submit(part_number):
+            return part_number, executor.submit(
+                self._fetch_part, collection_name, result_id, part_number,
+                uri=uri, stopped=stopped)
+
+        try:
+            while True:
+                while len(pending) < prefetch and (
+                        next_part <= known_last_part):
+                    pending.append(submit(next_part))
+                    next_part += 1
+
+                if not pending:
+                    break
+
+                part_number, future = pending.popleft()
+                blocks, more = future.result()
+
+                if more:
+                    known_last_part = max(known_last_part, part_number + 1)
+                    if next_part <= known_last_part:
+                        # Fetch the next part while blocks are consumed
+                        pending.append(submit(next_part))
+                        next_part += 1
+
+                yield blocks
+
+                if not more:
+                    break
+        finally:
+            # Consumer stopped early or the result ended before the
+            # estimated last part: do not wait for the rest
+            stopped.set()
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+
+def _update_result_part(part, response):
+    # Fill in result part details from its Poll Response
+    part.update(
+        result_id=response.result_id,
+        part_number=response.result_part_number,
+        more=response.more,
+        end=response.inclusive_end_timestamp_label)
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from six.moves import queue
+
+
+_DONE = object()
+
+# How often blocked workers check if the consumer went away
+_POLL_INTERVAL = 0.1
+
+
+def map_in_order(func, items, workers):
+    '''
+    Apply ``func`` to ``items`` in a pool of ``workers`` threads and
+    yield results in the order of ``items``.
+
+    At most ``workers`` results are computed ahead of the consumer.
+    '''
+    items = iter(items)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+
+    def submit_next():
+        item = next(items, _DONE)
+        if item is not _DONE:
+            pending.append(executor.submit(func, item))
+
+    try:
+        for _ in range(workers):
+            submit_next()
+
+        while pending:
+            result = pending.popleft().result()
+            submit_next()
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def merge_as_completed(generator_funcs, workers, queue_size=None):
+    '''
+    Run generator functions in a pool of ``workers`` threads and yield
+    their items as soon as they are produced.
+
+    Items are passed through a queue bounded by ``queue_size``
+    (``workers`` by default), so producers are blocked while
+    the consumer is busy. The first exception raised by any of
+    the generators is re-raised to the consumer.
+    '''
+    results = queue.Queue(maxsize=queue_size or workers)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                results.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(generator_func):
+        if stopped.is_set():
+            return
+        try:
+            for item in generator_func():
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((_DONE, e))
+        else:
+            put((_DONE, None))
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    running = len([executor.submit(run, func) for func in generator_funcs])
+
+    try:
+        while running:
+            item, error = results.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                running -= 1
+            else:
+                yield item
+    finally:
+        stopped.set()
+        executor.shutdown(wait=True)
+
+
+async def map_in_order_async(func, items, workers):
+    '''
+    Asynchronous version of :py:func:`map_in_order`, running at most
+    ``workers`` ``func`` coroutines as tasks. ``items`` is an
+    asynchronous iterable.
+    '''
+    items = items.__aiter__()
+    pending = deque()
+
+    async def submit_next():
+        try:
+            item = await items.__anext__()
+        except StopAsyncIteration:
+            return
+        pending.append(asyncio.ensure_future(func(item)))
+
+    try:
+        for _ in range(workers):
+            await submit_next()
+
+        while pending:
+            result = await pending.popleft()
+            await submit_next()
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def merge_as_completed_async(generator_funcs, workers, queue_size=None):
+    '''
+    Asynchronous version of :py:func:`merge_as_completed`, iterating
+    at most ``workers`` asynchronous generators at a time.
+    '''
+    results = asyncio.Queue(maxsize=queue_size or workers)
+    semaphore = asyncio.Semaphore(workers)
+
+    async def run(generator_func):
+        async with semaphore:
+            try:
+                async for item in generator_func():
+                    await results.put((item, None))
+            except Exception as e:
+                await results.put((_DONE, e))
+            else:
+                await results.put((_DONE, None))
+
+    tasks = [asyncio.ensure_future(run(func)) for func in generator_funcs]
+    running = len(tasks)
+
+    try:
+        while running:
+            item, error = await results.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                running -= 1
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
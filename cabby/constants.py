@@ -128,6 +128,9 @@ SS_PAUSED = 'PAUSED'
 # Subscription Status of Unsubscribed
 SS_UNSUBSCRIBED = 'UNSUBSCRIBED'
 
+# Status Type of Success
+ST_SUCCESS = 'SUCCESS'
+
 
 # Constant identifying a response type of Full
 RT_FULL = 'FULL'
@@ -1,19 +1,29 @@
+from functools import partial
+
 import six
-from six.moves import map
+from lxml import etree
 
 from . import constants as const
 from .entities import (
     ContentBinding, Collection, PushMethod,
     Subscription, ServiceInstance,
     InboxDetailedService, DetailedServiceInstance, ContentBlock,
-    InboxService, SubscriptionParameters, SubscriptionResponse)
+    LazyContentBlock, ContentBlockCount, InboxService, SubscriptionParameters,
+    SubscriptionResponse)
+
+
+def _set_raw(entity, raw, keep_raw):
+    if keep_raw:
+        entity.raw = raw
+    return entity
 
 
-def to_collection_entities(collections, version):
-    return [to_collection_entity(c, version) for c in collections]
+def to_collection_entities(collections, version, keep_raw=True):
+    return [to_collection_entity(c, version, keep_raw=keep_raw)
+            for c in collections]
 
 
-def to_collection_entity(collection, version):
+def to_collection_entity(collection, version, keep_raw=True):
 
     push_methods = []
     for pm in collection.push_methods:
@@ -21,7 +31,7 @@ def to_collection_entity(collection, version):
             protocol=pm.push_protocol,
             message_bindings=pm.push_message_bindings
         )
-        method.raw = pm
+        _set_raw(method, pm, keep_raw)
         push_methods.append(method)
 
     subscription_methods = []
@@ -31,11 +41,11 @@ def to_collection_entity(collection, version):
             address=sm.subscription_address,
             message_bindings=sm.subscription_message_bindings
         )
-        instance.raw = sm
+        _set_raw(instance, sm, keep_raw)
         subscription_methods.append(instance)
 
     content_bindings = to_content_binding_entities(
-        collection.supported_contents)
+        collection.supported_contents, keep_raw=keep_raw)
 
     polling_services = []
     for i in collection.polling_service_instances:
@@ -44,7 +54,7 @@ def to_collection_entity(collection, version):
             address=i.poll_address,
             message_bindings=i.poll_message_bindings
         )
-        instance.raw = i
+        _set_raw(instance, i, keep_raw)
         polling_services.append(instance)
 
     if version == 10:
@@ -67,7 +77,7 @@ def to_collection_entity(collection, version):
                 address=inbox.inbox_address,
                 message_bindings=inbox.inbox_message_bindings,
                 content_bindings=to_content_binding_entities(
-                    inbox.supported_contents)
+                    inbox.supported_contents, keep_raw=keep_raw)
             ))
 
     collection_entity = Collection(
@@ -82,29 +92,49 @@ def to_collection_entity(collection, version):
         volume=volume,
         receiving_inboxes=inboxes
     )
-    collection_entity.raw = collection
+    return _set_raw(collection_entity, collection, keep_raw)
 
-    return collection_entity
 
-
-def to_content_binding_entity(raw_binding):
+def to_content_binding_entity(raw_binding, keep_raw=True,
+                              binding_cache=None):
 
     if isinstance(raw_binding, six.string_types):
-        binding = ContentBinding(raw_binding)
+        binding_id, subtypes = raw_binding, None
     else:
-        binding = ContentBinding(
-            id=raw_binding.binding_id,
-            subtypes=raw_binding.subtype_ids)
-
-    binding.raw = raw_binding
+        binding_id, subtypes = raw_binding.binding_id, raw_binding.subtype_ids
+
+    if binding_cache is None:
+        binding = ContentBinding(binding_id, subtypes=subtypes)
+        return _set_raw(binding, raw_binding, keep_raw)
+
+    return get_shared_content_binding(
+        binding_cache, binding_id, subtypes,
+        raw=raw_binding if keep_raw else None)
+
+
+def get_shared_content_binding(binding_cache, binding_id, subtypes=None,
+                               raw=None):
+    '''
+    Get Content Binding entity from ``binding_cache`` dict, creating it
+    on first use, so that equal bindings share one entity. Shared
+    entities must not be modified.
+    '''
+    key = (binding_id, tuple(subtypes or ()))
+    binding = binding_cache.get(key)
+    if binding is None:
+        binding = binding_cache[key] = ContentBinding(
+            binding_id, subtypes=subtypes)
+        if raw is not None:
+            binding.raw = raw
     return binding
 
 
-def to_content_binding_entities(raw_bindings):
-    return list(map(to_content_binding_entity, raw_bindings))
+def to_content_binding_entities(raw_bindings, keep_raw=True):
+    return [to_content_binding_entity(b, keep_raw=keep_raw)
+            for b in raw_bindings]
 
 
-def to_detailed_service_instance_entity(service):
+def to_detailed_service_instance_entity(service, keep_raw=True):
 
     params = dict(
         type=service.service_type,
@@ -120,14 +150,11 @@ def to_detailed_service_instance_entity(service):
         cls = InboxDetailedService
 
         params['content_bindings'] = to_content_binding_entities(
-            service.inbox_service_accepted_content)
+            service.inbox_service_accepted_content, keep_raw=keep_raw)
     else:
         cls = DetailedServiceInstance
 
-    instance = cls(**params)
-    instance.raw = service
-
-    return instance
+    return _set_raw(cls(**params), service, keep_raw)
 
 
 def convert_to_bytes(content):
@@ -136,17 +163,176 @@ def convert_to_bytes(content):
     return content
 
 
-def to_content_block_entity(block):
+def to_content_block_entity(block, keep_raw=True, binding_cache=None):
     b = ContentBlock(
         content=convert_to_bytes(block.content),
-        content_binding=to_content_binding_entity(block.content_binding),
+        content_binding=to_content_binding_entity(
+            block.content_binding, keep_raw=keep_raw,
+            binding_cache=binding_cache),
         timestamp=block.timestamp_label,
     )
-    b.raw = block
-    return b
+    return _set_raw(b, block, keep_raw)
+
+
+def to_content_block_entity_from_etree(namespace, elem, keep_raw=True,
+                                       binding_cache=None):
+    '''
+    Convert Content Block element to an entity via libtaxii objects.
+    '''
+    module = const.MODULES[namespace]
+    return to_content_block_entity(
+        module.ContentBlock.from_etree(elem), keep_raw=keep_raw,
+        binding_cache=binding_cache)
+
+
+def extract_content_block_entity(namespace, elem, keep_raw=True,
+                                 binding_cache=None):
+    '''
+    Convert Content Block element to an entity directly.
+
+    Faster than :py:func:`to_content_block_entity_from_etree`, as
+    no libtaxii objects are built. ``raw`` attributes are not set and
+    text content is returned as received, without libtaxii attempt
+    to re-serialize it as XML. Timestamp labels are parsed on first access.
+    '''
+    binding = elem.find('{%s}Content_Binding' % namespace)
+    content = elem.find('{%s}Content' % namespace)
+
+    if binding is None or content is None:
+        # Let libtaxii report malformed blocks
+        return to_content_block_entity_from_etree(
+            namespace, elem, keep_raw=keep_raw, binding_cache=binding_cache)
+
+    binding_id, subtypes = _read_content_binding(namespace, binding)
+    if binding_cache is None:
+        content_binding = ContentBinding(binding_id, subtypes=subtypes)
+    else:
+        content_binding = get_shared_content_binding(
+            binding_cache, binding_id, subtypes)
+
+    return ContentBlock(
+        content=_extract_content_bytes(content),
+        content_binding=content_binding,
+        timestamp=None,
+        timestamp_label=elem.findtext('{%s}Timestamp_Label' % namespace),
+    )
+
+
+def to_lazy_content_block_entity(namespace, elem, keep_raw=True,
+                                 binding_cache=None):
+    '''
+    Convert Content Block element to a
+    :py:class:`cabby.entities.LazyContentBlock`, which keeps the element
+    serialized and converts its fields on first access. ``raw`` is
+    ``None`` unless ``keep_raw`` is set.
+    '''
+    binding = elem.find('{%s}Content_Binding' % namespace)
+
+    if binding is None or elem.find('{%s}Content' % namespace) is None:
+        # Let libtaxii report malformed blocks
+        return to_content_block_entity_from_etree(
+            namespace, elem, keep_raw=keep_raw, binding_cache=binding_cache)
+
+    binding_id, subtypes = _read_content_binding(namespace, binding)
+
+    block = LazyContentBlock(
+        namespace,
+        etree.tostring(elem, encoding='utf-8', with_tail=False),
+        binding_id,
+        subtypes=subtypes,
+        timestamp_label=elem.findtext('{%s}Timestamp_Label' % namespace))
+
+    if binding_cache is not None:
+        block.binding = get_shared_content_binding(
+            binding_cache, binding_id, subtypes)
+
+    if not keep_raw:
+        # Shadows lazily built libtaxii object
+        block.raw = None
+
+    return block
+
+
+def extract_raw_content_block(namespace, elem):
+    '''
+    Convert Content Block element to a ``(binding_id, timestamp, content)``
+    tuple, with timestamp left as received string (or ``None``) and
+    content as bytes. Neither libtaxii objects nor entities are built.
+    '''
+    binding = elem.find('{%s}Content_Binding' % namespace)
+    content = elem.find('{%s}Content' % namespace)
+
+    if binding is None or content is None:
+        # Let libtaxii report malformed blocks
+        block = const.MODULES[namespace].ContentBlock.from_etree(elem)
+        binding_id = getattr(
+            block.content_binding, 'binding_id', block.content_binding)
+        timestamp = block.timestamp_label
+        return (
+            binding_id,
+            timestamp.isoformat() if timestamp else None,
+            convert_to_bytes(block.content))
+
+    if namespace == const.TAXII_11_NS:
+        binding_id = binding.get('binding_id')
+    else:
+        binding_id = binding.text
+
+    return (
+        binding_id,
+        elem.findtext('{%s}Timestamp_Label' % namespace),
+        _extract_content_bytes(content))
+
 
+def _read_content_binding(namespace, binding):
+    if namespace == const.TAXII_11_NS:
+        return binding.get('binding_id'), [
+            subtype.get('subtype_id')
+            for subtype in binding.iterfind('{%s}Subtype' % namespace)]
+    return binding.text, None
 
-def to_subscription_entity(subscription, version):
+
+def _extract_content_bytes(content):
+    if len(content):
+        # XML content
+        return etree.tostring(content[0], encoding='utf-8')
+    return convert_to_bytes(content.text or '')
+
+
+CONTENT_BLOCK_PARSERS = {
+    'libtaxii': to_content_block_entity_from_etree,
+    'fast': extract_content_block_entity,
+    'lazy': to_lazy_content_block_entity,
+}
+
+
+def get_content_block_parser(name, keep_raw=True):
+    '''
+    Get content block factory by parser name. Factories are created per
+    response stream, sharing Content Binding entities within the stream.
+    '''
+    try:
+        parser = CONTENT_BLOCK_PARSERS[name]
+    except KeyError:
+        raise ValueError(
+            'Unknown content block parser "{}", use one of: {}'.format(
+                name, ', '.join(sorted(CONTENT_BLOCK_PARSERS))))
+
+    return partial(parser, keep_raw=keep_raw, binding_cache={})
+
+
+def to_content_block_count_entity(record_count, keep_raw=True):
+    if not record_count:
+        return None
+
+    count = ContentBlockCount(
+        count=record_count.record_count,
+        is_partial=record_count.partial_count
+    )
+    return _set_raw(count, record_count, keep_raw)
+
+
+def to_subscription_entity(subscription, version, keep_raw=True):
 
     params = dict(
         subscription_id=subscription.subscription_id,
@@ -159,7 +345,7 @@ def to_subscription_entity(subscription, version):
             address=i.poll_address,
             message_bindings=i.poll_message_bindings
         )
-        instance.raw = i
+        _set_raw(instance, i, keep_raw)
         params['poll_instances'].append(instance)
 
     raw_delivery_parameters = (
@@ -169,7 +355,7 @@ def to_subscription_entity(subscription, version):
     if raw_delivery_parameters:
         if version == 10:
             bindings = to_content_binding_entities(
-                raw_delivery_parameters.content_bindings)
+                raw_delivery_parameters.content_bindings, keep_raw=keep_raw)
         else:
             bindings = None
 
@@ -181,30 +367,30 @@ def to_subscription_entity(subscription, version):
             message_bindings=_message_bindings,
             content_bindings=bindings
         )
-        parameters.raw = raw_delivery_parameters
+        _set_raw(parameters, raw_delivery_parameters, keep_raw)
         params['delivery_parameters'] = parameters
 
     if version == 11:
         sp = subscription.subscription_parameters
         parameters = SubscriptionParameters(
             response_type=sp.response_type,
-            content_bindings=to_content_binding_entities(sp.content_bindings)
+            content_bindings=to_content_binding_entities(
+                sp.content_bindings, keep_raw=keep_raw)
         )
-        parameters.raw = sp
+        _set_raw(parameters, sp, keep_raw)
         params.update({
             'subscription_parameters': parameters,
             'status': subscription.status
         })
 
-    entity = Subscription(**params)
-    entity.raw = subscription
-    return entity
+    return _set_raw(Subscription(**params), subscription, keep_raw)
 
 
-def to_subscription_response_entity(raw_response, version):
+def to_subscription_response_entity(raw_response, version, keep_raw=True):
     subscriptions = []
     for s in raw_response.subscription_instances:
-        subscriptions.append(to_subscription_entity(s, version))
+        subscriptions.append(
+            to_subscription_entity(s, version, keep_raw=keep_raw))
 
     collection_name = (raw_response.collection_name
                        if version == 11 else raw_response.feed_name)
@@ -214,5 +400,4 @@ def to_subscription_response_entity(raw_response, version):
         message=raw_response.message,
         subscriptions=subscriptions
     )
-    response.raw = raw_response
-    return response
+    return _set_raw(response, raw_response, keep_raw)
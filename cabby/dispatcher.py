@@ -1,18 +1,29 @@
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from copy import copy, deepcopy
+from datetime import datetime
+from xml.sax.saxutils import escape
+import base64
+import functools
 import json
 import os
+import socket
 import ssl
 import sys
 import logging
+import threading
+import zlib
 
 from six import StringIO
 
 import furl
 import gzip
+import pytz
 import requests
 from lxml import etree
-from six.moves import urllib
+from six.moves import http_client, urllib
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 from requests.auth import AuthBase, HTTPBasicAuth
+from requests.packages import urllib3
 
 from libtaxii import messages_11 as tm11
 from libtaxii import messages_10 as tm10
@@ -26,6 +37,26 @@ from .exceptions import (
 
 log = logging.getLogger(__name__)
 
+# Size of response body chunks fed to the XML parser
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Request bodies smaller than this are not worth compressing
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+# Maximum number of request templates kept, see RequestTemplateCache
+DEFAULT_TEMPLATE_CACHE_SIZE = 256
+
+# Errors raised by transports when a connection fails while a request is
+# sent or its response body is read. Key password transport raises
+# URLError, a subclass of socket.error, and http.client errors, requests
+# responses streamed from urllib3 can raise its errors mid-body
+TRANSPORT_ERRORS = (
+    requests.exceptions.RequestException,
+    urllib3.exceptions.HTTPError,
+    http_client.HTTPException,
+    socket.error,
+)
+
 
 def raise_http_error(status_code, response_stream=None):
     if log.isEnabledFor(logging.DEBUG) and response_stream:
@@ -35,49 +66,369 @@ def raise_http_error(status_code, response_stream=None):
 
 
 def send_taxii_request(
-        session, url, request, taxii_binding=None, timeout=None):
+        session, url, request, taxii_binding=None, timeout=None,
+        chunk_size=DEFAULT_CHUNK_SIZE, content_block_factory=None,
+        content_blocks=None, compression_threshold=None):
     '''
     Send XML message to a TAXII service and parse a response.
+
+    If ``content_blocks`` iterable is provided, its libtaxii content
+    blocks are appended to the message while it is sent, see
+    :py:func:`serialize_message_stream`. Request bodies of at least
+    ``compression_threshold`` bytes are compressed with gzip.
     '''
 
     log.info("Sending {} to {}".format(request.message_type, url))
 
-    request_body = request.to_xml(pretty_print=True)
+    if content_blocks is not None:
+        request_body = serialize_message_stream(request, content_blocks)
+    else:
+        request_body = serialize_request(request)
 
-    log.debug("Request:\n%s", request_body.decode('utf-8'))
+        log.debug("Request:\n%s", request_body.decode('utf-8'))
 
-    session = get_taxii_session(
-        session,
+    # Headers are passed per request, the session is shared between threads
+    request_headers = get_taxii_headers(
         url_scheme=furl.furl(url).scheme,
         message_binding=taxii_binding)
 
-    stream, headers = request_stream(session, url, request_body, timeout)
+    if compression_threshold is not None:
+        request_body, encoding_headers = compress_request_body(
+            request_body, compression_threshold)
+        request_headers.update(encoding_headers)
+
+    stream, headers = request_stream(
+        session, url, request_body, timeout, headers=request_headers)
+
+    return parse_taxii_response(
+        stream, headers, version=request.version, chunk_size=chunk_size,
+        content_block_factory=content_block_factory)
+
+
+# Marks where content blocks are inserted into a serialized message
+_CONTENT_BLOCKS_PLACEHOLDER = 'cabby-content-blocks'
+
+
+def serialize_message_stream(message, content_blocks):
+    '''
+    Serialize TAXII message with ``content_blocks`` appended as its last
+    children, yielding chunks of bytes. Content blocks are serialized
+    one at a time as they are read from the iterable, so the whole
+    document is never held in memory.
+    '''
+    root = message.to_etree()
+    etree.SubElement(root, _CONTENT_BLOCKS_PLACEHOLDER)
+
+    document = etree.tostring(root)
+    head, tail = document.split(
+        '<{}/>'.format(_CONTENT_BLOCKS_PLACEHOLDER).encode('utf-8'))
+
+    yield head
+    for block in content_blocks:
+        yield block.to_xml()
+    yield tail
+
+
+def _poll_request_10_key(request):
+    return (request.feed_name, request.subscription_id,
+            tuple(request.content_bindings))
+
+
+def _poll_request_11_key(request):
+    params = request.poll_parameters
+    if params is None:
+        params_key = None
+    elif params.query is not None or params.delivery_parameters is not None:
+        return None
+    else:
+        params_key = (
+            params.allow_asynch, params.response_type,
+            tuple((binding.binding_id, tuple(binding.subtype_ids))
+                  for binding in params.content_bindings))
+
+    return (request.collection_name, request.subscription_id, params_key)
+
+
+def _poll_fulfilment_key(request):
+    return (request.collection_name, request.result_id)
+
+
+# Request types serialized from templates: fields that change between
+# requests, and a function returning other fields as a hashable key or
+# None if the request can not be templated
+_TEMPLATED_REQUESTS = {
+    tm10.PollRequest: (
+        ('message_id', 'exclusive_begin_timestamp_label',
+         'inclusive_end_timestamp_label'),
+        _poll_request_10_key),
+    tm11.PollRequest: (
+        ('message_id', 'exclusive_begin_timestamp_label',
+         'inclusive_end_timestamp_label'),
+        _poll_request_11_key),
+    tm11.PollFulfillmentRequest: (
+        ('message_id', 'result_part_number'),
+        _poll_fulfilment_key),
+}
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _template_marker(value, index):
+    # Valid value of the same type, unlikely to appear elsewhere in a
+    # serialized request
+    if isinstance(value, datetime):
+        return datetime(1111, 11, 11, microsecond=index + 1, tzinfo=pytz.UTC)
+    elif isinstance(value, int):
+        return 7070707070707070 + index
+    return '707070707070707{}'.format(index)
+
+
+class RequestTemplate(object):
+    '''
+    Serialized request with placeholders for values of ``fields``,
+    rendering requests which differ from ``request`` only in these
+    fields without serializing them again.
+
+    :raises ValueError: if placeholders can not be located
+    '''
+
+    def __init__(self, request, fields):
+        sample = copy(request)
+        markers = []
+        for index, name in enumerate(fields):
+            marker = _template_marker(getattr(request, name), index)
+            setattr(sample, name, marker)
+            markers.append((_format_value(marker).encode('utf-8'), name))
+
+        document = sample.to_xml()
+
+        positions = []
+        for marker, name in markers:
+            if document.count(marker) != 1:
+                raise ValueError(
+                    'Field "{}" can not be templated'.format(name))
+            positions.append((document.index(marker), marker, name))
+
+        self.fields = []
+        self.parts = []
+        start = 0
+        for position, marker, name in sorted(positions):
+            self.parts.append(document[start:position])
+            self.fields.append(name)
+            start = position + len(marker)
+        self.parts.append(document[start:])
+
+    def render(self, request):
+        chunks = [self.parts[0]]
+        for name, part in zip(self.fields, self.parts[1:]):
+            value = _format_value(getattr(request, name))
+            chunks.append(escape(value, {'"': '&quot;'}).encode('utf-8'))
+            chunks.append(part)
+        return b''.join(chunks)
+
+
+class RequestTemplateCache(object):
+    '''
+    Thread safe cache of request templates, keeping at most ``size``
+    most recently used templates.
+
+    Poll Requests and Poll Fulfillment Requests repeated with new message
+    IDs, time windows or result part numbers, as in multi-part and
+    sharded polls, are rendered from a template built on the first
+    request. Other requests are serialized by libtaxii.
+    '''
+
+    def __init__(self, size=DEFAULT_TEMPLATE_CACHE_SIZE):
+        self.size = size
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def serialize(self, request):
+        '''
+        Serialize request into compact XML.
+
+        :rtype: bytes
+        '''
+        if type(request) not in _TEMPLATED_REQUESTS or (
+                request.extended_headers or request.in_response_to):
+            return request.to_xml()
+
+        fields, get_key = _TEMPLATED_REQUESTS[type(request)]
+        key = get_key(request)
+        if key is None:
+            return request.to_xml()
+
+        fields = tuple(name for name in fields
+                       if getattr(request, name) is not None)
+        key = (type(request), fields, key)
+
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+
+        if template is None:
+            try:
+                template = RequestTemplate(request, fields)
+            except ValueError:
+                return request.to_xml()
+
+            with self._lock:
+                self._templates[key] = template
+                while len(self._templates) > self.size:
+                    self._templates.popitem(last=False)
+
+        return template.render(request)
 
-    gen = _parse_response(stream, headers, version=request.version)
+
+_request_templates = RequestTemplateCache()
+
+
+def serialize_request(request):
+    '''
+    Serialize TAXII request into compact XML, rendering repeated poll
+    requests from cached templates, see :py:class:`RequestTemplateCache`.
+    '''
+    return _request_templates.serialize(request)
+
+
+def compress_request_body(body, threshold=DEFAULT_COMPRESSION_THRESHOLD):
+    '''
+    Compress request body with gzip if it has at least ``threshold``
+    bytes. ``body`` is bytes or an iterable of bytes chunks, which is
+    compressed as a stream, reading only the chunks needed to reach
+    the threshold before deciding.
+
+    Returns the body to send and headers to send it with.
+    '''
+    compressor = RequestBodyCompressor(threshold)
+
+    if isinstance(body, bytes):
+        data = compressor.feed(body)
+        if not compressor.compressing:
+            return body, {}
+        return data + compressor.close(), {'Content-Encoding': 'gzip'}
+
+    chunks = iter(body)
+    head = b''
+
+    for chunk in chunks:
+        head += compressor.feed(chunk)
+        if compressor.compressing:
+            break
+    else:
+        # Whole stream is below the threshold
+        return compressor.close(), {}
+
+    return (
+        _compress_chunks(compressor, head, chunks),
+        {'Content-Encoding': 'gzip'})
+
+
+def _compress_chunks(compressor, head, chunks):
+    if head:
+        yield head
+    for chunk in chunks:
+        data = compressor.feed(chunk)
+        if data:
+            yield data
+    yield compressor.close()
+
+
+class RequestBodyCompressor(object):
+    '''
+    Gzip compression of a request body fed in chunks, independent of
+    how the chunks are read and sent, see :py:func:`compress_request_body`.
+
+    Chunks are buffered until the body reaches ``threshold`` bytes,
+    smaller bodies are not compressed. Compression headers should be
+    sent once :py:attr:`compressing` is set or the body ended.
+    '''
+
+    def __init__(self, threshold=DEFAULT_COMPRESSION_THRESHOLD):
+        self.threshold = threshold
+        self._head = []
+        self._size = 0
+        self._compressor = None
+
+    @property
+    def compressing(self):
+        return self._compressor is not None
+
+    def feed(self, chunk):
+        '''
+        Feed a chunk of the body, returning compressed data ready to
+        be sent, possibly empty.
+        '''
+        if self._compressor is None:
+            self._head.append(chunk)
+            self._size += len(chunk)
+            if self._size < self.threshold:
+                return b''
+
+            # wbits of 16 + MAX_WBITS produce gzip header and trailer
+            self._compressor = zlib.compressobj(
+                6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            chunk = b''.join(self._head)
+            self._head = []
+
+        return self._compressor.compress(chunk)
+
+    def close(self):
+        '''
+        Return the rest of the body to send: gzip trailer, or the whole
+        body if it stayed below the threshold.
+        '''
+        if self._compressor is None:
+            return b''.join(self._head)
+        return self._compressor.flush()
+
+
+def parse_taxii_response(stream, headers, version,
+                         chunk_size=DEFAULT_CHUNK_SIZE,
+                         content_block_factory=None):
+    '''
+    Parse TAXII response from a stream, read in chunks of ``chunk_size``.
+
+    Returns a generator for Poll Responses, ``None`` for successful
+    Status Messages and a parsed message otherwise.
+    See :py:class:`ResponseParser` for ``content_block_factory``.
+    '''
+    gen = _parse_response(
+        stream, headers, version=version, chunk_size=chunk_size,
+        content_block_factory=content_block_factory)
     obj = next(gen)
 
     if obj == const.STREAM_MARKER:
         return gen
-    elif hasattr(obj, 'status_type'):
-        if obj.status_type != 'SUCCESS':
-            raise UnsuccessfulStatusError(obj)
+    return check_status(obj)
+
+
+def check_status(message):
+    '''
+    Raise an error for unsuccessful Status Messages.
+
+    Returns ``None`` for successful Status Messages and
+    the message itself otherwise.
+    '''
+    if hasattr(message, 'status_type'):
+        if message.status_type != 'SUCCESS':
+            raise UnsuccessfulStatusError(message)
         else:
             return None
-    return obj
+    return message
 
 
 def request_stream(session, url, request_body, timeout, headers=None):
     if session._cabby_key_password:
         # Workaround until
         # https://github.com/kennethreitz/requests/issues/2519 is fixed
-        try:
-            response = request_with_key_password(
-                session, url, request_body, timeout, headers)
-        except urllib.error.HTTPError as e:
-            log.error(
-                "Error while connecting to {}".format(url),
-                exc_info=True)
-            raise_http_error(e.getcode())
+        response = request_with_key_password(
+            session, url, request_body, timeout, headers)
 
         stream, headers = response, response.headers
     else:
@@ -118,72 +469,32 @@ def _cleanup_batch(curr_elem, batch):
     del batch[:]
 
 
-def _stream_poll_response(namespace, stream):
-
-    module = const.MODULES[namespace]
-
-    response_cls = const.MODULES[namespace].PollResponse
-
-    batch_max_size = 3
-    to_delete_batch = []
-
-    for action, elem in stream:
-        if action == 'end':
-            tag = elem.xpath('local-name()')
+# Namespace qualified tags, precomputed for TAXII 1.0 and 1.1 namespaces
+CONTENT_BLOCK_TAGS = dict(
+    (namespace, etree.QName(namespace, module.ContentBlock.NAME).text)
+    for namespace, module in const.MODULES.items())
 
-            # If current element is ContentBlock
-            if tag == module.ContentBlock.NAME:
-                obj = module.ContentBlock.from_etree(elem)
+POLL_RESPONSE_TAGS = dict(
+    (namespace, etree.QName(namespace, module.PollResponse.message_type).text)
+    for namespace, module in const.MODULES.items())
 
-            # If current element is PollResponse
-            # meaning that this is a last one
-            elif tag == response_cls.message_type:
-                _cleanup_batch(elem, to_delete_batch)
-                obj = response_cls.from_etree(elem)
-            else:
-                continue
-
-            if log.isEnabledFor(logging.DEBUG):
-                log.debug("Stream element:\n{}"
-                          .format(etree.tostring(elem).decode('utf-8')))
-
-            yield obj
-
-            # Cleaning up element to free up memory
-            elem.clear()
-
-            # Removing all elements from a batch if it is time
-            if len(to_delete_batch) >= batch_max_size:
-                _cleanup_batch(elem, to_delete_batch)
+MESSAGE_TAGS = [
+    etree.QName(namespace, value).text
+    for namespace in const.MODULES
+    for name, value in sorted(vars(const).items())
+    if name.startswith('MSG_')]
 
-            # Postponing removal of the element from a tree
-            # to avoid memory corruption (libxml2 crashes)
-            to_delete_batch.append(elem)
+# Only elements with these tags reach Python code while parsing,
+# including deeply nested content of Content Blocks
+STREAM_TAGS = sorted(set(
+    list(CONTENT_BLOCK_TAGS.values()) + MESSAGE_TAGS))
 
 
-def _parse_response(stream, headers, version):
-
-    content_type = headers.get('X-TAXII-Content-Type')
-
-    if not content_type:
-        body = stream.read()
-        headers = '\n'.join([
-            '{}={}'.format(k, v) for k, v in headers.items()])
-        log.debug(
-            "Invalid response:\n{}\n{}".format(headers, body))
-        raise InvalidResponseError("Invalid response received")
-
-    elif content_type not in const.SUPPORTED_CONTENT_BINDINGS:
-        raise ValueError('Unsupported X-TAXII-Content-Type: {}'
-                         .format(content_type))
-    elif content_type == const.CERT_EU_JSON_10_BINDING:
-        body = stream.read()
-        yield tm10.get_message_from_json(body)
-
+def _create_pull_parser():
     support_huge_trees = not os.environ.get('CABBY_NO_HUGE_TREES')
-    gen = etree.iterparse(
-        stream,
+    return etree.XMLPullParser(
         events=('start', 'end'),
+        tag=STREAM_TAGS,
         # inject default attributes from DTD or XMLSchema
         attribute_defaults=False,
         # validate against a DTD referenced by the document
@@ -210,37 +521,355 @@ def _parse_response(stream, headers, version):
         # trees and very long text content
         huge_tree=support_huge_trees)
 
-    action, root = next(gen)
-    namespace = etree.QName(root).namespace
-    message_type = root.xpath('local-name()')
 
-    if namespace not in const.VERSIONS:
-        raise ValueError(
-            'Unsupported namespace: {}'.format(namespace))
-    elif version != const.VERSIONS[namespace]:
-        raise InvalidResponseError(
-            "Response TAXII version '{}' "
-            "does not match request version '{}'"
-            .format(const.VERSIONS[namespace], version))
+class ResponseParser(object):
+    '''
+    Incremental TAXII response parser, fed with chunks of a response body.
+
+    :py:meth:`feed` and :py:meth:`close` return lists of parsed objects.
+    For Poll Responses :py:const:`cabby.constants.STREAM_MARKER` comes
+    first, followed by Content Blocks as soon as their closing tags are
+    received and by Poll Response itself. For other messages the parsed
+    message is returned by :py:meth:`close`.
+
+    The parser does not do any I/O, so it is shared by synchronous
+    and asynchronous transports.
+
+    Content Block elements are converted by ``content_block_factory``,
+    called with TAXII namespace and the element. libtaxii Content Block
+    objects are created by default.
+
+    Poll Responses are streamed in constant memory: memory used does not
+    depend on the number of Content Blocks in a response and is bounded
+    by the size of the largest Content Block times ``cleanup_batch_size``.
+    Content Blocks are removed from the tree in batches of
+    ``cleanup_batch_size`` elements. libxml2 keeps some state for every
+    namespace declaration it parses, which grows with the size of
+    a response, so the underlying parser is restarted after every
+    ``restart_interval`` Content Blocks, between two blocks.
+    '''
+
+    cleanup_batch_size = 3
+    restart_interval = 1000
+
+    def __init__(self, headers, version, content_block_factory=None,
+                 cleanup_batch_size=None, restart_interval=None):
+        self.content_type = headers.get('X-TAXII-Content-Type')
+
+        if not self.content_type:
+            headers = '\n'.join([
+                '{}={}'.format(k, v) for k, v in headers.items()])
+            log.debug("Invalid response:\n{}".format(headers))
+            raise InvalidResponseError("Invalid response received")
+        elif self.content_type not in const.SUPPORTED_CONTENT_BINDINGS:
+            raise ValueError('Unsupported X-TAXII-Content-Type: {}'
+                             .format(self.content_type))
+
+        self.version = version
+        self.content_block_factory = (
+            content_block_factory or _parse_content_block)
+
+        if cleanup_batch_size is not None:
+            if cleanup_batch_size < 1:
+                raise ValueError('cleanup_batch_size must be positive')
+            self.cleanup_batch_size = cleanup_batch_size
+        if restart_interval is not None:
+            self.restart_interval = restart_interval
+
+        self.root = None
+        self.namespace = None
+        self.message_type = None
+        self.is_stream = False
+
+        if self.content_type == const.CERT_EU_JSON_10_BINDING:
+            self._parser = None
+            self._body = []
+        else:
+            self._parser = _create_pull_parser()
+
+        self._to_delete_batch = []
+
+        # Parser restarts: bytes received before the root element is known,
+        # bytes of the document up to the end of the root start tag,
+        # root children preceding Content Blocks, closing tag of
+        # Content Blocks and the end of the previously fed chunk,
+        # to find the closing tag split between chunks
+        self._head = []
+        self._prologue = None
+        self._header = None
+        self._block_end_tag = None
+        self._tail = b''
+
+        self._blocks_parsed = 0
+        self._at_block_end = False
+
+    def feed(self, data):
+        '''
+        Parse a chunk of response body.
+        '''
+        if self._parser is None:
+            self._body.append(data)
+            return []
+
+        objects = []
+
+        while data and self._restart_due():
+            boundary = self._find_block_end(data)
+            if boundary is None:
+                break
+
+            objects.extend(self._feed(data[:boundary]))
+            data = data[boundary:]
+
+            # The closing tag may be found in CDATA of a block content,
+            # the parser is restarted only if it ended a Content Block
+            if self._at_block_end:
+                self._restart()
+
+        if data:
+            objects.extend(self._feed(data))
+
+        return objects
+
+    def close(self):
+        '''
+        Finish parsing after the whole response body has been fed.
+        '''
+        if self._parser is None:
+            return [tm10.get_message_from_json(b''.join(self._body))]
+
+        root = self._parser.close()
+        objects = list(self._read_events())
+
+        if self.root is None:
+            # Root tag is not a known TAXII message tag,
+            # so it did not pass the parser's tag filter
+            self._handle_root(root)
+
+        if not self.is_stream:
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Response:\n%s", etree.tostring(
+                    self.root, pretty_print=True).decode('utf-8'))
 
-    if message_type in [tm11.PollResponse.message_type,
-                        tm10.PollResponse.message_type]:
+            objects.append(_parse_full_tree(
+                self.content_type, self.message_type, self.root))
 
-        yield const.STREAM_MARKER
+        return objects
 
-        for obj in _stream_poll_response(namespace, gen):
-            yield obj
+    def _feed(self, data):
+        if self._head is not None:
+            self._head.append(data)
 
-    else:
-        # Walk tree iterator to the end to fill up root element
-        for _ in gen:
-            pass
+        self._at_block_end = False
+        self._parser.feed(data)
+
+        if self._block_end_tag:
+            tail_size = len(self._block_end_tag) - 1
+            self._tail = (self._tail + data[-tail_size:])[-tail_size:]
+
+        return list(self._read_events())
+
+    def _read_events(self):
+        for action, elem in self._parser.read_events():
+            if self.root is None:
+                self._handle_root(elem)
+                if self.is_stream:
+                    yield const.STREAM_MARKER
+            elif self.is_stream and action == 'end':
+                obj = self._handle_stream_element(elem)
+                if obj is not None:
+                    yield obj
+            else:
+                self._at_block_end = False
+
+    def _handle_root(self, root):
+        self.root = root
+        qname = etree.QName(root)
+        self.namespace = qname.namespace
+        self.message_type = qname.localname
+
+        if self.namespace not in const.VERSIONS:
+            raise ValueError(
+                'Unsupported namespace: {}'.format(self.namespace))
+        elif self.version != const.VERSIONS[self.namespace]:
+            raise InvalidResponseError(
+                "Response TAXII version '{}' "
+                "does not match request version '{}'"
+                .format(const.VERSIONS[self.namespace], self.version))
+
+        self.is_stream = self.message_type in [
+            tm11.PollResponse.message_type, tm10.PollResponse.message_type]
+
+        if self.is_stream and self.restart_interval:
+            self._prologue = _find_prologue(b''.join(self._head), root)
+        self._head = None
+
+    def _handle_stream_element(self, elem):
+        tag = elem.tag
+        self._at_block_end = False
+
+        # If current element is ContentBlock
+        if tag == CONTENT_BLOCK_TAGS[self.namespace]:
+            obj = self.content_block_factory(self.namespace, elem)
+
+            if elem.getparent() is self.root:
+                self._blocks_parsed += 1
+                self._at_block_end = True
+                if self._block_end_tag is None:
+                    self._block_end_tag = _closing_tag(elem)
+
+        # If current element is PollResponse
+        # meaning that this is a last one
+        elif tag == POLL_RESPONSE_TAGS[self.namespace]:
+            _cleanup_batch(elem, self._to_delete_batch)
+            # Put back elements preceding Content Blocks,
+            # parsed before the parser was restarted
+            for index, header_elem in enumerate(self._header or []):
+                elem.insert(index, header_elem)
+            obj = const.MODULES[self.namespace].PollResponse.from_etree(elem)
+        else:
+            return None
 
         if log.isEnabledFor(logging.DEBUG):
-            log.debug("Response:\n%s",
-                      etree.tostring(root, pretty_print=True).decode('utf-8'))
+            log.debug("Stream element:\n{}"
+                      .format(etree.tostring(elem).decode('utf-8')))
+
+        # Cleaning up element to free up memory
+        elem.clear()
+
+        # Removing all elements from a batch if it is time
+        if len(self._to_delete_batch) >= self.cleanup_batch_size:
+            _cleanup_batch(elem, self._to_delete_batch)
+
+        # Postponing removal of the element from a tree
+        # to avoid memory corruption (libxml2 crashes)
+        self._to_delete_batch.append(elem)
+
+        return obj
+
+    def _restart_due(self):
+        return (self._prologue and self._block_end_tag and
+                self._blocks_parsed >= self.restart_interval)
+
+    def _find_block_end(self, data):
+        # Returns position in data right after the first Content Block
+        # closing tag, which may start in the previously fed data
+        index = (self._tail + data).find(self._block_end_tag)
+        if index == -1:
+            return None
+        return index + len(self._block_end_tag) - len(self._tail)
+
+    def _restart(self):
+        if self._header is None:
+            block_tag = CONTENT_BLOCK_TAGS[self.namespace]
+            self._header = [
+                deepcopy(child) for child in self.root
+                if child.tag != block_tag]
+
+        self._to_delete_batch = []
+
+        # Restarts happen right after a top level content block, so
+        # closing the root finishes the document and closing the parser
+        # resets its libxml2 state. Closing unfinished documents leaks
+        # memory in libxml2. Parsers are reused, as they are only freed
+        # by garbage collector.
+        self._parser.feed(_closing_tag(self.root))
+        self._parser.close()
+        for _ in self._parser.read_events():
+            pass
+
+        self._parser.feed(self._prologue)
+        action, self.root = next(self._parser.read_events())
+
+        self._blocks_parsed = 0
+        self._at_block_end = False
+        self._tail = b''
+
+
+def _closing_tag(elem):
+    qname = etree.QName(elem)
+    if elem.prefix:
+        name = '{}:{}'.format(elem.prefix, qname.localname)
+    else:
+        name = qname.localname
+    return '</{}>'.format(name).encode('utf-8')
+
+
+def _find_prologue(head, root):
+    '''
+    Find document bytes up to the end of the root start tag, which
+    start documents parsed by restarted parsers. Returns ``None``
+    if they can not be found or do not parse into the same root element.
+    '''
+    qname = etree.QName(root)
+    if root.prefix:
+        name = '{}:{}'.format(root.prefix, qname.localname)
+    else:
+        name = qname.localname
+    start_tag = '<{}'.format(name).encode('utf-8')
+
+    index = head.find(start_tag)
+    while index != -1:
+        end = index + len(start_tag)
+        if head[end:end + 1] in (b' ', b'\t', b'\r', b'\n', b'>', b'/'):
+            break
+        index = head.find(start_tag, end)
+    else:
+        return None
+
+    quote = None
+    for position in range(end, len(head)):
+        char = head[position:position + 1]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in (b'"', b"'"):
+            quote = char
+        elif char == b'>':
+            prologue = head[:position + 1]
+            break
+    else:
+        return None
+
+    parser = _create_pull_parser()
+    parser.feed(prologue)
+    events = list(parser.read_events())
+    if events and events[0][0] == 'start' and events[0][1].tag == root.tag:
+        return prologue
+    return None
+
+
+def _parse_content_block(namespace, elem):
+    return const.MODULES[namespace].ContentBlock.from_etree(elem)
+
 
-        yield _parse_full_tree(content_type, message_type, root)
+def _parse_response(stream, headers, version, chunk_size=DEFAULT_CHUNK_SIZE,
+                    content_block_factory=None):
+
+    try:
+        parser = ResponseParser(
+            headers, version, content_block_factory=content_block_factory)
+    except InvalidResponseError:
+        log.debug("Response body:\n{}".format(stream.read()))
+        raise
+
+    complete = False
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                complete = True
+                break
+            for obj in parser.feed(chunk):
+                yield obj
+    finally:
+        if not complete:
+            # Response abandoned before its end can not be read further,
+            # do not let its connection be reused
+            stream.close()
+
+    for obj in parser.close():
+        yield obj
 
 
 def _parse_full_tree(content_type, message_type, elem):
@@ -314,8 +943,19 @@ def get_generic_session(
     ca_cert=None,
     verify_ssl=True,
     jwt_token=None,
+    pool_connections=DEFAULT_POOLSIZE,
+    pool_maxsize=DEFAULT_POOLSIZE,
 ):
     session = requests.Session()
+
+    # Connections are kept alive and reused for as long as the session lives,
+    # so every request to the same host skips TCP connect and TLS handshake
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
     if ca_cert:
         session.verify = ca_cert
     else:
@@ -332,9 +972,17 @@ def get_generic_session(
     if jwt_token:
         session.auth = JWTAuth(jwt_token)
     session._cabby_key_password = key_password
+    session._cabby_transport = (
+        KeyPasswordTransport(maxsize=pool_maxsize) if key_password else None)
     return session
 
 
+def close_session(session):
+    if session._cabby_transport:
+        session._cabby_transport.close()
+    session.close()
+
+
 def set_jwt_token(session, jwt_token):
     session.auth = JWTAuth(jwt_token)
     return session
@@ -344,6 +992,18 @@ def get_taxii_session(session, url_scheme='https', content_type=None,
                       message_binding=const.XML_11_BINDING,
                       service_binding=None):
 
+    session.headers.update(get_taxii_headers(
+        url_scheme=url_scheme,
+        content_type=content_type,
+        message_binding=message_binding,
+        service_binding=service_binding))
+    return session
+
+
+def get_taxii_headers(url_scheme='https', content_type=None,
+                      message_binding=const.XML_11_BINDING,
+                      service_binding=None):
+
     if not content_type:
         if message_binding not in const.BINDINGS_TO_CONTENT_TYPE:
             raise ValueError('No content type provided')
@@ -358,15 +1018,14 @@ def get_taxii_session(session, url_scheme='https', content_type=None,
         raise ValueError(
             'No known protocol bindings for scheme {}'.format(url_scheme))
 
-    session.headers.update({
+    return {
         'Content-Type': content_type,
         'Accept': content_type,
         'X-TAXII-Content-Type': message_binding,
         'X-TAXII-Accept': message_binding,
         'X-TAXII-Services': service_bindings,
         'X-TAXII-Protocol': const.SCHEMA_TO_PROTOCOL_BINDINGS[url_scheme]
-    })
-    return session
+    }
 
 
 def obtain_jwt_token(session, jwt_url, username, password, timeout=None):
@@ -378,7 +1037,11 @@ def obtain_jwt_token(session, jwt_url, username, password, timeout=None):
 
     stream, headers = request_stream(
         session, jwt_url, request_body, timeout, headers)
-    response_body = stream.read().decode('utf-8')
+    return get_jwt_token_from_response(stream.read())
+
+
+def get_jwt_token_from_response(response_body):
+    response_body = response_body.decode('utf-8')
     if not response_body:
         raise ValueError("empty response")
     response_data = json.loads(response_body)
@@ -395,25 +1058,41 @@ def request_with_key_password(
         raise ValueError(
             'Key password specification is not supported in Python < v2.7.9')
 
+    request_headers = dict(session.headers)
     if session.auth:
         # Using Requests Session's auth handlers to fill in proper headers
         DummyRequest = namedtuple('DummyRequest', ['headers'])
         request_headers = session.auth(
-            DummyRequest(headers=session.headers)).headers
-    else:
-        request_headers = session.headers
+            DummyRequest(headers=request_headers)).headers
     if headers:
         request_headers.update(headers)
 
-    # Take the TLS details from the session object and use them with urllib.
-    # See also 'get_generic_session' which sets many of these attributes.
+    transport = session._cabby_transport
+    if not transport.context:
+        transport.context = create_ssl_context(session)
+
+    return transport.post(
+        url, request_body, request_headers, timeout=timeout,
+        proxies=session.proxies)
+
+
+def create_ssl_context(session):
+    '''
+    Create SSL context with the TLS details taken from the session object.
+
+    See also 'get_generic_session' which sets many of these attributes.
+    '''
 
     # session 'verify' attribute can be a bool or a path to a CA bundle:
     ca_cert = None
     if not isinstance(session.verify, bool):
         ca_cert = session.verify
     context = ssl.create_default_context(
-        ssl.Purpose.CLIENT_AUTH, cafile=ca_cert)
+        ssl.Purpose.SERVER_AUTH, cafile=ca_cert)
+
+    # Server hostname is not matched against the certificate,
+    # only the certificate chain is verified
+    context.check_hostname = False
 
     cert_file, key_file = session.cert
     key_password = session._cabby_key_password
@@ -426,14 +1105,194 @@ def request_with_key_password(
     else:
         context.verify_mode = ssl.CERT_NONE
 
-    handlers = [urllib.request.HTTPSHandler(context=context)]
-    if session.proxies:
-        handlers.append(urllib.request.ProxyHandler(session.proxies))
+    return context
 
-    opener = urllib.request.build_opener(*handlers)
-    request = urllib.request.Request(url, request_body, request_headers)
 
-    if timeout:
-        return opener.open(request, timeout=timeout)
-    else:
-        return opener.open(request)
+class _ResumableHTTPSConnection(http_client.HTTPSConnection):
+    '''
+    HTTPS connection that resumes TLS sessions of previous connections
+    to the same host.
+    '''
+
+    def __init__(self, host, port=None, tls_sessions=None, **kwargs):
+        http_client.HTTPSConnection.__init__(self, host, port, **kwargs)
+        self._tls_sessions = tls_sessions if tls_sessions is not None else {}
+
+    def connect(self):
+        http_client.HTTPConnection.connect(self)
+
+        server_hostname = self._tunnel_host or self.host
+        key = (server_hostname, self._tunnel_port or self.port)
+
+        self.sock = self._context.wrap_socket(
+            self.sock,
+            server_hostname=server_hostname,
+            session=self._tls_sessions.get(key))
+
+        self._tls_sessions[key] = self.sock.session
+
+
+class _PooledHTTPResponse(http_client.HTTPResponse):
+    '''
+    HTTP response calling ``on_release(reusable)`` once, when its body
+    was read to the end and the connection can be reused, or when it was
+    closed earlier, leaving unread data on the connection.
+
+    Raises ``IncompleteRead`` if the connection is closed before the
+    whole body announced by Content-Length is received.
+    '''
+
+    on_release = None
+    _closing = False
+
+    def read(self, amt=None):
+        data = http_client.HTTPResponse.read(self, amt)
+        if amt and not data and self.length:
+            # Sized reads report a body cut short as its end
+            raise http_client.IncompleteRead(b'', self.length)
+        return data
+
+    def close(self):
+        self._closing = True
+        http_client.HTTPResponse.close(self)
+
+    def _close_conn(self):
+        http_client.HTTPResponse._close_conn(self)
+
+        on_release, self.on_release = self.on_release, None
+        if on_release is not None:
+            on_release(not self._closing and not self.length)
+
+
+class KeyPasswordTransport(object):
+    '''
+    Connection-reusing HTTP transport used for client certificates
+    with encrypted private keys.
+
+    Workaround until https://github.com/kennethreitz/requests/issues/2519
+    is fixed. SSL context (and so decrypted private key) is created once
+    per transport, connections are kept alive and reused and TLS sessions
+    are resumed when a new connection to the same host is opened.
+
+    A connection returns to the pool only after its response body was
+    read to the end. Connections of responses closed before that are
+    closed too.
+    '''
+
+    def __init__(self, maxsize=DEFAULT_POOLSIZE):
+        self.context = None
+        self.maxsize = maxsize
+
+        self._connections = {}
+        self._tls_sessions = {}
+        self._lock = threading.Lock()
+
+    def post(self, url, body, headers, timeout=None, proxies=None):
+        fu = furl.furl(url)
+        key = (fu.scheme, fu.host, fu.port)
+
+        path = str(fu.path) or '/'
+        if fu.query.params:
+            path += '?' + str(fu.query)
+
+        proxy = furl.furl(proxies[fu.scheme]) \
+            if proxies and proxies.get(fu.scheme) else None
+
+        if proxy and fu.scheme == 'http':
+            # Plain HTTP proxies expect absolute URL in request line
+            path = fu.url
+
+        conn, reused = self._acquire(key, proxy, timeout)
+        try:
+            response = self._send(conn, path, body, headers)
+        except (http_client.HTTPException, socket.error) as e:
+            conn.close()
+            if not reused or not isinstance(body, bytes):
+                raise urllib.error.URLError(e)
+            # Connection kept alive in the pool can be closed by the server
+            # in the meantime, retry once with a new connection. Streamed
+            # bodies can not be sent again
+            conn = self._connect(key, proxy, timeout)
+            try:
+                response = self._send(conn, path, body, headers)
+            except (http_client.HTTPException, socket.error) as e:
+                conn.close()
+                raise urllib.error.URLError(e)
+
+        response.on_release = functools.partial(self._release, key, conn)
+
+        if not 200 <= response.status < 300:
+            try:
+                raise_http_error(response.status, response)
+            finally:
+                # Drops the connection if the error body was not read
+                response.close()
+
+        return response
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for pool in connections.values():
+            for conn in pool:
+                conn.close()
+
+    def _send(self, conn, path, body, headers):
+        conn.request('POST', path, body=body, headers=headers)
+        return conn.getresponse()
+
+    def _acquire(self, key, proxy, timeout):
+        with self._lock:
+            pool = self._connections.get(key)
+            conn = pool.pop() if pool else None
+
+        if conn is None:
+            return self._connect(key, proxy, timeout), False
+
+        conn.timeout = timeout
+        if conn.sock:
+            conn.sock.settimeout(timeout)
+        return conn, conn.sock is not None
+
+    def _release(self, key, conn, reusable):
+        if not reusable:
+            conn.close()
+            return
+
+        with self._lock:
+            pool = self._connections.setdefault(key, [])
+            pool.append(conn)
+            while len(pool) > self.maxsize:
+                pool.pop(0).close()
+
+    def _connect(self, key, proxy, timeout):
+        scheme, host, port = key
+
+        if proxy:
+            conn_host, conn_port = proxy.host, proxy.port
+        else:
+            conn_host, conn_port = host, port
+
+        kwargs = {}
+        if timeout:
+            kwargs['timeout'] = timeout
+
+        if scheme == 'https':
+            conn = _ResumableHTTPSConnection(
+                conn_host, conn_port, tls_sessions=self._tls_sessions,
+                context=self.context, **kwargs)
+        else:
+            conn = http_client.HTTPConnection(conn_host, conn_port, **kwargs)
+
+        if proxy and scheme == 'https':
+            tunnel_headers = {}
+            if proxy.username:
+                credentials = '{}:{}'.format(
+                    proxy.username, proxy.password or '')
+                tunnel_headers['Proxy-Authorization'] = 'Basic {}'.format(
+                    base64.b64encode(credentials.encode('utf-8'))
+                    .decode('ascii'))
+            conn.set_tunnel(host, port, headers=tunnel_headers)
+
+        conn.response_class = _PooledHTTPResponse
+        return conn
@@ -1,4 +1,10 @@
 import logging
+import re
+from datetime import datetime
+
+import pytz
+from libtaxii.common import parse_datetime_string
+from lxml import etree
 
 from . import constants as const
 
@@ -7,10 +13,138 @@ log = logging.getLogger(__name__)
 
 SERVICE_TYPES = set(const.SVC_TYPES)
 
+TIMESTAMP_FORMAT = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?'
+    r'(?:(Z)|([+-])(\d\d):(\d\d))?$')
+
+# Lazy content blocks are serialized from already parsed documents
+_lazy_parser = etree.XMLParser(
+    resolve_entities=False, no_network=True, huge_tree=True)
+
+
+def parse_timestamp_label(label):
+    '''
+    Parse ISO8601 timestamp label into a datetime, with a fast path for
+    ``YYYY-MM-DDThh:mm:ss[.ffffff][Z|+hh:mm]`` timestamps servers send.
+    Other formats are parsed by libtaxii (dateutil).
+    '''
+    if not label:
+        return None
+
+    match = TIMESTAMP_FORMAT.match(label)
+    if not match:
+        return parse_datetime_string(label)
+
+    (year, month, day, hour, minute, second, fraction,
+     utc, sign, offset_hours, offset_minutes) = match.groups()
+
+    if utc:
+        tzinfo = pytz.UTC
+    elif sign:
+        offset = int(offset_hours) * 60 + int(offset_minutes)
+        tzinfo = pytz.FixedOffset(-offset if sign == '-' else offset)
+    else:
+        tzinfo = None
+
+    try:
+        return datetime(
+            int(year), int(month), int(day),
+            int(hour), int(minute), int(second),
+            int(fraction.ljust(6, '0')) if fraction else 0,
+            tzinfo=tzinfo)
+    except ValueError:
+        # Let dateutil handle or report out of range values
+        return parse_datetime_string(label)
+
+
+class _lazy_attribute(object):
+    '''
+    Attribute computed by decorated method on first access and stored
+    in the instance afterwards.
+    '''
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance.__dict__[self.func.__name__] = self.func(instance)
+        return value
+
 
 class Entity(object):
-    '''Generic entity.'''
-    raw = None
+    '''Generic entity.
+
+    Entities define ``__slots__``, keeping instances compact and
+    picklable. Subclasses returned by :py:meth:`with_attributes` accept
+    arbitrary attributes. ``raw`` is ``None`` unless underlying libtaxii
+    object is attached.
+    '''
+    __slots__ = ('raw',)
+
+    def __getattr__(self, name):
+        # Called only for attributes not set, ``raw`` is optional
+        if name == 'raw':
+            return None
+        raise AttributeError(
+            "'{}' object has no attribute '{}'".format(
+                type(self).__name__, name))
+
+    def __getstate__(self):
+        # Unslotted subclasses keep other attributes in ``__dict__``
+        state = dict(getattr(self, '__dict__', {}))
+        for name, cls in self._slots():
+            try:
+                state[name] = cls.__dict__[name].__get__(self, cls)
+            except AttributeError:
+                # Slot is not set
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def _asdict(self):
+        return {name: getattr(self, name) for name, _ in self._slots()}
+
+    @classmethod
+    def _slots(cls):
+        for klass in cls.__mro__:
+            for name in klass.__dict__.get('__slots__', ()):
+                yield name, klass
+
+    @classmethod
+    def with_attributes(cls):
+        '''
+        Get a subclass of the entity without ``__slots__``, accepting
+        arbitrary attributes at the cost of a dictionary per instance.
+        '''
+        subclass = _unslotted.get(cls)
+        if subclass is None:
+            subclass = _unslotted[cls] = type(cls.__name__, (cls,), {
+                '__module__': cls.__module__,
+                '__doc__': cls.__doc__,
+                '__reduce_ex__': _reduce_unslotted,
+                '_slotted': cls,
+            })
+        return subclass
+
+
+# Unslotted subclasses of entities, see Entity.with_attributes
+_unslotted = {}
+
+
+def _reduce_unslotted(entity, protocol):
+    # Unslotted subclasses are not importable by name, pickle them
+    # as the slotted entity they were created from
+    return _new_unslotted, (entity._slotted,), entity.__getstate__()
+
+
+def _new_unslotted(cls):
+    return object.__new__(cls.with_attributes())
 
 
 class ContentBlockCount(Entity):
@@ -24,13 +158,16 @@ class ContentBlockCount(Entity):
            of applicable records, or if the provided number is a lower bound
            and there may be more records than stated.
     '''
+
+    __slots__ = ('count', 'is_partial')
+
     def __init__(self, count, is_partial=False):
         self.count = count
         self.is_partial = is_partial
 
     def __repr__(self):
         t = '{cls}(count={count}, is_partial={is_partial})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, **self._asdict())
 
 
 class Collection(Entity):
@@ -56,6 +193,11 @@ class Collection(Entity):
     :param int volume: collection's volume
     '''
 
+    __slots__ = (
+        'name', 'description', 'type', 'available', 'content_bindings',
+        'push_methods', 'polling_services', 'subscription_methods',
+        'receiving_inboxes', 'volume')
+
     TYPE_FEED = const.CT_DATA_FEED
     TYPE_SET = const.CT_DATA_SET
 
@@ -84,25 +226,38 @@ class Collection(Entity):
 
     def __repr__(self):
         t = '{cls}(name={name}, type={type}, available={available})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, **self._asdict())
 
 
 class ContentBinding(Entity):
     '''Content Binding entity.
 
-    Represents TAXII Content Binding.
+    Represents TAXII Content Binding. Bindings with equal ID and subtypes
+    are equal and have the same hash. Content blocks of a poll response
+    share binding entities, which should not be modified.
 
     :param str id: Content Binding ID
     :param list subtypes: Content Subtypes IDs
     '''
 
+    __slots__ = ('id', 'subtypes')
+
     def __init__(self, id, subtypes=None):
         self.id = id
         self.subtypes = subtypes or []
 
+    def __eq__(self, other):
+        if not isinstance(other, ContentBinding):
+            return NotImplemented
+        return (self.id == other.id and
+                list(self.subtypes) == list(other.subtypes))
+
+    def __hash__(self):
+        return hash((self.id, tuple(self.subtypes)))
+
     def __repr__(self):
         t = '{cls}(id={id}, subtypes={subtypes})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, **self._asdict())
 
 
 class ServiceInstance(Entity):
@@ -114,6 +269,8 @@ class ServiceInstance(Entity):
                                   as list of strings
     '''
 
+    __slots__ = ('protocol', 'address', 'message_bindings')
+
     def __init__(self, protocol, address, message_bindings):
         self.protocol = protocol
         self.address = address
@@ -121,7 +278,7 @@ class ServiceInstance(Entity):
 
     def __repr__(self):
         t = '{cls}(protocol={protocol}, address={address})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, **self._asdict())
 
 
 class InboxService(ServiceInstance):
@@ -136,6 +293,8 @@ class InboxService(ServiceInstance):
                 :py:class:`cabby.entities.ContentBinding`
     '''
 
+    __slots__ = ('content_bindings',)
+
     def __init__(self, protocol, address, message_bindings,
                  content_bindings=None):
 
@@ -153,13 +312,15 @@ class PushMethod(Entity):
     :param list message_bindings: service Message Bindings, as list of strings
     '''
 
+    __slots__ = ('protocol', 'message_bindings')
+
     def __init__(self, protocol, message_bindings):
         self.protocol = protocol
         self.message_bindings = message_bindings
 
     def __repr__(self):
         t = '{cls}(protocol={protocol})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, **self._asdict())
 
 
 class SubscriptionParameters(Entity):
@@ -173,6 +334,8 @@ class SubscriptionParameters(Entity):
                :py:class:`cabby.entities.ContentBinding`
     '''
 
+    __slots__ = ('response_type', 'content_bindings')
+
     TYPE_FULL = const.RT_FULL
     TYPE_COUNT = const.RT_COUNT_ONLY
 
@@ -184,7 +347,7 @@ class SubscriptionParameters(Entity):
 
     def __repr__(self):
         t = '{cls}(response_type={response_type})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, **self._asdict())
 
 
 class DetailedServiceInstance(Entity):
@@ -201,6 +364,10 @@ class DetailedServiceInstance(Entity):
     :param str message: message attached to a service
     '''
 
+    __slots__ = (
+        'type', 'version', 'protocol', 'address', 'message_bindings',
+        'available', 'message')
+
     VERSION_10 = const.TAXII_SERVICES_10
     VERSION_11 = const.TAXII_SERVICES_11
 
@@ -226,7 +393,7 @@ class DetailedServiceInstance(Entity):
 
     def __repr__(self):
         t = '{cls}(type={type}, address={address})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, **self._asdict())
 
 
 class InboxDetailedService(DetailedServiceInstance):
@@ -245,6 +412,8 @@ class InboxDetailedService(DetailedServiceInstance):
     :param str message: message attached to a service
     '''
 
+    __slots__ = ('content_bindings',)
+
     def __init__(self, content_bindings, **kwargs):
         super(InboxDetailedService, self).__init__(**kwargs)
         self.content_bindings = content_bindings
@@ -258,16 +427,107 @@ class ContentBlock(Entity):
     :param str content: TAXII message payload
     :param `cabby.entities.ContentBinding` content_binding: Content Binding
     :param datetime timestamp: content block timestamp label
+    :param str timestamp_label: timestamp label as received, parsed
+           into ``timestamp`` on first access if ``timestamp`` is ``None``
     '''
 
-    def __init__(self, content, content_binding, timestamp):
+    __slots__ = ('content', 'binding', '_timestamp', 'timestamp_label')
+
+    def __init__(self, content, content_binding, timestamp,
+                 timestamp_label=None):
         self.content = content
         self.binding = content_binding
-        self.timestamp = timestamp
+        self._timestamp = timestamp
+        self.timestamp_label = timestamp_label
+
+    @property
+    def timestamp(self):
+        if self._timestamp is None and self.timestamp_label:
+            self._timestamp = parse_timestamp_label(self.timestamp_label)
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, value):
+        self._timestamp = value
 
     def __repr__(self):
         t = '{cls}(timestamp={timestamp})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, timestamp=self.timestamp)
+
+
+class LazyContentBlock(ContentBlock):
+    '''Content Block entity converting its fields on first access.
+
+    Keeps Content Block element serialized, ``content``, ``binding``,
+    ``timestamp`` and ``raw`` are materialized only when accessed.
+    Filtering on binding or timestamp does not touch the payload.
+
+    :param str namespace: TAXII namespace of the element
+    :param bytes data: serialized Content Block element
+    :param str binding_id: Content Binding ID
+    :param list subtypes: Content Subtypes IDs
+    :param str timestamp_label: timestamp label as received, or ``None``
+    '''
+
+    def __init__(self, namespace, data, binding_id, subtypes=None,
+                 timestamp_label=None):
+        self.namespace = namespace
+        self.data = data
+        self.binding_id = binding_id
+        self.subtypes = subtypes
+        self.timestamp_label = timestamp_label
+        self._timestamp = None
+
+    def _parse(self):
+        return etree.fromstring(self.data, _lazy_parser)
+
+    @_lazy_attribute
+    def content(self):
+        content = self._parse().find('{%s}Content' % self.namespace)
+        if len(content):
+            # XML content
+            return etree.tostring(content[0], encoding='utf-8')
+        return (content.text or '').encode('utf-8')
+
+    @_lazy_attribute
+    def binding(self):
+        return ContentBinding(self.binding_id, subtypes=self.subtypes)
+
+    @_lazy_attribute
+    def raw(self):
+        module = const.MODULES[self.namespace]
+        return module.ContentBlock.from_etree(self._parse())
+
+
+class PushStatus(Entity):
+    '''Status of an Inbox Message pushed by ``push_many``.
+
+    :param str message_id: ID of the Inbox Message
+    :param int blocks: number of content blocks in the message
+    :param str status: status type, ``SUCCESS`` or an error status
+           returned by the server, ``None`` if no Status Message
+           was received
+    :param str message: message attached to the Status Message
+    :param Exception error: exception raised while pushing the message
+    '''
+
+    __slots__ = ('message_id', 'blocks', 'status', 'message', 'error')
+
+    def __init__(self, message_id, blocks, status=const.ST_SUCCESS,
+                 message=None, error=None):
+        self.message_id = message_id
+        self.blocks = blocks
+        self.status = status
+        self.message = message
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None and self.status == const.ST_SUCCESS
+
+    def __repr__(self):
+        t = '{cls}(message_id={message_id}, blocks={blocks}, status={status})'
+        return t.format(cls=type(self).__name__, **self._asdict())
 
 
 class SubscriptionResponse(Entity):
@@ -278,6 +538,8 @@ class SubscriptionResponse(Entity):
     :param list subscriptions: a list of `cabby.entities.Subscription`
     '''
 
+    __slots__ = ('collection_name', 'message', 'subscriptions')
+
     def __init__(self, collection_name, message=None, subscriptions=None):
         self.collection_name = collection_name
         self.message = message
@@ -285,7 +547,7 @@ class SubscriptionResponse(Entity):
 
     def __repr__(self):
         t = '{cls}(collection_name={collection_name})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, **self._asdict())
 
 
 class Subscription(Entity):
@@ -300,6 +562,10 @@ class Subscription(Entity):
                 a list of `cabby.entities.SubscriptionParameters`
     :param list poll_instances: a list of `cabby.entities.ServiceInstance`
     '''
+
+    __slots__ = (
+        'id', 'status', 'delivery_parameters', 'subscription_parameters',
+        'poll_instances')
     STATUS_UNKNOWN = 'UNKNOWN'
     STATUS_ACTIVE = const.SS_ACTIVE
     STATUS_PAUSED = const.SS_PAUSED
@@ -320,4 +586,4 @@ class Subscription(Entity):
 
     def __repr__(self):
         t = '{cls}(subscription_id={id}, status={status})'
-        return t.format(cls=type(self).__name__, **vars(self))
+        return t.format(cls=type(self).__name__, **self._asdict())
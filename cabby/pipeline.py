@@ -0,0 +1,134 @@
+'''
+Push pipeline accepting content blocks from producer threads and
+pushing them into Inbox Service concurrently.
+'''
+import threading
+
+from six.moves import queue
+
+_DONE = object()
+
+
+class PushPipeline(object):
+    '''
+    Push content blocks put by producers into Inbox Service.
+
+    Blocks are packed into Inbox Messages as by ``push_many`` and at
+    most ``workers`` messages are pushed at a time. Blocks wait in
+    a queue of ``queue_size`` blocks, :py:meth:`put` blocks producers
+    while the queue is full. Failed messages are reported in
+    :py:attr:`statuses` without stopping the pipeline.
+
+    Use the pipeline as a context manager or call :py:meth:`close`
+    to push remaining blocks and wait for the pushes to finish::
+
+        with PushPipeline(client, workers=8, uri='/services/inbox') as p:
+            for content in contents:
+                p.put(content, CB_STIX_XML_111)
+
+        failed = [s for s in p.statuses if not s.success]
+
+    :param client: client instance, its connection pool should keep at
+           least ``workers`` connections
+    :param list collection_names: destination collection names
+           (TAXII 1.1 only)
+    :param int max_blocks: maximum number of blocks in a message
+    :param int max_bytes: maximum total content size of a message
+    :param int workers: maximum number of messages pushed concurrently
+    :param int queue_size: maximum number of blocks waiting to be packed
+    :param str uri: URI path to a specific Inbox Service
+
+    :raises `cabby.exceptions.ServiceNotFoundError`:
+            if no ``uri`` provided and Inbox Service could not be
+            discovered, when the pipeline is created
+    '''
+
+    def __init__(self, client, collection_names=None, max_blocks=100,
+                 max_bytes=None, workers=4, queue_size=1000, uri=None):
+
+        if workers < 1:
+            raise ValueError('Number of workers should be positive')
+
+        #: list of :py:class:`cabby.entities.PushStatus`, in order of
+        #: messages, filled while messages are pushed
+        self.statuses = []
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._error = None
+
+        statuses = client._push_messages(
+            self._iter_blocks(), max_blocks, max_bytes, uri=uri,
+            collection_names=collection_names, workers=workers)
+
+        self._thread = threading.Thread(target=self._run, args=(statuses,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, content, content_binding=None, timestamp=None,
+            timeout=None):
+        '''
+        Add content block to the pipeline, waiting while the queue
+        is full.
+
+        :param content: content to push or
+               a :py:class:`cabby.entities.ContentBlock` entity
+        :param content_binding: content binding for a content
+        :param datetime timestamp: timestamp label of the content block
+        :param float timeout: seconds to wait for a free place in the
+               queue, forever by default
+
+        :raises `six.moves.queue.Full`: if timeout expired
+        '''
+        if self._closed:
+            raise ValueError('Pipeline is closed')
+
+        if content_binding is None:
+            block = content
+        else:
+            block = (content, content_binding, timestamp)
+
+        self._queue.put(block, timeout=timeout)
+
+    def close(self):
+        '''
+        Push remaining blocks and wait for all pushes to finish.
+
+        :return: status of every Inbox Message sent
+        :rtype: list of :py:class:`cabby.entities.PushStatus`
+
+        :raises Exception: unexpected error that stopped the pipeline,
+                errors of individual messages are reported in statuses
+        '''
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_DONE)
+            self._thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+        return self.statuses
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _iter_blocks(self):
+        while True:
+            block = self._queue.get()
+            if block is _DONE:
+                return
+            yield block
+
+    def _run(self, statuses):
+        try:
+            for status in statuses:
+                self.statuses.append(status)
+        except Exception as e:
+            self._error = e
+            # Do not leave producers blocked on a full queue
+            for _ in self._iter_blocks():
+                pass
@@ -0,0 +1,214 @@
+'''
+Scheduler polling many collections on intervals within one process.
+
+Clients, and so their connection pools and discovered services, are
+kept per server for the lifetime of the scheduler. Polls run on
+a bounded pool of worker threads, with a cap on concurrent polls per
+server, and resume from checkpoints with
+:py:meth:`cabby.abstract.AbstractClient.poll_incremental`.
+'''
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .checkpoints import MemoryCheckpointStore
+
+log = logging.getLogger(__name__)
+
+# Longest sleep between checks for due jobs
+_MAX_WAIT = 60
+
+
+class _Server(object):
+
+    def __init__(self, name, client, max_concurrency):
+        self.name = name
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.running = 0
+
+
+class _Job(object):
+
+    def __init__(self, server, collection_name, interval, sink, poll_params):
+        self.server = server
+        self.collection_name = collection_name
+        self.interval = interval
+        self.sink = sink
+        self.poll_params = poll_params
+        self.next_run = None
+        self.running = False
+
+    def __repr__(self):
+        return '{}/{}'.format(self.server.name, self.collection_name)
+
+
+class Scheduler(object):
+    '''
+    Poll collections of TAXII servers on intervals.
+
+    Next poll of a collection is scheduled ``interval`` seconds after
+    the previous one finished, randomly shifted by up to ``jitter``
+    fraction of the interval, so that polls started together spread
+    over time. First polls are spread over ``jitter`` fraction of
+    their intervals too.
+
+    :param checkpoint_store: a
+           :py:class:`cabby.checkpoints.CheckpointStore` instance,
+           checkpoints are kept in memory by default
+    :param int workers: maximum number of concurrent polls
+    :param float jitter: fraction of the interval to shift polls by
+    :param int batch_size: maximum number of blocks passed to a sink
+           at once
+    '''
+
+    def __init__(self, checkpoint_store=None, workers=4, jitter=0.1,
+                 batch_size=1000):
+
+        if workers < 1:
+            raise ValueError('Number of workers should be positive')
+        if not 0 <= jitter < 1:
+            raise ValueError('Jitter should be between 0 and 1')
+
+        self.checkpoint_store = checkpoint_store or MemoryCheckpointStore()
+        self.workers = workers
+        self.jitter = jitter
+        self.batch_size = batch_size
+
+        self._servers = {}
+        self._jobs = []
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    def add_server(self, name, client, max_concurrency=1):
+        '''
+        Register a server.
+
+        :param str name: server name, referenced by jobs
+        :param client: client instance, shared by all polls of the server
+        :param int max_concurrency: maximum number of concurrent polls
+               of the server
+        '''
+        if max_concurrency < 1:
+            raise ValueError('Maximum concurrency should be positive')
+        self._servers[name] = _Server(name, client, max_concurrency)
+
+    def add_job(self, server_name, collection_name, interval, sink,
+                **poll_params):
+        '''
+        Schedule periodic polling of a collection.
+
+        :param str server_name: name of a registered server
+        :param str collection_name: collection to poll
+        :param float interval: seconds between the end of a poll and
+               the start of the next one
+        :param sink: a :py:class:`cabby.sinks.Sink` instance receiving
+               polled content blocks
+        :param poll_params: ``subscription_id``, ``content_bindings``
+               or ``uri`` arguments for
+               :py:meth:`cabby.abstract.AbstractClient.poll_incremental`
+        '''
+        if interval <= 0:
+            raise ValueError('Interval should be positive')
+        try:
+            server = self._servers[server_name]
+        except KeyError:
+            raise ValueError('Unknown server "{}"'.format(server_name))
+
+        self._jobs.append(
+            _Job(server, collection_name, interval, sink, poll_params))
+
+    def run(self):
+        '''
+        Run polls until :py:meth:`stop` is called, then wait for running
+        polls to finish.
+        '''
+        now = time.time()
+        for job in self._jobs:
+            job.next_run = now + random.uniform(0, self.jitter) * job.interval
+
+        log.info("Scheduling %d jobs on %d servers",
+                 len(self._jobs), len(self._servers))
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.clear()
+
+                with self._lock:
+                    due_jobs, next_run = self._get_due_jobs(time.time())
+                    for job in due_jobs:
+                        job.running = True
+                        job.server.running += 1
+                        executor.submit(self._run_job, job)
+
+                if not due_jobs:
+                    self._wakeup.wait(
+                        min(max(next_run - time.time(), 0), _MAX_WAIT))
+        finally:
+            executor.shutdown(wait=True)
+
+    def stop(self):
+        '''
+        Stop scheduling polls. Running polls stop after the batch
+        being processed, which is polled again on the next run.
+        '''
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _get_due_jobs(self, now):
+        # Jobs that can be started now, and the time to check again
+        running = sum(job.running for job in self._jobs)
+        capacity = {
+            server: server.max_concurrency - server.running
+            for server in self._servers.values()}
+
+        due_jobs = []
+        next_run = now + _MAX_WAIT
+
+        waiting = sorted(
+            (job for job in self._jobs if not job.running),
+            key=lambda job: job.next_run)
+
+        for job in waiting:
+            if job.next_run > now:
+                next_run = min(next_run, job.next_run)
+                break
+            if running + len(due_jobs) >= self.workers:
+                break
+            if capacity[job.server] > 0:
+                capacity[job.server] -= 1
+                due_jobs.append(job)
+
+        return due_jobs, next_run
+
+    def _run_job(self, job):
+        log.info("Polling %s", job)
+        blocks = 0
+        try:
+            batches = job.server.client.poll_incremental(
+                job.collection_name, self.checkpoint_store,
+                size=self.batch_size, **job.poll_params)
+
+            for batch in batches:
+                job.sink.write(job.collection_name, batch)
+                blocks += len(batch)
+
+                if self._stopped.is_set():
+                    batches.close()
+                    break
+        except Exception:
+            log.exception("Polling %s failed", job)
+        else:
+            log.info("%d blocks polled from %s", blocks, job)
+        finally:
+            with self._lock:
+                job.running = False
+                job.server.running -= 1
+                shift = random.uniform(-self.jitter, self.jitter)
+                job.next_run = time.time() + job.interval * (1 + shift)
+            self._wakeup.set()
@@ -0,0 +1,102 @@
+'''
+Sinks receiving batches of content blocks polled by
+:py:class:`cabby.scheduler.Scheduler`.
+
+A batch is acknowledged, and the checkpoint of its collection advanced,
+only after :py:meth:`Sink.write` returns, so sinks should raise
+if content could not be stored.
+'''
+import hashlib
+import importlib
+import os
+import re
+import sys
+import threading
+
+
+class Sink(object):
+    '''
+    Sink interface.
+    '''
+
+    def write(self, collection_name, blocks):
+        '''
+        Store a batch of content blocks.
+
+        :param str collection_name: name of the collection blocks
+               were polled from
+        :param list blocks: list of :py:class:`cabby.entities.ContentBlock`
+        '''
+        raise NotImplementedError()
+
+    def close(self):
+        '''
+        Release resources held by the sink.
+        '''
+
+
+class StreamSink(Sink):
+    '''
+    Sink writing content of blocks to a binary stream, one block per line.
+
+    :param stream: binary file object, standard output by default
+    '''
+
+    def __init__(self, stream=None):
+        self.stream = stream or getattr(sys.stdout, 'buffer', sys.stdout)
+        self._lock = threading.Lock()
+
+    def write(self, collection_name, blocks):
+        with self._lock:
+            for block in blocks:
+                self.stream.write(block.content + b'\n')
+            self.stream.flush()
+
+
+class DirectorySink(Sink):
+    '''
+    Sink saving content of every block to a file in a directory, named
+    after the collection and the MD5 hash of the content.
+
+    :param str path: directory to save content to, created if missing
+    '''
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+    def write(self, collection_name, blocks):
+        prefix = re.sub(r"[^\w]+", "-", collection_name)
+
+        for block in blocks:
+            filename = '{}_{}'.format(
+                prefix, hashlib.md5(block.content).hexdigest())
+
+            with open(os.path.join(self.path, filename), 'wb') as f:
+                f.write(block.content)
+
+
+SINKS = {
+    'stream': StreamSink,
+    'directory': DirectorySink,
+}
+
+
+def create_sink(sink_type, **params):
+    '''
+    Create a sink by type name, one of :py:data:`SINKS` keys, or by
+    ``module:ClassName`` path of a custom :py:class:`Sink` subclass.
+    ``params`` are passed to the sink class.
+    '''
+    if sink_type in SINKS:
+        cls = SINKS[sink_type]
+    elif ':' in sink_type:
+        module_name, class_name = sink_type.split(':', 1)
+        cls = getattr(importlib.import_module(module_name), class_name)
+    else:
+        raise ValueError(
+            'Unknown sink type "{}", use one of: {} or module:ClassName'
+            .format(sink_type, ', '.join(sorted(SINKS))))
+
+    return cls(**params)
@@ -1,9 +1,10 @@
 
 import pytz
+import six
 from datetime import datetime
 import libtaxii.messages_11 as tm11
 
-from .entities import ContentBinding
+from .entities import ContentBinding, LazyContentBlock
 
 
 def get_utc_now():
@@ -39,6 +40,110 @@ def pack_content_bindings(content_bindings, version):
     return bindings
 
 
+def split_time_window(begin_date, end_date, shards):
+    '''
+    Split time window into ``shards`` contiguous sub-windows.
+
+    Windows follow TAXII semantics: begin is exclusive and end is inclusive,
+    so each sub-window starts exactly where the previous one ends.
+    '''
+    if shards < 1:
+        raise ValueError('Number of shards should be positive')
+    if end_date <= begin_date:
+        raise ValueError('End of the time window should be after its begin')
+
+    step = (end_date - begin_date) / shards
+
+    boundaries = [begin_date + step * i for i in range(shards)]
+    boundaries.append(end_date)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def batch_content_blocks(blocks, size=None, max_bytes=None):
+    '''
+    Group content blocks into lists of at most ``size`` blocks with at
+    most ``max_bytes`` bytes of content in total. A block larger than
+    ``max_bytes`` forms a batch on its own.
+    '''
+    return _iter_batches(blocks, ContentBlockBatcher(size, max_bytes))
+
+
+def _iter_batches(blocks, batcher):
+    for block in blocks:
+        for batch in batcher.add(block):
+            yield batch
+
+    batch = batcher.flush()
+    if batch:
+        yield batch
+
+
+class ContentBlockBatcher(object):
+    '''
+    Group content blocks into batches as in :py:func:`batch_content_blocks`,
+    with blocks added one at a time by any kind of iteration.
+
+    :raises ValueError:
+            if both limits are ``None`` or not positive
+    '''
+
+    def __init__(self, size=None, max_bytes=None):
+        if size is None and max_bytes is None:
+            raise ValueError('Batch size or max_bytes should be provided')
+        if (size is not None and size < 1) or (
+                max_bytes is not None and max_bytes < 1):
+            raise ValueError('Batch limits should be positive')
+
+        self.size = size
+        self.max_bytes = max_bytes
+        self._batch = []
+        self._batch_bytes = 0
+
+    def add(self, block):
+        '''
+        Add a block, returning the list of batches it completed.
+        '''
+        completed = []
+
+        if self.max_bytes is not None:
+            # Measured once, XML content is serialized on every access
+            block_bytes = _get_content_size(block)
+            if self._batch and (
+                    self._batch_bytes + block_bytes > self.max_bytes):
+                completed.append(self.flush())
+            self._batch_bytes += block_bytes
+
+        self._batch.append(block)
+
+        if self.size is not None and len(self._batch) >= self.size:
+            completed.append(self.flush())
+
+        return completed
+
+    def flush(self):
+        '''
+        Return the batch started so far, possibly empty, and start
+        a new one.
+        '''
+        batch = self._batch
+        self._batch = []
+        self._batch_bytes = 0
+        return batch
+
+
+def _get_content_size(block):
+    # Size of the content in bytes
+    if isinstance(block, LazyContentBlock) and 'content' not in vars(block):
+        # Do not materialize content just to measure it
+        return len(block.data)
+
+    content = block.content
+    if isinstance(content, six.text_type):
+        content = content.encode('utf-8')
+    return len(content)
+
+
 def if_key_encrypted(key_file):
     with open(key_file, 'r') as f:
         return 'Proc-Type: 4,ENCRYPTED' in f.read()
@@ -14,6 +14,7 @@ Cabby commands you can run:
   taxii-poll
   taxii-proxy
   taxii-push
+  taxii-scheduler
   taxii-subscriptions
 EOF
 
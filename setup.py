@@ -36,9 +36,13 @@ setup(
             'taxii-discovery=cabby.cli:discover_services',
             'taxii-collections=cabby.cli:fetch_collections',
             'taxii-subscription=cabby.cli:manage_subscription',
+            'taxii-scheduler=cabby.cli:run_scheduler',
         ]
     },
     install_requires=install_requires,
+    extras_require={
+        'async': ['aiohttp>=3.6'],
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
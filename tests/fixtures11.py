@@ -114,6 +114,17 @@ POLL_RESPONSE_WITH_MORE_2 = '''
 ''' % dict(collection_name=POLL_COLLECTION, block_2=CONTENT_BLOCKS[1])
 
 
+POLL_RESPONSE_PART = '''
+<taxii_11:Poll_Response xmlns:taxii_11="http://taxii.mitre.org/messages/taxii_xml_binding-1.1" message_id="%(part)s" in_response_to="65684" collection_name="%(collection_name)s" more="%(more)s" result_part_number="%(part)s" result_id="1">
+    <taxii_11:Content_Block>
+        <taxii_11:Content_Binding binding_id="urn:stix.mitre.org:xml:1.1.1"/>
+        <taxii_11:Content>Content Block %(part)s</taxii_11:Content>
+        <taxii_11:Timestamp_Label>2015-01-22T15:28:49.947928+00:00</taxii_11:Timestamp_Label>
+    </taxii_11:Content_Block>
+</taxii_11:Poll_Response>
+'''
+
+
 SUBSCRIPTION_RESPONSE = '''
 <taxii_11:Subscription_Management_Response xmlns:taxii="http://taxii.mitre.org/messages/taxii_xml_binding-1.1" xmlns:taxii_11="http://taxii.mitre.org/messages/taxii_xml_binding-1.1" xmlns:tdq="http://taxii.mitre.org/query/taxii_default_query-1.1" message_id="SubsResp01" in_response_to="xyz" collection_name="%(collection_name)s">
     <taxii_11:Message>Some subscription message</taxii_11:Message>
@@ -0,0 +1,564 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from lxml import etree
+
+from libtaxii import messages_11 as tm11
+from libtaxii.constants import CB_STIX_XML_111
+
+from cabby import create_async_client
+from cabby import entities
+from cabby import exceptions as exc
+from cabby.checkpoints import MemoryCheckpointStore
+from cabby.constants import XML_10_BINDING, XML_11_BINDING, RT_COUNT_ONLY
+
+from fixtures11 import (
+    DISCOVERY_PATH, DISCOVERY_RESPONSE, COLLECTION_MANAGEMENT_PATH,
+    COLLECTION_MANAGEMENT_RESPONSE, INBOX_PATH, INBOX_RESPONSE, POLL_PATH,
+    POLL_COLLECTION, POLL_RESPONSE, POLL_RESPONSE_PART, SUBSCRIPTION_RESPONSE,
+    SUBSCRIPTION_ID, CONTENT, CONTENT_BINDING, CONTENT_BLOCKS)
+from fixtures10 import POLL_RESPONSE as POLL_RESPONSE_10
+from fixtures10 import FEED_MANAGEMENT_RESPONSE
+
+web = pytest.importorskip('aiohttp.web')
+test_utils = pytest.importorskip('aiohttp.test_utils')
+
+JWT_PATH = '/management/auth/'
+
+
+# Utils
+
+
+class TaxiiServer(object):
+    '''
+    Local aiohttp server replying with queued responses per path.
+    The last queued response for a path is repeated. A callable body
+    is called with the request message to build the response body.
+    '''
+
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+
+    def add(self, path, body='', status=200, binding=XML_11_BINDING,
+            content_type='application/xml'):
+        self.responses.setdefault(path, []).append(
+            (status, body, binding, content_type))
+
+    def sent_messages(self, path):
+        return [tm11.get_message_from_xml(body)
+                for p, headers, body in self.requests if p == path]
+
+    async def handle(self, request):
+        body = await request.read()
+        self.requests.append((request.path, request.headers, body))
+
+        queued = self.responses[request.path]
+        status, response_body, binding, content_type = (
+            queued.pop(0) if len(queued) > 1 else queued[0])
+        if callable(response_body):
+            response_body = response_body(tm11.get_message_from_xml(body))
+
+        return web.Response(
+            status=status, text=response_body, content_type=content_type,
+            headers={'X-TAXII-Content-Type': binding})
+
+    def run(self, func, **kwargs):
+        '''
+        Start the server and call ``func(client)`` with a client
+        pointing to it.
+        '''
+        async def main():
+            app = web.Application()
+            app.router.add_route('POST', '/{path:.*}', self.handle)
+
+            async with test_utils.TestServer(app) as server:
+                client = create_async_client(
+                    server.host, port=server.port, **kwargs)
+                async with client:
+                    return await func(client)
+
+        # asyncio.run is not available in Python 3.6
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(main())
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+async def collect(agen):
+    return [item async for item in agen]
+
+
+# Tests
+
+
+def test_discovery():
+    server = TaxiiServer()
+    server.add(DISCOVERY_PATH, DISCOVERY_RESPONSE)
+
+    services = server.run(lambda client: client.discover_services(),
+                          discovery_path=DISCOVERY_PATH)
+
+    assert len(services) == 4
+    assert all(isinstance(s, entities.DetailedServiceInstance)
+               for s in services)
+
+
+def test_get_collections():
+    server = TaxiiServer()
+    server.add(COLLECTION_MANAGEMENT_PATH, COLLECTION_MANAGEMENT_RESPONSE)
+
+    collections = server.run(
+        lambda client: client.get_collections(uri=COLLECTION_MANAGEMENT_PATH))
+
+    assert len(collections) == 2
+    assert all(isinstance(c, entities.Collection) for c in collections)
+
+
+def test_poll_with_fulfilment():
+    server = TaxiiServer()
+    total_parts = 3
+
+    for part in range(1, total_parts + 1):
+        server.add(POLL_PATH, POLL_RESPONSE_PART % dict(
+            collection_name=POLL_COLLECTION,
+            part=part,
+            more='true' if part < total_parts else 'false'))
+
+    blocks = server.run(
+        lambda client: collect(client.poll(POLL_COLLECTION, uri=POLL_PATH)))
+    messages = server.sent_messages(POLL_PATH)
+
+    assert len(blocks) == total_parts
+    assert all(isinstance(b, entities.ContentBlock) for b in blocks)
+
+    assert isinstance(messages[0], tm11.PollRequest)
+    assert [m.result_part_number for m in messages[1:]] == [2, 3]
+
+
+def test_poll_single_part():
+    server = TaxiiServer()
+    server.add(POLL_PATH, POLL_RESPONSE)
+
+    blocks = server.run(
+        lambda client: collect(client.poll(POLL_COLLECTION, uri=POLL_PATH)))
+
+    assert [b.content.decode('utf-8') for b in blocks] == list(CONTENT_BLOCKS)
+
+
+def test_poll_stopped_early_closes_response_stream():
+    server = TaxiiServer()
+    server.add(POLL_PATH, POLL_RESPONSE)
+    closed = []
+
+    async def poll_first(client):
+        execute_request = client._execute_request
+
+        async def tracked_execute_request(*args, **kwargs):
+            stream = await execute_request(*args, **kwargs)
+            try:
+                async for obj in stream:
+                    yield obj
+            finally:
+                closed.append(True)
+
+        async def execute(*args, **kwargs):
+            return tracked_execute_request(*args, **kwargs)
+
+        client._execute_request = execute
+
+        blocks = client.poll(POLL_COLLECTION, uri=POLL_PATH)
+        async for block in blocks:
+            break
+        await blocks.aclose()
+        return bool(closed)
+
+    assert server.run(poll_first)
+
+
+def test_poll_10():
+    server = TaxiiServer()
+    server.add(POLL_PATH, POLL_RESPONSE_10, binding=XML_10_BINDING)
+
+    blocks = server.run(
+        lambda client: collect(client.poll(POLL_COLLECTION, uri=POLL_PATH)),
+        version='1.0')
+
+    assert len(blocks) == len(CONTENT_BLOCKS)
+
+
+def test_get_collections_10():
+    server = TaxiiServer()
+    server.add(COLLECTION_MANAGEMENT_PATH, FEED_MANAGEMENT_RESPONSE,
+               binding=XML_10_BINDING)
+
+    collections = server.run(
+        lambda client: client.get_collections(uri=COLLECTION_MANAGEMENT_PATH),
+        version='1.0')
+
+    assert all(isinstance(c, entities.Collection) for c in collections)
+
+
+def test_push_and_subscribe():
+    server = TaxiiServer()
+    server.add(INBOX_PATH, INBOX_RESPONSE)
+    server.add(COLLECTION_MANAGEMENT_PATH, SUBSCRIPTION_RESPONSE)
+
+    async def push_and_subscribe(client):
+        await client.push(CONTENT, CONTENT_BINDING, uri=INBOX_PATH)
+        return await client.subscribe(
+            POLL_COLLECTION, uri=COLLECTION_MANAGEMENT_PATH)
+
+    response = server.run(push_and_subscribe)
+    message = server.sent_messages(INBOX_PATH)[0]
+
+    assert isinstance(message, tm11.InboxMessage)
+    assert message.content_blocks[0].content == CONTENT
+
+    assert isinstance(response, entities.SubscriptionResponse)
+    assert response.subscriptions[0].id == SUBSCRIPTION_ID
+
+
+def test_session_reuse():
+    server = TaxiiServer()
+    server.add(POLL_PATH, POLL_RESPONSE)
+
+    async def poll_twice(client):
+        await collect(client.poll(POLL_COLLECTION, uri=POLL_PATH))
+        session = client._async_session
+        await collect(client.poll(POLL_COLLECTION, uri=POLL_PATH))
+        return session, client
+
+    session, client = server.run(poll_twice)
+
+    assert session is not None
+    assert session.closed
+    assert client._async_session is None
+
+
+def test_sync_context_manager_not_supported():
+    client = create_async_client('localhost')
+
+    with pytest.raises(TypeError) as e:
+        with client:
+            pass
+
+    assert 'async with' in str(e.value)
+
+
+def test_thread_prefetching_not_supported():
+    client = create_async_client('localhost')
+
+    with pytest.raises(NotImplementedError):
+        client._prefetch_parts(POLL_COLLECTION, 'result-id', 2, prefetch=2)
+
+    with pytest.raises(NotImplementedError):
+        client._fetch_part(POLL_COLLECTION, 'result-id', 2)
+
+
+def test_http_error():
+    server = TaxiiServer()
+    server.add(POLL_PATH, status=404)
+
+    with pytest.raises(exc.HTTPError) as e:
+        server.run(lambda client: collect(
+            client.poll(POLL_COLLECTION, uri=POLL_PATH)))
+
+    assert '404' in str(e.value)
+
+
+def test_jwt_auth():
+    server = TaxiiServer()
+    server.add(JWT_PATH, json.dumps({'token': 'abc'}),
+               content_type='application/json')
+    server.add(POLL_PATH, POLL_RESPONSE)
+
+    async def poll(client):
+        client.set_auth(
+            username='username', password='pass', jwt_auth_url=JWT_PATH)
+        blocks = await collect(client.poll(POLL_COLLECTION, uri=POLL_PATH))
+        return client.jwt_token, blocks
+
+    token, blocks = server.run(poll)
+
+    (jwt_path, _, jwt_body), (_, poll_headers, _) = server.requests
+
+    assert token == 'abc'
+    assert jwt_path == JWT_PATH
+    assert json.loads(jwt_body.decode('utf-8')) == {
+        'username': 'username', 'password': 'pass'}
+    assert poll_headers['Authorization'] == 'Bearer abc'
+    assert len(blocks) == len(CONTENT_BLOCKS)
+
+
+def poll_part(message, total_parts=3):
+    # Poll Request gets the first part, Poll Fulfillment the requested one
+    part = getattr(message, 'result_part_number', 1)
+    return POLL_RESPONSE_PART % dict(
+        collection_name=POLL_COLLECTION,
+        part=part,
+        more='true' if part < total_parts else 'false')
+
+
+def poll_window(timestamps):
+    # Count or poll blocks with timestamps in the requested window
+    def respond(message):
+        in_window = [
+            t for t in timestamps
+            if message.exclusive_begin_timestamp_label < t <=
+            message.inclusive_end_timestamp_label]
+
+        response = tm11.PollResponse(
+            message_id='1',
+            in_response_to=message.message_id,
+            collection_name=message.collection_name,
+            more=False,
+            result_part_number=1)
+
+        if message.poll_parameters.response_type == RT_COUNT_ONLY:
+            response.record_count = tm11.RecordCount(len(in_window))
+        else:
+            response.content_blocks = [
+                tm11.ContentBlock(
+                    content_binding=tm11.ContentBinding(CB_STIX_XML_111),
+                    content=t.isoformat(),
+                    timestamp_label=t)
+                for t in reversed(in_window)]
+
+        return response.to_xml().decode('utf-8')
+
+    return respond
+
+
+def test_poll_raw():
+    server = TaxiiServer()
+    server.add(POLL_PATH, poll_part)
+
+    blocks = server.run(lambda client: collect(
+        client.poll_raw(POLL_COLLECTION, uri=POLL_PATH)))
+
+    assert blocks == [
+        (CB_STIX_XML_111, '2015-01-22T15:28:49.947928+00:00',
+         'Content Block {}'.format(part).encode('utf-8'))
+        for part in range(1, 4)]
+
+
+def test_poll_raw_10():
+    server = TaxiiServer()
+    server.add(POLL_PATH, POLL_RESPONSE_10, binding=XML_10_BINDING)
+
+    blocks = server.run(
+        lambda client: collect(
+            client.poll_raw(POLL_COLLECTION, uri=POLL_PATH)),
+        version='1.0')
+
+    assert [content.decode('utf-8') for _, _, content in blocks] == list(
+        CONTENT_BLOCKS)
+
+
+def test_poll_batches():
+    server = TaxiiServer()
+    server.add(POLL_PATH, lambda message: poll_part(message, total_parts=5))
+
+    batches = server.run(lambda client: collect(
+        client.poll_batches(POLL_COLLECTION, size=2, uri=POLL_PATH)))
+
+    assert [[b.content.decode('utf-8') for b in batch]
+            for batch in batches] == [
+        ['Content Block 1', 'Content Block 2'],
+        ['Content Block 3', 'Content Block 4'],
+        ['Content Block 5']]
+
+
+def test_poll_incremental_resumes_result():
+    server = TaxiiServer()
+    server.add(POLL_PATH, poll_part)
+    store = MemoryCheckpointStore()
+
+    async def poll(client):
+        key = (client._prepare_url(POLL_PATH), POLL_COLLECTION, '')
+
+        batches = client.poll_incremental(
+            POLL_COLLECTION, store, size=1, uri=POLL_PATH)
+        first = await batches.__anext__()
+        await batches.__anext__()
+        # Crash while processing the second batch
+        await batches.aclose()
+
+        # Only the first part was acknowledged
+        assert store.get(key) is None
+        assert store.get_fulfilment(key) == ('1', 1)
+
+        rest = await collect(client.poll_incremental(
+            POLL_COLLECTION, store, size=1, uri=POLL_PATH))
+
+        assert store.get_fulfilment(key) is None
+        return first, rest, store.get(key)
+
+    first, rest, checkpoint = server.run(poll)
+    messages = server.sent_messages(POLL_PATH)
+
+    assert [b.content for batch in [first] + rest for b in batch] == [
+        'Content Block {}'.format(part).encode('utf-8')
+        for part in range(1, 4)]
+    assert [m.result_part_number for m in messages[2:]] == [2, 3]
+    assert checkpoint == datetime(
+        2015, 1, 22, 15, 28, 49, 947928, tzinfo=pytz.UTC)
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_poll_sharded(ordered):
+    begin = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+    end = begin + timedelta(days=8)
+    timestamps = [begin + timedelta(hours=h) for h in range(1, 192, 7)]
+
+    server = TaxiiServer()
+    server.add(POLL_PATH, poll_window(timestamps))
+
+    blocks = server.run(lambda client: collect(client.poll_sharded(
+        POLL_COLLECTION, begin, end, shards=4, workers=2, ordered=ordered,
+        uri=POLL_PATH)))
+    windows = [
+        (m.exclusive_begin_timestamp_label, m.inclusive_end_timestamp_label)
+        for m in server.sent_messages(POLL_PATH)]
+
+    assert sorted(windows) == [
+        (begin + timedelta(days=d), begin + timedelta(days=d + 2))
+        for d in range(0, 8, 2)]
+
+    polled = [b.timestamp for b in blocks]
+    if ordered:
+        assert polled == timestamps
+    else:
+        assert sorted(polled) == timestamps
+
+
+def test_poll_adaptive():
+    begin = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+    end = begin + timedelta(days=8)
+
+    # Most of the content is in the first day
+    timestamps = [begin + timedelta(hours=h) for h in range(1, 8)]
+    timestamps += [begin + timedelta(days=d) for d in range(2, 9, 3)]
+
+    server = TaxiiServer()
+    server.add(POLL_PATH, poll_window(timestamps))
+
+    async def poll(client):
+        windows = await client.plan_poll_windows(
+            POLL_COLLECTION, begin, end, max_count=3, uri=POLL_PATH)
+        blocks = await collect(client.poll_adaptive(
+            POLL_COLLECTION, begin, end, max_count=3, workers=3,
+            uri=POLL_PATH))
+        return windows, blocks
+
+    windows, blocks = server.run(poll)
+
+    assert [(b - begin, e - begin) for b, e in windows] == [
+        (timedelta(0), timedelta(hours=3)),
+        (timedelta(hours=3), timedelta(hours=6)),
+        (timedelta(hours=6), timedelta(hours=12)),
+        (timedelta(hours=12), timedelta(days=1)),
+        (timedelta(days=1), timedelta(days=2)),
+        (timedelta(days=2), timedelta(days=4)),
+        (timedelta(days=4), timedelta(days=8)),
+    ]
+    assert [b.timestamp for b in blocks] == timestamps
+
+
+def test_push_many():
+    def respond(message):
+        # Message with the third block is rejected
+        rejected = any(
+            b.content == 'c' * 10 for b in message.content_blocks)
+        return tm11.StatusMessage(
+            message_id='1', in_response_to=message.message_id,
+            status_type='FAILURE' if rejected else 'SUCCESS',
+            message='Status').to_xml().decode('utf-8')
+
+    server = TaxiiServer()
+    server.add(INBOX_PATH, respond)
+
+    async def blocks():
+        for content in ('a' * 10, 'b' * 10, 'c' * 10, 'd' * 30):
+            yield content, CONTENT_BINDING
+
+    statuses = server.run(lambda client: client.push_many(
+        blocks(), collection_names=[POLL_COLLECTION], max_blocks=2,
+        max_bytes=25, workers=2, uri=INBOX_PATH))
+    messages = server.sent_messages(INBOX_PATH)
+
+    assert sorted(
+        [b.content for b in m.content_blocks] for m in messages) == [
+        ['a' * 10, 'b' * 10], ['c' * 10], ['d' * 30]]
+    assert all(
+        m.destination_collection_names == [POLL_COLLECTION]
+        for m in messages)
+
+    assert [s.blocks for s in statuses] == [2, 1, 1]
+    assert [s.success for s in statuses] == [True, False, True]
+    assert statuses[1].status == 'FAILURE'
+    assert statuses[1].message == 'Status'
+
+
+def test_push_many_reports_http_error():
+    server = TaxiiServer()
+    server.add(INBOX_PATH, status=500)
+
+    statuses = server.run(lambda client: client.push_many(
+        [(CONTENT, CONTENT_BINDING)] * 3, max_blocks=2, uri=INBOX_PATH))
+
+    assert [s.blocks for s in statuses] == [2, 1]
+    assert not any(s.success for s in statuses)
+    assert all(isinstance(s.error, exc.HTTPError) for s in statuses)
+
+
+def test_push_many_reports_undecodable_content():
+    server = TaxiiServer()
+    server.add(INBOX_PATH, INBOX_RESPONSE)
+
+    blocks = [(CONTENT, CONTENT_BINDING), (b'\xff', CONTENT_BINDING)]
+
+    statuses = server.run(lambda client: client.push_many(
+        blocks, max_blocks=1, uri=INBOX_PATH))
+
+    assert len(server.sent_messages(INBOX_PATH)) == 1
+    assert [s.success for s in statuses] == [True, False]
+    assert isinstance(statuses[1].error, UnicodeDecodeError)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_push_stream(compress):
+    server = TaxiiServer()
+    server.add(INBOX_PATH, INBOX_RESPONSE)
+
+    async def blocks():
+        for i in range(3):
+            yield (
+                '<some:Content xmlns:some="urn:some">{}</some:Content>'
+                .format(i), CONTENT_BINDING)
+
+    async def push(client):
+        client.compress_requests = compress
+        client.compression_threshold = 10
+        await client.push_stream(
+            blocks(), collection_names=[POLL_COLLECTION], uri=INBOX_PATH)
+
+    server.run(push)
+    (_, headers, _), = server.requests
+    message, = server.sent_messages(INBOX_PATH)
+
+    assert headers['Transfer-Encoding'] == 'chunked'
+    assert headers.get('Content-Encoding') == ('gzip' if compress else None)
+
+    assert message.destination_collection_names == [POLL_COLLECTION]
+    assert [
+        etree.fromstring(b.content).text
+        for b in message.content_blocks] == ['0', '1', '2']
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from cabby import checkpoints
+
+
+KEY = ('http://example.com/poll', 'collection "a b"', '')
+OTHER_KEY = ('http://example.com/poll', 'collection "a b"', 'subscription')
+
+
+@pytest.fixture(params=['memory', 'json', 'sqlite'])
+def store_factory(request, tmpdir):
+    if request.param == 'memory':
+        store = checkpoints.MemoryCheckpointStore()
+        return lambda: store
+    elif request.param == 'json':
+        path = str(tmpdir.join('checkpoints.json'))
+    else:
+        path = str(tmpdir.join('checkpoints.db'))
+    return lambda: checkpoints.open_checkpoint_store(path)
+
+
+def test_checkpoint_store(store_factory):
+    timestamp = datetime(2015, 1, 22, 15, 28, 49, 947928, tzinfo=pytz.UTC)
+
+    store = store_factory()
+    assert store.get(KEY) is None
+
+    store.set(KEY, timestamp)
+    store.set(KEY, timestamp + timedelta(days=1))
+    store.set(OTHER_KEY, timestamp)
+
+    # Checkpoints survive reopening the store
+    store = store_factory()
+    assert store.get(KEY) == timestamp + timedelta(days=1)
+    assert store.get(OTHER_KEY) == timestamp
+    assert store.get(KEY).utcoffset() == timedelta(0)
+
+
+def test_fulfilment_progress(store_factory):
+    store = store_factory()
+    assert store.get_fulfilment(KEY) is None
+
+    store.set_fulfilment(KEY, 'result-1', 1)
+    store.set_fulfilment(KEY, 'result-1', 2)
+    store.set_fulfilment(OTHER_KEY, 'result-2', 1)
+
+    store = store_factory()
+    assert store.get_fulfilment(KEY) == ('result-1', 2)
+
+    store.delete_fulfilment(KEY)
+    store.delete_fulfilment(KEY)
+
+    store = store_factory()
+    assert store.get_fulfilment(KEY) is None
+    assert store.get_fulfilment(OTHER_KEY) == ('result-2', 1)
+
+
+def test_open_checkpoint_store(tmpdir):
+    assert isinstance(
+        checkpoints.open_checkpoint_store(str(tmpdir.join('a.sqlite'))),
+        checkpoints.SQLiteCheckpointStore)
+    assert isinstance(
+        checkpoints.open_checkpoint_store(str(tmpdir.join('a.json'))),
+        checkpoints.FileCheckpointStore)
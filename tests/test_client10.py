@@ -164,6 +164,21 @@ def test_poll():
     assert message.feed_name == POLL_FEED
 
 
+@responses.activate
+def test_poll_raw():
+
+    register_uri(POLL_URI, POLL_RESPONSE)
+
+    client = create_client_10()
+    blocks = list(client.poll_raw(POLL_FEED, uri=POLL_PATH))
+
+    assert len(blocks) == 2
+    assert all(isinstance(content, bytes) for _, _, content in blocks)
+
+    message = get_sent_message()
+    assert type(message) == tm10.PollRequest
+
+
 @responses.activate
 def test_poll_count_only():
 
@@ -317,3 +332,43 @@ def test_push():
     assert len(message.content_blocks) == 1
     assert message.content_blocks[0].content == CONTENT
     assert message.content_blocks[0].content_binding == CONTENT_BINDING
+
+
+@responses.activate
+def test_push_stream():
+
+    register_uri(INBOX_URI, INBOX_RESPONSE)
+
+    client = create_client_10()
+    client.push_stream(
+        iter([(CONTENT, CONTENT_BINDING)] * 2), uri=INBOX_URI)
+
+    request = responses.calls[-1].request
+    assert request.headers['Transfer-Encoding'] == 'chunked'
+
+    message = tm10.get_message_from_xml(b''.join(request.body))
+
+    assert type(message) == tm10.InboxMessage
+    assert len(message.content_blocks) == 2
+    assert message.content_blocks[1].content == CONTENT
+    assert message.content_blocks[1].content_binding == CONTENT_BINDING
+
+
+@responses.activate
+def test_push_many():
+
+    register_uri(INBOX_URI, INBOX_RESPONSE)
+
+    client = create_client_10()
+    statuses = client.push_many(
+        [(CONTENT, CONTENT_BINDING)] * 3, max_blocks=2, uri=INBOX_URI)
+
+    assert [s.blocks for s in statuses] == [2, 1]
+    assert all(s.success for s in statuses)
+
+    message = get_sent_message()
+
+    assert type(message) == tm10.InboxMessage
+    assert len(message.content_blocks) == 1
+    assert message.content_blocks[0].content == CONTENT
+    assert message.content_blocks[0].content_binding == CONTENT_BINDING
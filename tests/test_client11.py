@@ -1,19 +1,30 @@
 
+from datetime import datetime, timedelta
+import gzip
+import time
+
 import pytest
+import pytz
 import responses
 
+from lxml import etree
+
 from libtaxii import messages_11 as tm11
+from libtaxii.constants import ST_NOT_FOUND
 
 from cabby import create_client
 from cabby import exceptions as exc
 from cabby import entities
+from cabby import checkpoints
+from cabby import dispatcher
 from cabby.constants import (
-    XML_11_BINDING, SVC_INBOX, SVC_DISCOVERY, RT_COUNT_ONLY
+    XML_11_BINDING, SVC_INBOX, SVC_DISCOVERY, RT_COUNT_ONLY, STREAM_MARKER,
+    CB_STIX_XML_111
 )
 
 from fixtures11 import (
     HOST, CONTENT_BINDING, POLL_RESPONSE, POLL_RESPONSE_WITH_MORE_1,
-    POLL_RESPONSE_WITH_MORE_2, INBOX_RESPONSE, SUBSCRIPTION_ID,
+    POLL_RESPONSE_WITH_MORE_2, POLL_RESPONSE_PART, INBOX_RESPONSE, SUBSCRIPTION_ID,
     COLLECTION_MANAGEMENT_RESPONSE,
     POLL_PATH, COLLECTION_MANAGEMENT_PATH, DISCOVERY_RESPONSE,
     SUBSCRIPTION_RESPONSE, DISCOVERY_PATH, CONTENT_BLOCKS,
@@ -40,6 +51,37 @@ def register_uri(uri, body, **kwargs):
         **kwargs)
 
 
+def register_poll_parts(total_parts, record_count=None, delay=0):
+    requested_parts = []
+
+    def poll_callback(request):
+        message = tm11.get_message_from_xml(request.body)
+        if isinstance(message, tm11.PollRequest):
+            part = 1
+        else:
+            part = message.result_part_number
+        requested_parts.append(part)
+        time.sleep(delay)
+        body = POLL_RESPONSE_PART % dict(
+            collection_name=POLL_COLLECTION,
+            part=part,
+            more='true' if part < total_parts else 'false')
+        if record_count is not None:
+            body = body.replace(
+                '<taxii_11:Content_Block>',
+                '<taxii_11:Record_Count partial_count="false">{}'
+                '</taxii_11:Record_Count><taxii_11:Content_Block>'.format(
+                    record_count), 1)
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING}, body)
+
+    responses.add_callback(
+        responses.POST, POLL_URI,
+        callback=poll_callback,
+        content_type='application/xml')
+
+    return requested_parts
+
+
 def get_sent_message():
     body = responses.calls[-1].request.body
     print(repr(body))
@@ -127,6 +169,21 @@ def test_collections():
     assert type(message) == tm11.CollectionInformationRequest
 
 
+@responses.activate
+def test_collections_without_raw():
+
+    register_uri(COLLECTION_MANAGEMENT_URI, COLLECTION_MANAGEMENT_RESPONSE)
+
+    client = create_client_11()
+    client.keep_raw = False
+
+    collections = client.get_collections(uri=COLLECTION_MANAGEMENT_PATH)
+
+    assert all(c.raw is None for c in collections)
+    assert all(b.raw is None for c in collections for b in c.content_bindings)
+    assert all(s.raw is None for c in collections for s in c.polling_services)
+
+
 @responses.activate
 def test_collections_with_automatic_discovery():
 
@@ -158,6 +215,113 @@ def test_poll():
     assert message.collection_name == POLL_COLLECTION
 
 
+@responses.activate
+@pytest.mark.parametrize('parser', ['libtaxii', 'fast', 'lazy'])
+def test_poll_shares_content_bindings(parser):
+
+    register_uri(POLL_URI, POLL_RESPONSE)
+
+    client = create_client_11()
+    client.content_block_parser = parser
+    first, second = client.poll(POLL_COLLECTION, uri=POLL_PATH)
+
+    assert first.binding is second.binding
+    assert first.binding == entities.ContentBinding(CB_STIX_XML_111)
+
+
+@responses.activate
+def test_poll_without_raw():
+
+    register_uri(POLL_URI, POLL_RESPONSE)
+
+    client = create_client_11()
+    client.keep_raw = False
+    blocks = list(client.poll(POLL_COLLECTION, uri=POLL_PATH))
+
+    assert [b.content.decode('utf-8') for b in blocks] == list(CONTENT_BLOCKS)
+    assert all(b.raw is None and b.binding.raw is None for b in blocks)
+
+
+@responses.activate
+def test_poll_fast_content_block_parser():
+
+    register_uri(POLL_URI, POLL_RESPONSE)
+
+    client = create_client_11()
+    client.content_block_parser = 'fast'
+    blocks = list(client.poll(POLL_COLLECTION, uri=POLL_PATH))
+
+    assert [b.content.decode('utf-8') for b in blocks] == list(CONTENT_BLOCKS)
+    assert all(b.binding.id == CB_STIX_XML_111 for b in blocks)
+    assert blocks[0].timestamp.isoformat() == (
+        '2015-01-22T15:28:49.947928+00:00')
+
+
+@responses.activate
+def test_poll_lazy_content_block_parser():
+
+    register_uri(POLL_URI, POLL_RESPONSE)
+
+    client = create_client_11()
+    client.content_block_parser = 'lazy'
+    blocks = list(client.poll(POLL_COLLECTION, uri=POLL_PATH))
+
+    assert all(isinstance(b, entities.LazyContentBlock) for b in blocks)
+    assert [b.content.decode('utf-8') for b in blocks] == list(CONTENT_BLOCKS)
+    assert all(b.binding.id == CB_STIX_XML_111 for b in blocks)
+    assert blocks[0].timestamp.isoformat() == (
+        '2015-01-22T15:28:49.947928+00:00')
+
+
+@responses.activate
+@pytest.mark.parametrize('chunk_size', [1, 7, 1024])
+def test_poll_chunk_size(chunk_size):
+
+    register_uri(POLL_URI, POLL_RESPONSE)
+
+    client = create_client_11()
+    client.chunk_size = chunk_size
+    blocks = list(client.poll(POLL_COLLECTION, uri=POLL_PATH))
+
+    assert [b.content.decode('utf-8') for b in blocks] == list(CONTENT_BLOCKS)
+
+
+def test_response_parser_emits_blocks_incrementally():
+    parser = dispatcher.ResponseParser(
+        {'X-TAXII-Content-Type': XML_11_BINDING}, version=XML_11_BINDING)
+
+    body = POLL_RESPONSE.encode('utf-8')
+    first_block_end = body.index(b'</taxii_11:Content_Block>')
+    first_block_end += len(b'</taxii_11:Content_Block>')
+
+    assert parser.feed(body[:first_block_end - 1]) == [STREAM_MARKER]
+
+    objects = parser.feed(body[first_block_end - 1:first_block_end])
+    assert len(objects) == 1
+    assert objects[0].content == CONTENT_BLOCKS[0]
+
+    objects = parser.feed(body[first_block_end:]) + parser.close()
+    assert [type(obj) for obj in objects] == [
+        tm11.ContentBlock, tm11.PollResponse]
+
+
+def test_response_parser_matches_qualified_tags():
+    # Elements named as TAXII ones but in other namespaces are content
+    content = (
+        '<x:Content_Block xmlns:x="urn:example">'
+        '<x:Poll_Response/></x:Content_Block>')
+    body = POLL_RESPONSE.replace(CONTENT_BLOCKS[0], content)
+
+    parser = dispatcher.ResponseParser(
+        {'X-TAXII-Content-Type': XML_11_BINDING}, version=XML_11_BINDING)
+    objects = parser.feed(body.encode('utf-8')) + parser.close()
+
+    assert [type(obj) for obj in objects[1:]] == [
+        tm11.ContentBlock, tm11.ContentBlock, tm11.PollResponse]
+    assert etree.fromstring(objects[1].content).tag == (
+        '{urn:example}Content_Block')
+
+
 @responses.activate
 def test_poll_count_only():
 
@@ -250,6 +414,345 @@ def test_poll_with_fullfilment():
         next(gen)
 
 
+@responses.activate
+def test_poll_raw():
+
+    register_uri(POLL_URI, POLL_RESPONSE)
+
+    client = create_client_11()
+    blocks = list(client.poll_raw(POLL_COLLECTION, uri=POLL_PATH))
+
+    assert blocks == [
+        (CB_STIX_XML_111, '2015-01-22T15:28:49.947928+00:00',
+         CONTENT_BLOCKS[0].encode('utf-8')),
+        (CB_STIX_XML_111, '2015-01-25T15:28:49.947928+00:00',
+         CONTENT_BLOCKS[1].encode('utf-8'))]
+
+    message = get_sent_message()
+    assert type(message) == tm11.PollRequest
+
+
+@responses.activate
+def test_poll_raw_with_fulfilment():
+
+    register_poll_parts(total_parts=3)
+
+    client = create_client_11()
+    blocks = list(client.poll_raw(POLL_COLLECTION, uri=POLL_PATH))
+
+    assert [content.decode('utf-8') for _, _, content in blocks] == [
+        'Content Block {}'.format(part) for part in range(1, 4)]
+
+    message = get_sent_message()
+    assert type(message) == tm11.PollFulfillmentRequest
+    assert message.result_part_number == 3
+
+
+@responses.activate
+def test_poll_incremental():
+
+    register_uri(POLL_URI, POLL_RESPONSE)
+
+    client = create_client_11()
+    store = checkpoints.MemoryCheckpointStore()
+    key = (POLL_URI, POLL_COLLECTION, '')
+
+    batches = client.poll_incremental(
+        POLL_COLLECTION, store, size=1, uri=POLL_PATH)
+
+    next(batches)
+    # First batch is not acknowledged yet
+    assert store.get(key) is None
+
+    next(batches)
+    # Checkpoint advances only when the whole result is acknowledged
+    assert store.get(key) is None
+
+    with pytest.raises(StopIteration):
+        next(batches)
+    assert store.get(key).isoformat() == '2015-01-25T15:28:49.947928+00:00'
+
+    list(client.poll_incremental(POLL_COLLECTION, store, uri=POLL_PATH))
+
+    message = get_sent_message()
+    assert message.exclusive_begin_timestamp_label == store.get(key)
+
+
+@pytest.mark.parametrize('hours', [
+    # Blocks share the highest timestamp label
+    [1, 2, 2, 2],
+    # Blocks are not ordered by timestamp label
+    [2, 1, 3, 1],
+])
+@responses.activate
+def test_poll_incremental_crash_loses_nothing(hours):
+    begin = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+    timestamps = [begin + timedelta(hours=h) for h in hours]
+
+    def poll_callback(request):
+        message = tm11.get_message_from_xml(request.body)
+        window_begin = message.exclusive_begin_timestamp_label
+        response = tm11.PollResponse(
+            message_id='1',
+            in_response_to=message.message_id,
+            collection_name=message.collection_name,
+            inclusive_end_timestamp_label=max(timestamps),
+            more=False,
+            result_part_number=1)
+        for index, timestamp in enumerate(timestamps):
+            if window_begin is None or timestamp > window_begin:
+                response.content_blocks.append(tm11.ContentBlock(
+                    CONTENT_BINDING, 'Block {}'.format(index),
+                    timestamp_label=timestamp))
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING},
+                response.to_xml())
+
+    responses.add_callback(
+        responses.POST, POLL_URI,
+        callback=poll_callback,
+        content_type='application/xml')
+
+    client = create_client_11()
+    store = checkpoints.MemoryCheckpointStore()
+
+    def contents(batch):
+        return [block.content.decode('utf-8') for block in batch]
+
+    batches = client.poll_incremental(
+        POLL_COLLECTION, store, size=2, uri=POLL_PATH)
+    acknowledged = contents(next(batches))
+    next(batches)
+    # Crash while processing the second batch
+    batches.close()
+
+    batches = client.poll_incremental(
+        POLL_COLLECTION, store, size=2, uri=POLL_PATH)
+    polled_again = [block for batch in batches for block in contents(batch)]
+
+    expected = ['Block {}'.format(index) for index in range(len(hours))]
+    assert set(acknowledged + polled_again) == set(expected)
+
+    # Nothing is polled again once the result was acknowledged
+    assert list(client.poll_incremental(
+        POLL_COLLECTION, store, uri=POLL_PATH)) == []
+
+
+@responses.activate
+def test_poll_incremental_resumes_fulfilment():
+
+    requested_parts = register_poll_parts(total_parts=5)
+
+    client = create_client_11()
+    store = checkpoints.MemoryCheckpointStore()
+    key = (POLL_URI, POLL_COLLECTION, '')
+
+    batches = client.poll_incremental(
+        POLL_COLLECTION, store, size=1, uri=POLL_PATH)
+    for _ in range(3):
+        next(batches)
+    batches.close()
+
+    # Third part is not acknowledged
+    assert store.get_fulfilment(key) == ('1', 2)
+
+    batches = client.poll_incremental(POLL_COLLECTION, store, uri=POLL_PATH)
+    blocks = [block for batch in batches for block in batch]
+
+    assert [b.content.decode('utf-8') for b in blocks] == [
+        'Content Block {}'.format(part) for part in range(3, 6)]
+    assert requested_parts == [1, 2, 3, 3, 4, 5]
+    assert store.get_fulfilment(key) is None
+
+
+@responses.activate
+def test_poll_incremental_restarts_expired_result():
+
+    def poll_callback(request):
+        message = tm11.get_message_from_xml(request.body)
+        if isinstance(message, tm11.PollFulfillmentRequest):
+            body = tm11.StatusMessage(
+                message_id='1', in_response_to=message.message_id,
+                status_type=ST_NOT_FOUND).to_xml()
+        else:
+            body = POLL_RESPONSE
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING}, body)
+
+    responses.add_callback(
+        responses.POST, POLL_URI,
+        callback=poll_callback,
+        content_type='application/xml')
+
+    client = create_client_11()
+    store = checkpoints.MemoryCheckpointStore()
+    key = (POLL_URI, POLL_COLLECTION, '')
+    store.set_fulfilment(key, 'expired', 3)
+
+    batches = client.poll_incremental(POLL_COLLECTION, store, uri=POLL_PATH)
+
+    assert len([block for batch in batches for block in batch]) == 2
+    assert store.get_fulfilment(key) is None
+
+    messages = [
+        tm11.get_message_from_xml(call.request.body)
+        for call in responses.calls]
+    assert [type(m) for m in messages] == [
+        tm11.PollFulfillmentRequest, tm11.PollRequest]
+    assert messages[0].result_part_number == 4
+
+
+@responses.activate
+def test_poll_adaptive():
+    begin = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+    end = begin + timedelta(days=8)
+
+    # Most of the content is in the first day
+    timestamps = [begin + timedelta(hours=h) for h in range(1, 8)]
+    timestamps += [begin + timedelta(days=d) for d in range(2, 9, 3)]
+
+    polled_windows = []
+
+    def poll_callback(request):
+        message = tm11.get_message_from_xml(request.body)
+        window_begin = message.exclusive_begin_timestamp_label
+        window_end = message.inclusive_end_timestamp_label
+        in_window = [
+            t for t in timestamps if window_begin < t <= window_end]
+
+        response = tm11.PollResponse(
+            message_id='1',
+            in_response_to=message.message_id,
+            collection_name=message.collection_name,
+            more=False,
+            result_part_number=1)
+
+        if message.poll_parameters.response_type == RT_COUNT_ONLY:
+            response.record_count = tm11.RecordCount(len(in_window))
+        else:
+            polled_windows.append((window_begin, window_end))
+            response.content_blocks = [
+                tm11.ContentBlock(
+                    content_binding=tm11.ContentBinding(CB_STIX_XML_111),
+                    content=t.isoformat(),
+                    timestamp_label=t)
+                for t in reversed(in_window)]
+
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING},
+                response.to_xml())
+
+    responses.add_callback(
+        responses.POST, POLL_URI,
+        callback=poll_callback,
+        content_type='application/xml')
+
+    client = create_client_11()
+
+    windows = client.plan_poll_windows(
+        POLL_COLLECTION, begin, end, max_count=3, uri=POLL_PATH)
+
+    assert [(b - begin, e - begin) for b, e in windows] == [
+        (timedelta(0), timedelta(hours=3)),
+        (timedelta(hours=3), timedelta(hours=6)),
+        (timedelta(hours=6), timedelta(hours=12)),
+        (timedelta(hours=12), timedelta(days=1)),
+        (timedelta(days=1), timedelta(days=2)),
+        (timedelta(days=2), timedelta(days=4)),
+        (timedelta(days=4), timedelta(days=8)),
+    ]
+
+    blocks = list(client.poll_adaptive(
+        POLL_COLLECTION, begin, end, max_count=3, workers=3, uri=POLL_PATH))
+
+    assert sorted(polled_windows) == windows
+    assert [b.timestamp for b in blocks] == timestamps
+
+
+def test_plan_poll_windows_validation():
+    client = create_client_11()
+    begin = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+
+    with pytest.raises(ValueError):
+        client.plan_poll_windows(
+            POLL_COLLECTION, begin, begin, uri=POLL_PATH)
+
+    with pytest.raises(ValueError):
+        client.plan_poll_windows(
+            POLL_COLLECTION, begin, max_count=0, uri=POLL_PATH)
+
+
+@responses.activate
+def test_poll_batches():
+
+    register_poll_parts(total_parts=5)
+
+    client = create_client_11()
+    batches = list(client.poll_batches(
+        POLL_COLLECTION, size=2, uri=POLL_PATH))
+
+    assert [[b.content.decode('utf-8') for b in batch]
+            for batch in batches] == [
+        ['Content Block 1', 'Content Block 2'],
+        ['Content Block 3', 'Content Block 4'],
+        ['Content Block 5']]
+
+
+@pytest.mark.parametrize('prefetch', [None, 1, 3, 10])
+@responses.activate
+def test_poll_with_prefetch(prefetch):
+
+    requested_parts = register_poll_parts(total_parts=6)
+
+    client = create_client_11()
+
+    blocks = list(client.poll(POLL_COLLECTION, uri=POLL_PATH,
+                              prefetch=prefetch))
+
+    assert [b.content.decode('utf-8') for b in blocks] == [
+        'Content Block {}'.format(part) for part in range(1, 7)]
+    # Parts past the last one are never requested
+    assert sorted(requested_parts) == list(range(1, 7))
+
+
+@pytest.mark.parametrize('record_count', [None, 6])
+@responses.activate
+def test_poll_prefetch_requests_known_parts(record_count):
+    requested_parts = register_poll_parts(
+        total_parts=6, record_count=record_count)
+
+    client = create_client_11()
+    gen = client.poll(POLL_COLLECTION, uri=POLL_PATH, prefetch=3)
+
+    next(gen)
+    next(gen)
+    time.sleep(0.1)
+
+    if record_count is None:
+        # Only the part after one with more flag is known to exist
+        assert sorted(requested_parts) == [1, 2, 3]
+    else:
+        # Record count of one block per part tells there are 6 parts
+        assert sorted(requested_parts) == [1, 2, 3, 4, 5]
+
+    assert len(list(gen)) == 4
+    assert sorted(requested_parts) == list(range(1, 7))
+
+
+@responses.activate
+def test_poll_prefetch_close_does_not_wait():
+    register_poll_parts(total_parts=6, record_count=6, delay=0.5)
+
+    client = create_client_11()
+    gen = client.poll(POLL_COLLECTION, uri=POLL_PATH, prefetch=3)
+    next(gen)
+    next(gen)
+
+    started = time.time()
+    gen.close()
+    assert time.time() - started < 0.3
+
+    # Let requests already in flight finish before the mock is reset
+    time.sleep(1)
+
+
 @responses.activate
 def test_poll_with_content_bindings():
 
@@ -449,3 +952,170 @@ def test_push_with_destination():
     assert binding == CONTENT_BINDING
 
     assert message.destination_collection_names == dest_collections
+
+
+@responses.activate
+def test_push_many():
+    messages = []
+
+    def inbox_callback(request):
+        message = tm11.get_message_from_xml(request.body)
+        messages.append(message)
+        # Second message is rejected
+        status_type = 'FAILURE' if len(messages) == 2 else 'SUCCESS'
+        body = tm11.StatusMessage(
+            message_id='1', in_response_to=message.message_id,
+            status_type=status_type, message='Status').to_xml()
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING}, body)
+
+    responses.add_callback(
+        responses.POST, INBOX_URI,
+        callback=inbox_callback,
+        content_type='application/xml')
+
+    blocks = [
+        ('a' * 10, CONTENT_BINDING),
+        ('b' * 10, CONTENT_BINDING),
+        ('c' * 10, CONTENT_BINDING),
+        ('d' * 30, CONTENT_BINDING),
+        entities.ContentBlock(
+            b'e', entities.ContentBinding(CONTENT_BINDING, ['subtype']),
+            timestamp=None),
+    ]
+
+    client = create_client_11()
+    statuses = client.push_many(
+        iter(blocks), collection_names=[POLL_COLLECTION],
+        max_blocks=2, max_bytes=25, uri=INBOX_URI)
+
+    assert [len(m.content_blocks) for m in messages] == [2, 1, 1, 1]
+    assert [
+        b.content for m in messages for b in m.content_blocks] == [
+        'a' * 10, 'b' * 10, 'c' * 10, 'd' * 30, 'e']
+    assert all(
+        m.destination_collection_names == [POLL_COLLECTION]
+        for m in messages)
+    assert messages[-1].content_blocks[0].content_binding.subtype_ids == [
+        'subtype']
+
+    assert [s.message_id for s in statuses] == [
+        m.message_id for m in messages]
+    assert [s.blocks for s in statuses] == [2, 1, 1, 1]
+    assert [s.success for s in statuses] == [True, False, True, True]
+    assert statuses[1].status == 'FAILURE'
+    assert statuses[1].message == 'Status'
+    assert isinstance(statuses[1].raw, tm11.StatusMessage)
+
+
+@responses.activate
+def test_push_many_reports_undecodable_content():
+    messages = []
+
+    def inbox_callback(request):
+        messages.append(tm11.get_message_from_xml(request.body))
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING}, INBOX_RESPONSE)
+
+    responses.add_callback(
+        responses.POST, INBOX_URI,
+        callback=inbox_callback,
+        content_type='application/xml')
+
+    blocks = [
+        ('a', CONTENT_BINDING),
+        (b'\xff', CONTENT_BINDING),
+        ('c', CONTENT_BINDING),
+    ]
+
+    client = create_client_11()
+    statuses = client.push_many(blocks, max_blocks=1, uri=INBOX_URI)
+
+    assert [m.content_blocks[0].content for m in messages] == ['a', 'c']
+    assert [s.success for s in statuses] == [True, False, True]
+    assert statuses[1].blocks == 1
+    assert statuses[1].status is None
+    assert isinstance(statuses[1].error, UnicodeDecodeError)
+
+
+@responses.activate
+def test_push_stream():
+    requests = []
+
+    def inbox_callback(request):
+        requests.append(request)
+        body = b''.join(request.body)
+        requests.append(tm11.get_message_from_xml(body))
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING}, INBOX_RESPONSE)
+
+    responses.add_callback(
+        responses.POST, INBOX_URI,
+        callback=inbox_callback,
+        content_type='application/xml')
+
+    blocks = (
+        ('<some:Content xmlns:some="urn:some">{}</some:Content>'.format(i),
+         CONTENT_BINDING)
+        for i in range(3))
+
+    client = create_client_11()
+    client.push_stream(
+        blocks, collection_names=[POLL_COLLECTION], uri=INBOX_URI)
+
+    request, message = requests
+    assert request.headers['Transfer-Encoding'] == 'chunked'
+
+    assert type(message) == tm11.InboxMessage
+    assert message.destination_collection_names == [POLL_COLLECTION]
+    assert [
+        etree.fromstring(b.content).text
+        for b in message.content_blocks] == ['0', '1', '2']
+    assert message.content_blocks[0].content_binding.binding_id == (
+        CONTENT_BINDING)
+
+
+@responses.activate
+def test_push_compressed():
+    requests = []
+
+    def inbox_callback(request):
+        body = request.body
+        if not isinstance(body, bytes):
+            body = b''.join(body)
+        requests.append((request.headers.get('Content-Encoding'), body))
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING}, INBOX_RESPONSE)
+
+    responses.add_callback(
+        responses.POST, INBOX_URI,
+        callback=inbox_callback,
+        content_type='application/xml')
+
+    client = create_client_11()
+    client.compress_requests = True
+    client.compression_threshold = 1000
+
+    client.push(CONTENT, CONTENT_BINDING, uri=INBOX_URI)
+
+    large = '<some:Content xmlns:some="urn:some">{}</some:Content>'.format(
+        'x' * 1000)
+    client.push(large, CONTENT_BINDING, uri=INBOX_URI)
+    client.push_stream(
+        iter([(large, CONTENT_BINDING)] * 3), uri=INBOX_URI)
+
+    (small_encoding, _), (encoding, body), (stream_encoding, stream_body) = (
+        requests)
+    assert small_encoding is None
+
+    assert encoding == 'gzip'
+    message = tm11.get_message_from_xml(gzip.decompress(body))
+    assert etree.fromstring(message.content_blocks[0].content).text == (
+        'x' * 1000)
+
+    assert stream_encoding == 'gzip'
+    message = tm11.get_message_from_xml(gzip.decompress(stream_body))
+    assert len(message.content_blocks) == 3
+
+
+def test_push_many_validation():
+    client = create_client_11()
+
+    with pytest.raises(ValueError):
+        client.push_many([], max_blocks=None, uri=INBOX_URI)
@@ -3,19 +3,25 @@ import pytest
 import json
 import gzip
 import sys
+import threading
 import requests
+from datetime import datetime, timedelta
 from time import sleep
 
+import pytz
+
 from six import StringIO
 
 from libtaxii import messages_11 as tm11
 from libtaxii import messages_10 as tm10
 from libtaxii.constants import (
-    VID_TAXII_XML_11, VID_TAXII_XML_10,
+    VID_TAXII_XML_11, VID_TAXII_XML_10, CB_STIX_XML_111,
 )
 
 from cabby import create_client
 from cabby import exceptions as exc
+from cabby import entities
+from cabby.utils import split_time_window, batch_content_blocks
 
 import fixtures11
 import fixtures10
@@ -66,6 +72,37 @@ def get_sent_message(version, mock=None):
     return (tm11 if version == 11 else tm10).get_message_from_xml(body)
 
 
+def make_poll_response(version, request, timestamps):
+    tm = tm11 if version == 11 else tm10
+
+    blocks = []
+    for timestamp in timestamps:
+        binding = (tm11.ContentBinding('urn:stix.mitre.org:xml:1.1.1')
+                   if version == 11 else 'urn:stix.mitre.org:xml:1.1.1')
+        blocks.append(tm.ContentBlock(
+            content_binding=binding,
+            content=timestamp.isoformat(),
+            timestamp_label=timestamp))
+
+    if version == 11:
+        response = tm11.PollResponse(
+            message_id='1',
+            in_response_to=request.message_id,
+            collection_name=request.collection_name,
+            more=False,
+            result_part_number=1,
+            content_blocks=blocks)
+    else:
+        response = tm10.PollResponse(
+            message_id='1',
+            in_response_to=request.message_id,
+            feed_name=request.feed_name,
+            inclusive_end_timestamp_label=request.inclusive_end_timestamp_label,
+            content_blocks=blocks)
+
+    return response.to_xml()
+
+
 # Tests
 
 
@@ -331,3 +368,205 @@ def test_jwt_token_when_set_directly(version):
         )
     )
     list(client.poll(collection_name="X", uri="/poll"))
+
+
+@pytest.mark.parametrize("version", [11, 10])
+@responses.activate
+def test_session_reused_between_requests(version):
+    uri = get_fix(version).DISCOVERY_URI_HTTP
+    register_uri(uri, get_fix(version).DISCOVERY_RESPONSE, version)
+
+    client = make_client(version, pool_connections=2, pool_maxsize=4)
+
+    client.discover_services(uri=uri)
+    session = client._get_session()
+    client.discover_services(uri=uri)
+
+    assert client._get_session() is session
+    adapter = session.get_adapter(uri)
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 4
+
+
+@pytest.mark.parametrize("version", [11, 10])
+@responses.activate
+def test_session_headers_not_modified_by_requests(version):
+    uri = get_fix(version).DISCOVERY_URI_HTTP
+    register_uri(uri, get_fix(version).DISCOVERY_RESPONSE, version)
+
+    client = make_client(version)
+    session = client._get_session()
+    session_headers = dict(session.headers)
+
+    client.discover_services(uri=uri)
+
+    assert dict(session.headers) == session_headers
+
+    request = responses.calls[-1].request
+    assert request.headers['X-TAXII-Content-Type'] == client.taxii_binding
+
+
+@pytest.mark.parametrize("version", [11, 10])
+@responses.activate
+def test_session_rebuilt_on_settings_change(version):
+    uri = get_fix(version).DISCOVERY_URI_HTTP
+    register_uri(uri, get_fix(version).DISCOVERY_RESPONSE, version)
+
+    client = make_client(version)
+    client.discover_services(uri=uri)
+    session = client._get_session()
+
+    client.set_auth(username='user', password='pass')
+    assert client._get_session() is not session
+
+    session = client._get_session()
+    client.set_proxies({'https': 'http://proxy.localhost:3128'})
+    assert client._get_session() is not session
+
+    session = client._get_session()
+    client.headers[CUSTOM_HEADER_NAME] = CUSTOM_HEADER_VALUE
+    assert client._get_session() is not session
+
+
+@pytest.mark.parametrize("version", [11, 10])
+@responses.activate
+def test_close_session(version):
+    uri = get_fix(version).DISCOVERY_URI_HTTP
+    register_uri(uri, get_fix(version).DISCOVERY_RESPONSE, version)
+
+    with make_client(version) as client:
+        client.discover_services(uri=uri)
+        session = client._get_session()
+
+    assert client._session is None
+
+    services = client.discover_services(uri=uri)
+    assert len(services) == 4
+    assert client._get_session() is not session
+
+
+@pytest.mark.parametrize("version", [11, 10])
+def test_session_created_once_by_concurrent_threads(version):
+    client = make_client(version)
+    prepare = client.prepare_generic_session
+    created = []
+
+    def slow_prepare():
+        sleep(0.01)
+        session = prepare()
+        created.append(session)
+        return session
+
+    client.prepare_generic_session = slow_prepare
+
+    sessions = []
+    threads = [
+        threading.Thread(target=lambda: sessions.append(client._get_session()))
+        for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(session is created[0] for session in sessions)
+
+
+def test_split_time_window():
+    begin = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+    end = datetime(2020, 1, 5, tzinfo=pytz.UTC)
+
+    windows = split_time_window(begin, end, 4)
+
+    assert windows == [
+        (begin, begin + timedelta(days=1)),
+        (begin + timedelta(days=1), begin + timedelta(days=2)),
+        (begin + timedelta(days=2), begin + timedelta(days=3)),
+        (begin + timedelta(days=3), end),
+    ]
+
+    with pytest.raises(ValueError):
+        split_time_window(end, begin, 4)
+
+    with pytest.raises(ValueError):
+        split_time_window(begin, end, 0)
+
+
+@pytest.mark.parametrize("size, max_bytes, expected", [
+    (2, None, [[1, 2], [3, 4], [5]]),
+    (None, 5, [[1, 2], [3], [4], [5]]),
+    (2, 7, [[1, 2], [3, 4], [5]]),
+    (None, 1, [[1], [2], [3], [4], [5]]),
+])
+def test_batch_content_blocks(size, max_bytes, expected):
+    blocks = [
+        entities.ContentBlock(b'x' * length, None, None)
+        for length in range(1, 6)]
+
+    batches = batch_content_blocks(blocks, size=size, max_bytes=max_bytes)
+
+    assert [[len(b.content) for b in batch] for batch in batches] == expected
+
+
+def test_batch_content_blocks_measures_bytes():
+    # Three characters, six bytes in UTF-8
+    blocks = [
+        entities.ContentBlock(u'\u00e9\u00e9\u00e9', None, None),
+        tm11.ContentBlock(CB_STIX_XML_111, u'<a>\u00e9\u00e9</a>'),
+    ]
+
+    xml_size = len(blocks[1].content)
+
+    batches = batch_content_blocks(blocks, max_bytes=6 + xml_size - 1)
+    assert [len(batch) for batch in batches] == [1, 1]
+
+    batches = batch_content_blocks(blocks, max_bytes=6 + xml_size)
+    assert [len(batch) for batch in batches] == [2]
+
+
+def test_batch_content_blocks_validation():
+    with pytest.raises(ValueError):
+        batch_content_blocks([], size=None, max_bytes=None)
+
+    with pytest.raises(ValueError):
+        batch_content_blocks([], size=0)
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+@pytest.mark.parametrize("version", [11, 10])
+@responses.activate
+def test_poll_sharded(version, ordered):
+    windows = []
+
+    def poll_callback(request):
+        tm = tm11 if version == 11 else tm10
+        message = tm.get_message_from_xml(request.body)
+        begin = message.exclusive_begin_timestamp_label
+        end = message.inclusive_end_timestamp_label
+        windows.append((begin, end))
+
+        # Blocks in a window are returned in reverse order
+        middle = begin + (end - begin) / 2
+        body = make_poll_response(version, message, [end, middle])
+        return (200, make_taxii_headers(version), body)
+
+    responses.add_callback(
+        responses.POST, "http://example.localhost/poll",
+        callback=poll_callback)
+
+    begin = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+    end = datetime(2020, 1, 9, tzinfo=pytz.UTC)
+
+    client = make_client(version)
+    blocks = list(client.poll_sharded(
+        "X", begin, end, shards=8, workers=3, ordered=ordered, uri="/poll"))
+
+    assert sorted(windows) == split_time_window(begin, end, 8)
+
+    timestamps = [block.timestamp for block in blocks]
+    assert len(timestamps) == 16
+    assert sorted(timestamps) == sorted(
+        [w[1] for w in windows] + [w[0] + (w[1] - w[0]) / 2 for w in windows])
+
+    if ordered:
+        assert timestamps == sorted(timestamps)
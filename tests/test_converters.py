@@ -0,0 +1,113 @@
+import pytest
+
+from lxml import etree
+
+from cabby import converters
+from cabby.constants import TAXII_10_NS, TAXII_11_NS
+
+
+BLOCK_11 = '''
+<taxii_11:Content_Block xmlns:taxii_11="{ns}">
+    <taxii_11:Content_Binding binding_id="urn:stix.mitre.org:xml:1.1.1">
+        <taxii_11:Subtype subtype_id="subtype-a"/>
+        <taxii_11:Subtype subtype_id="subtype-b"/>
+    </taxii_11:Content_Binding>
+    <taxii_11:Content>{content}</taxii_11:Content>
+    <taxii_11:Timestamp_Label>2015-01-22T15:28:49.947928+00:00</taxii_11:Timestamp_Label>
+    <taxii_11:Padding>padding</taxii_11:Padding>
+</taxii_11:Content_Block>
+'''
+
+BLOCK_10 = '''
+<taxii:Content_Block xmlns:taxii="{ns}">
+    <taxii:Content_Binding>urn:stix.mitre.org:xml:1.0</taxii:Content_Binding>
+    <taxii:Content>{content}</taxii:Content>
+</taxii:Content_Block>
+'''
+
+XML_CONTENT = '<stix:STIX_Package xmlns:stix="http://stix.mitre.org/stix-1" id="example:package-1"><stix:Indicators/></stix:STIX_Package>\n'  # noqa
+
+
+@pytest.mark.parametrize('template, namespace', [
+    (BLOCK_11, TAXII_11_NS),
+    (BLOCK_10, TAXII_10_NS),
+])
+@pytest.mark.parametrize('content', ['Some text content', XML_CONTENT])
+def test_extract_content_block_entity(template, namespace, content):
+    elem = etree.fromstring(template.format(ns=namespace, content=content))
+
+    expected = converters.to_content_block_entity_from_etree(namespace, elem)
+    block = converters.extract_content_block_entity(namespace, elem)
+
+    assert block.content == expected.content
+    assert block.binding.id == expected.binding.id
+    assert block.binding.subtypes == expected.binding.subtypes
+    assert block.timestamp == expected.timestamp
+    assert block.raw is None
+
+
+def test_extract_content_block_entity_malformed():
+    elem = etree.fromstring(
+        '<taxii_11:Content_Block xmlns:taxii_11="{}"/>'.format(TAXII_11_NS))
+
+    with pytest.raises(ValueError):
+        converters.extract_content_block_entity(TAXII_11_NS, elem)
+
+
+@pytest.mark.parametrize('template, namespace', [
+    (BLOCK_11, TAXII_11_NS),
+    (BLOCK_10, TAXII_10_NS),
+])
+@pytest.mark.parametrize('content', ['Some text content', XML_CONTENT])
+def test_to_lazy_content_block_entity(template, namespace, content):
+    elem = etree.fromstring(template.format(ns=namespace, content=content))
+
+    expected = converters.to_content_block_entity_from_etree(namespace, elem)
+    block = converters.to_lazy_content_block_entity(namespace, elem)
+    elem.clear()
+
+    assert block.binding.id == expected.binding.id
+    assert block.binding.subtypes == expected.binding.subtypes
+    assert block.timestamp == expected.timestamp
+    assert 'content' not in vars(block)
+
+    assert block.content == expected.content
+    assert block.raw.to_xml() == expected.raw.to_xml()
+
+
+def test_to_lazy_content_block_entity_without_raw():
+    elem = etree.fromstring(
+        BLOCK_11.format(ns=TAXII_11_NS, content=XML_CONTENT))
+
+    expected = converters.to_content_block_entity_from_etree(
+        TAXII_11_NS, elem)
+    block = converters.to_lazy_content_block_entity(
+        TAXII_11_NS, elem, keep_raw=False)
+
+    assert block.raw is None
+    assert block.content == expected.content
+
+
+@pytest.mark.parametrize('template, namespace', [
+    (BLOCK_11, TAXII_11_NS),
+    (BLOCK_10, TAXII_10_NS),
+])
+@pytest.mark.parametrize('content', ['Some text content', XML_CONTENT])
+def test_extract_raw_content_block(template, namespace, content):
+    elem = etree.fromstring(template.format(ns=namespace, content=content))
+
+    expected = converters.extract_content_block_entity(namespace, elem)
+    binding_id, timestamp, content = converters.extract_raw_content_block(
+        namespace, elem)
+
+    assert binding_id == expected.binding.id
+    assert content == expected.content
+    if expected.timestamp:
+        assert timestamp == expected.timestamp.isoformat()
+    else:
+        assert timestamp is None
+
+
+def test_unknown_content_block_parser():
+    with pytest.raises(ValueError):
+        converters.get_content_block_parser('unknown')
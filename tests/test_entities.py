@@ -1,4 +1,7 @@
+import pickle
+
 import pytest
+from libtaxii.common import parse_datetime_string
 
 from cabby import entities
 
@@ -64,3 +67,93 @@ from cabby import entities
 ])
 def test_repr(obj, expected):
     assert repr(obj) == expected
+
+
+@pytest.mark.parametrize('protocol', range(pickle.HIGHEST_PROTOCOL + 1))
+def test_pickle(protocol):
+    block = entities.ContentBlock(
+        content=b'content',
+        content_binding=entities.ContentBinding('binding', ['subtype']),
+        timestamp=123)
+    block.raw = 'raw'
+
+    restored = pickle.loads(pickle.dumps(block, protocol))
+
+    assert restored.content == b'content'
+    assert restored.binding.subtypes == ['subtype']
+    assert restored.binding.raw is None
+    assert restored.raw == 'raw'
+    assert restored.timestamp == 123
+
+
+@pytest.mark.parametrize('protocol', range(pickle.HIGHEST_PROTOCOL + 1))
+def test_pickle_with_attributes(protocol):
+    block = entities.ContentBlock.with_attributes()(
+        content=b'content',
+        content_binding=entities.ContentBinding('binding'),
+        timestamp=123)
+    block.source = 'feed'
+
+    restored = pickle.loads(pickle.dumps(block, protocol))
+
+    assert type(restored) is entities.ContentBlock.with_attributes()
+    assert restored.source == 'feed'
+    assert restored.content == b'content'
+    assert restored.timestamp == 123
+
+
+def test_arbitrary_attributes():
+    binding = entities.ContentBinding('binding')
+    assert not hasattr(binding, '__dict__')
+    with pytest.raises(AttributeError):
+        binding.note = 'note'
+
+    cls = entities.ContentBinding.with_attributes()
+    assert cls is entities.ContentBinding.with_attributes()
+    assert issubclass(cls, entities.ContentBinding)
+
+    binding = cls('binding')
+    binding.note = 'note'
+    assert binding.note == 'note'
+    assert 'note' not in binding._asdict()
+    assert binding == entities.ContentBinding('binding')
+
+    with pytest.raises(AttributeError):
+        binding.missing
+
+
+def test_content_binding_equality():
+    binding = entities.ContentBinding('binding', ['subtype'])
+
+    assert binding == entities.ContentBinding('binding', ['subtype'])
+    assert binding != entities.ContentBinding('binding')
+    assert binding != entities.ContentBinding('other', ['subtype'])
+    assert binding != 'binding'
+
+    assert len({binding, entities.ContentBinding('binding', ['subtype'])}) == 1
+
+
+@pytest.mark.parametrize('label', [
+    '2015-01-22T15:28:49.947928+00:00',
+    '2015-01-22T15:28:49Z',
+    '2015-01-22T15:28:49.9-05:30',
+    '2015-01-22T15:28:49',
+    '2015-01-22T15:28:49.1234567Z',
+    '2015-01-22',
+])
+def test_parse_timestamp_label(label):
+    expected = parse_datetime_string(label)
+    timestamp = entities.parse_timestamp_label(label)
+
+    assert timestamp == expected
+    assert timestamp.utcoffset() == expected.utcoffset()
+
+
+def test_content_block_deferred_timestamp():
+    block = entities.ContentBlock(
+        content=b'content', content_binding=None, timestamp=None,
+        timestamp_label='2015-01-22T15:28:49Z')
+
+    assert block._timestamp is None
+    assert block.timestamp.isoformat() == '2015-01-22T15:28:49+00:00'
+    assert block.timestamp is block.timestamp
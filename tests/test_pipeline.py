@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+import responses
+
+from six.moves import queue
+from libtaxii import messages_11 as tm11
+
+from cabby import create_client
+from cabby.constants import XML_11_BINDING, CB_STIX_XML_111
+from cabby.pipeline import PushPipeline
+
+from fixtures11 import HOST, INBOX_URI, INBOX_RESPONSE, POLL_COLLECTION
+
+
+def register_slow_inbox(messages, delay=0.05, failing=()):
+    lock = threading.Lock()
+    running = [0]
+
+    def inbox_callback(request):
+        message = tm11.get_message_from_xml(request.body)
+        with lock:
+            running[0] += 1
+            messages.append((message, running[0]))
+        time.sleep(delay)
+        with lock:
+            running[0] -= 1
+        if message.content_blocks[0].content in failing:
+            return (500, {}, '')
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING}, INBOX_RESPONSE)
+
+    responses.add_callback(
+        responses.POST, INBOX_URI,
+        callback=inbox_callback,
+        content_type='application/xml')
+
+
+@responses.activate
+def test_push_pipeline():
+    messages = []
+    register_slow_inbox(messages, failing=['block-4'])
+
+    client = create_client(HOST, pool_maxsize=4)
+
+    with PushPipeline(client, collection_names=[POLL_COLLECTION],
+                      max_blocks=2, workers=4, uri=INBOX_URI) as pipeline:
+        for index in range(20):
+            pipeline.put('block-{}'.format(index), CB_STIX_XML_111)
+
+    statuses = pipeline.statuses
+
+    assert len(messages) == 10
+    assert max(running for _, running in messages) > 1
+    assert max(running for _, running in messages) <= 4
+    assert all(
+        m.destination_collection_names == [POLL_COLLECTION]
+        for m, _ in messages)
+
+    # Statuses are in the order of messages
+    assert [s.blocks for s in statuses] == [2] * 10
+    assert [s.success for s in statuses] == [
+        True, True, False, True, True, True, True, True, True, True]
+    assert statuses[2].status is None
+    assert statuses[2].error is not None
+
+    with pytest.raises(ValueError):
+        pipeline.put('late', CB_STIX_XML_111)
+
+
+@responses.activate
+def test_push_pipeline_backpressure():
+    messages = []
+    register_slow_inbox(messages, delay=0.2)
+
+    client = create_client(HOST)
+    pipeline = PushPipeline(
+        client, max_blocks=1, workers=1, queue_size=1, uri=INBOX_URI)
+
+    # Producer waits for the queue to have room
+    for index in range(3):
+        pipeline.put('block-{}'.format(index), CB_STIX_XML_111, timeout=1)
+
+    with pytest.raises(queue.Full):
+        pipeline.put('block-3', CB_STIX_XML_111, timeout=0.01)
+
+    assert len(pipeline.close()) == 3
+
+
+def test_push_pipeline_validation():
+    client = create_client(HOST)
+
+    with pytest.raises(ValueError):
+        PushPipeline(client, workers=0, uri=INBOX_URI)
+
+    with pytest.raises(ValueError):
+        PushPipeline(client, max_blocks=None, uri=INBOX_URI)
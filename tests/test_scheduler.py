@@ -0,0 +1,159 @@
+import io
+import threading
+import time
+
+import pytest
+import responses
+
+from libtaxii import messages_11 as tm11
+
+from cabby import create_client, checkpoints, sinks, Client10
+from cabby.cli.scheduler import create_scheduler
+from cabby.constants import XML_11_BINDING
+from cabby.scheduler import Scheduler
+
+from fixtures11 import (
+    HOST, POLL_PATH, POLL_URI, POLL_RESPONSE)
+
+
+class ListSink(sinks.Sink):
+
+    def __init__(self):
+        self.batches = []
+
+    def write(self, collection_name, blocks):
+        self.batches.append(
+            (collection_name, [block.content for block in blocks]))
+
+
+def register_slow_poll(requests):
+    lock = threading.Lock()
+    running = [0]
+
+    def poll_callback(request):
+        with lock:
+            running[0] += 1
+            requests.append(
+                (tm11.get_message_from_xml(request.body), running[0]))
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return (200, {'X-TAXII-Content-Type': XML_11_BINDING}, POLL_RESPONSE)
+
+    responses.add_callback(
+        responses.POST, POLL_URI,
+        callback=poll_callback,
+        content_type='application/xml')
+
+
+@responses.activate
+def test_scheduler():
+    requests = []
+    register_slow_poll(requests)
+
+    store = checkpoints.MemoryCheckpointStore()
+    sink = ListSink()
+
+    scheduler = Scheduler(store, workers=4, jitter=0.5)
+    scheduler.add_server(
+        'server', create_client(HOST, version='1.1'), max_concurrency=1)
+    for collection in ('a', 'b', 'c'):
+        scheduler.add_job(
+            'server', collection, 0.01, sink, uri=POLL_PATH)
+
+    thread = threading.Thread(target=scheduler.run)
+    thread.start()
+    try:
+        deadline = time.time() + 10
+        while len(requests) < 6 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        scheduler.stop()
+        thread.join()
+
+    # Server polled one collection at a time
+    assert max(running for _, running in requests) == 1
+
+    polled = [message.collection_name for message, _ in requests]
+    assert set(polled[:3]) == {'a', 'b', 'c'}
+
+    # Next polls resume after checkpoints
+    for message, _ in requests[3:]:
+        assert message.exclusive_begin_timestamp_label == store.get(
+            (POLL_URI, message.collection_name, ''))
+
+    assert sink.batches[0][1] == [b'Content Block A', b'Content Block B']
+
+
+def test_scheduler_validation():
+    scheduler = Scheduler()
+
+    with pytest.raises(ValueError):
+        scheduler.add_job('unknown', 'a', 10, ListSink())
+
+    scheduler.add_server('server', create_client(HOST))
+    with pytest.raises(ValueError):
+        scheduler.add_job('server', 'a', 0, ListSink())
+
+    with pytest.raises(ValueError):
+        Scheduler(workers=0)
+
+
+def test_create_scheduler(tmpdir):
+    config = {
+        'workers': 2,
+        'checkpoint': str(tmpdir.join('checkpoints.db')),
+        'sinks': {
+            'files': {'type': 'directory', 'path': str(tmpdir.join('out'))},
+        },
+        'servers': {
+            'example': {
+                'host': HOST,
+                'version': '1.0',
+                'max_concurrency': 2,
+                'username': 'user',
+                'password': 'secret',
+                'collections': [
+                    {'name': 'a', 'interval': 60, 'sink': 'files'},
+                    {'name': 'b', 'interval': 60, 'uri': POLL_PATH},
+                ],
+            },
+        },
+    }
+
+    scheduler, resources = create_scheduler(config)
+
+    assert isinstance(
+        scheduler.checkpoint_store, checkpoints.SQLiteCheckpointStore)
+    assert [str(job) for job in scheduler._jobs] == ['example/a', 'example/b']
+    assert scheduler._jobs[1].poll_params == {'uri': POLL_PATH}
+    assert isinstance(scheduler._jobs[0].sink, sinks.DirectorySink)
+    assert isinstance(scheduler._jobs[1].sink, sinks.StreamSink)
+
+    client = scheduler._jobs[0].server.client
+    assert isinstance(client, Client10)
+    assert client.username == 'user'
+    assert client.pool_maxsize == 2
+    assert client.keep_raw is False
+    assert len(resources) == 3
+
+    config['servers']['example']['collections'][0]['sink'] = 'unknown'
+    with pytest.raises(ValueError):
+        create_scheduler(config)
+
+
+def test_sinks(tmpdir):
+    block = type('Block', (object,), {'content': b'content'})
+
+    stream = io.BytesIO()
+    sink = sinks.create_sink('cabby.sinks:StreamSink', stream=stream)
+    sink.write('collection', [block, block])
+    assert stream.getvalue() == b'content\ncontent\n'
+
+    sink = sinks.create_sink('directory', path=str(tmpdir.join('out')))
+    sink.write('collection a', [block])
+    assert [f.basename for f in tmpdir.join('out').listdir()] == [
+        'collection-a_9a0364b9e99bb480dd25e1f0284c8555']
+
+    with pytest.raises(ValueError):
+        sinks.create_sink('unknown')
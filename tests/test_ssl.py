@@ -1,4 +1,5 @@
 import socket
+import ssl
 import threading
 
 import pytest
@@ -7,11 +8,15 @@ import werkzeug.wrappers
 from six.moves import urllib
 
 import cabby
+from cabby import exceptions as exc
 import fixtures11
 
 
-@pytest.fixture
-def httpsserver(request):
+class KeepAliveRequestHandler(werkzeug.serving.WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+
+def make_server(request, keep_alive=False):
     port = get_free_port()
     server_key = 'tests/ssl_test_files/root_ca.key'
     server_cert = 'tests/ssl_test_files/root_ca.pem'
@@ -19,6 +24,8 @@ def httpsserver(request):
         host='127.0.0.1',
         port=port,
         app=remote_taxii_app,
+        threaded=keep_alive,
+        request_handler=KeepAliveRequestHandler if keep_alive else None,
         passthrough_errors=True,
         ssl_context=(server_cert, server_key))
     server_thread = threading.Thread(target=server.serve_forever)
@@ -27,6 +34,20 @@ def httpsserver(request):
     return server
 
 
+@pytest.fixture
+def httpsserver(request):
+    return make_server(request)
+
+
+@pytest.fixture
+def keepalive_httpsserver(request):
+    del client_ports[:]
+    return make_server(request, keep_alive=True)
+
+
+client_ports = []
+
+
 def get_free_port():
     s = socket.socket()
     s.bind(('', 0))
@@ -37,6 +58,9 @@ def get_free_port():
 
 def remote_taxii_app(env, start_response):
     path = env['PATH_INFO']
+    client_ports.append(env['REMOTE_PORT'])
+    # Consume request body so that kept alive connection can be reused
+    env['wsgi.input'].read(int(env.get('CONTENT_LENGTH') or 0))
 
     if path == '/auth':
         start_response('200 OK',  [('Content-Type', 'application/json')])
@@ -47,8 +71,24 @@ def remote_taxii_app(env, start_response):
             ('Content-Type', 'application/xml'),
             ('X-TAXII-Content-Type', 'urn:taxii.mitre.org:message:xml:1.1'),
         ]
+        body = fixtures11.DISCOVERY_RESPONSE.encode()
+        taxii_headers.append(('Content-Length', str(len(body))))
         start_response('200 OK', taxii_headers)
-        return [fixtures11.DISCOVERY_RESPONSE.encode()]
+        return [body]
+
+    if path == '/truncated':
+        # Connection is closed before the announced body is sent
+        body = fixtures11.INBOX_RESPONSE.encode()
+        start_response('200 OK', [
+            ('Content-Type', 'application/xml'),
+            ('X-TAXII-Content-Type', 'urn:taxii.mitre.org:message:xml:1.1'),
+            ('Content-Length', str(len(body)))])
+        return [body[:len(body) // 2]]
+
+    if path == '/error':
+        start_response('500 Internal Server Error', [
+            ('Content-Type', 'text/plain'), ('Content-Length', '5')])
+        return [b'error']
 
     raise Exception('Unknown test path')
 
@@ -108,3 +148,103 @@ def test_set_auth_ssl(httpsserver):
     client.set_auth(**client_key_without_passphrase)
     services = client.discover_services()
     assert len(services) == 4
+
+
+def test_key_password_connection_reuse(keepalive_httpsserver, monkeypatch):
+    host, port = keepalive_httpsserver.server_address
+    client = cabby.create_client(
+        host=host,
+        port=port,
+        use_https=True,
+        discovery_path=fixtures11.DISCOVERY_PATH)
+
+    client.set_auth(
+        ca_cert='tests/ssl_test_files/root_ca.pem',
+        cert_file='tests/ssl_test_files/client.pem',
+        key_file='tests/ssl_test_files/client.key',
+        key_password='cabby-test',
+        verify_ssl=True)
+
+    contexts = []
+    create_ssl_context = cabby.dispatcher.create_ssl_context
+
+    def counting_create_ssl_context(session):
+        contexts.append(create_ssl_context(session))
+        return contexts[-1]
+
+    monkeypatch.setattr(
+        cabby.dispatcher, 'create_ssl_context', counting_create_ssl_context)
+
+    for _ in range(3):
+        services = client.discover_services()
+        assert len(services) == 4
+
+    # SSL context is created once and the same connection is reused
+    assert len(contexts) == 1
+    assert len(client_ports) == 3
+    assert len(set(client_ports)) == 1
+
+    client.close()
+
+
+def test_key_password_pool_keeps_only_read_connections(keepalive_httpsserver):
+    host, port = keepalive_httpsserver.server_address
+    url = 'https://{}:{}'.format(host, port)
+    key = ('https', host, port)
+
+    transport = cabby.dispatcher.KeyPasswordTransport(maxsize=1)
+    transport.context = ssl.create_default_context(
+        cafile='tests/ssl_test_files/root_ca.pem')
+    transport.context.check_hostname = False
+
+    first = transport.post(url + fixtures11.DISCOVERY_PATH, b'', {})
+    second = transport.post(url + fixtures11.DISCOVERY_PATH, b'', {})
+
+    # Connections with unread responses are not pooled
+    assert not transport._connections.get(key)
+
+    assert second.read()
+    # Releasing another connection over maxsize does not close the
+    # connection still streaming its response
+    third = transport.post(url + fixtures11.DISCOVERY_PATH, b'', {})
+    assert first.read() and third.read()
+
+    pool = transport._connections[key]
+    assert len(pool) == 1
+    conn = pool[0]
+
+    # Connection with unread error body is dropped
+    with pytest.raises(exc.HTTPError):
+        transport.post(url + '/error', b'', {})
+    assert not transport._connections[key]
+    assert conn.sock is None
+
+    transport.close()
+
+
+def test_key_password_push_many_reports_broken_connection(httpsserver):
+    host, port = httpsserver.server_address
+    client = cabby.create_client(
+        host=host,
+        port=port,
+        use_https=True,
+        discovery_path=fixtures11.DISCOVERY_PATH)
+
+    client.set_auth(
+        ca_cert='tests/ssl_test_files/root_ca.pem',
+        cert_file='tests/ssl_test_files/client.pem',
+        key_file='tests/ssl_test_files/client.key',
+        key_password='cabby-test',
+        verify_ssl=True)
+
+    blocks = [('content {}'.format(i), fixtures11.CONTENT_BINDING)
+              for i in range(3)]
+    statuses = client.push_many(blocks, max_blocks=2, uri='/truncated')
+
+    # Failure while the response body is read is reported, not raised
+    assert [s.blocks for s in statuses] == [2, 1]
+    assert not any(s.success for s in statuses)
+    assert all(s.status is None for s in statuses)
+    assert all(s.error is not None for s in statuses)
+
+    client.close()
@@ -0,0 +1,262 @@
+from datetime import datetime, timedelta
+import gzip
+import os
+import tracemalloc
+
+import pytest
+import pytz
+
+from libtaxii import messages_10 as tm10
+from libtaxii import messages_11 as tm11
+
+from cabby import dispatcher
+from cabby.constants import STREAM_MARKER, XML_11_BINDING
+
+from fixtures11 import POLL_RESPONSE, CONTENT_BLOCKS
+
+
+POLL_RESPONSE_START = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<taxii_11:Poll_Response '
+    'xmlns:taxii_11="http://taxii.mitre.org/messages/taxii_xml_binding-1.1" '
+    'message_id="1" in_response_to="1" collection_name="collection" '
+    'more="false" result_part_number="1" attr="quoted > sign">\n'
+    '<taxii_11:Inclusive_End_Timestamp>2015-01-22T15:28:49.931734+00:00'
+    '</taxii_11:Inclusive_End_Timestamp>\n'
+    '<taxii_11:Record_Count partial_count="false">10</taxii_11:Record_Count>'
+    '\n').encode('utf-8')
+
+POLL_RESPONSE_END = (
+    '<taxii_11:Message>Done</taxii_11:Message>\n'
+    '</taxii_11:Poll_Response>\n').encode('utf-8')
+
+# Every block declares prefixed namespaces, as STIX packages do
+CONTENT_BLOCK = (
+    '<taxii_11:Content_Block>'
+    '<taxii_11:Content_Binding binding_id="urn:stix.mitre.org:xml:1.1.1"/>'
+    '<taxii_11:Content>'
+    '<stix:STIX_Package xmlns:stix="http://stix.mitre.org/stix-1" '
+    '{namespaces} id="example:package-{index}">'
+    '<stix:Indicators>{indicators}</stix:Indicators>'
+    '</stix:STIX_Package>'
+    '</taxii_11:Content>'
+    '<taxii_11:Timestamp_Label>2015-01-22T15:28:49.947928+00:00'
+    '</taxii_11:Timestamp_Label>'
+    '</taxii_11:Content_Block>\n')
+
+NAMESPACES = ' '.join(
+    'xmlns:ns{0}="http://example.com/ns{0}"'.format(i) for i in range(20))
+
+INDICATORS = ''.join(
+    '<ns{0}:Indicator ns{0}:id="{0}">text</ns{0}:Indicator>'.format(i)
+    for i in range(20))
+
+
+def make_parser(**kwargs):
+    return dispatcher.ResponseParser(
+        {'X-TAXII-Content-Type': XML_11_BINDING}, version=XML_11_BINDING,
+        **kwargs)
+
+
+def generate_poll_response(blocks, chunk_blocks=100):
+    yield POLL_RESPONSE_START
+    chunk = ''.join(
+        CONTENT_BLOCK.format(
+            index=index, namespaces=NAMESPACES, indicators=INDICATORS)
+        for index in range(chunk_blocks)).encode('utf-8')
+    for _ in range(blocks // chunk_blocks):
+        yield chunk
+    yield POLL_RESPONSE_END
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def parse(chunks, **kwargs):
+    parser = make_parser(**kwargs)
+    objects = []
+    for chunk in chunks:
+        objects.extend(parser.feed(chunk))
+    return objects + parser.close()
+
+
+@pytest.mark.parametrize('restart_interval', [0, 1, 2, 5])
+@pytest.mark.parametrize('chunk_size', [1, 13, 100, 1024 * 1024])
+def test_parser_restarts(restart_interval, chunk_size):
+    body = b''.join(generate_poll_response(10, chunk_blocks=1))
+
+    objects = parse(
+        split(body, chunk_size), restart_interval=restart_interval,
+        cleanup_batch_size=1)
+
+    assert objects[0] == STREAM_MARKER
+    blocks, response = objects[1:-1], objects[-1]
+
+    assert len(blocks) == 10
+    assert all(isinstance(b, tm11.ContentBlock) for b in blocks)
+    assert b'example:package-0' in blocks[0].content
+
+    assert isinstance(response, tm11.PollResponse)
+    assert response.record_count.record_count == 10
+    assert response.inclusive_end_timestamp_label.year == 2015
+    assert response.message == 'Done'
+
+
+def test_parser_restarts_with_closing_tag_in_cdata():
+    content = '<![CDATA[ </taxii_11:Content_Block> ]]>'
+    body = POLL_RESPONSE.replace(CONTENT_BLOCKS[1], content)
+    body = body.encode('utf-8')
+
+    for chunk_size in (1, 7, len(body)):
+        objects = parse(split(body, chunk_size), restart_interval=1)
+
+        assert [type(obj) for obj in objects[1:]] == [
+            tm11.ContentBlock, tm11.ContentBlock, tm11.PollResponse]
+        assert objects[2].content == ' </taxii_11:Content_Block> '
+
+
+def test_serialize_message_stream():
+    consumed = []
+
+    def generate_blocks():
+        for index in range(3):
+            consumed.append(index)
+            yield tm11.ContentBlock(
+                content_binding=tm11.ContentBinding('urn:binding'),
+                content='Content {}'.format(index))
+
+    message = tm11.InboxMessage(message_id='1')
+    chunks = dispatcher.serialize_message_stream(message, generate_blocks())
+
+    next(chunks)
+    next(chunks)
+    # Blocks are serialized one at a time
+    assert consumed == [0]
+
+    body = b''.join(chunks)
+    assert consumed == [0, 1, 2]
+    assert body.endswith(b'</taxii_11:Inbox_Message>')
+
+
+def test_compress_request_body():
+    body, headers = dispatcher.compress_request_body(b'small', threshold=10)
+    assert body == b'small'
+    assert headers == {}
+
+    body, headers = dispatcher.compress_request_body(b'x' * 10, threshold=10)
+    assert headers == {'Content-Encoding': 'gzip'}
+    assert gzip.decompress(body) == b'x' * 10
+
+    body, headers = dispatcher.compress_request_body(
+        iter([b'small', b'body']), threshold=10)
+    assert body == b'smallbody'
+    assert headers == {}
+
+    consumed = []
+
+    def generate_chunks():
+        for index in range(5):
+            consumed.append(index)
+            yield b'chunk'
+
+    body, headers = dispatcher.compress_request_body(
+        generate_chunks(), threshold=10)
+    assert headers == {'Content-Encoding': 'gzip'}
+    # Only the chunks needed to reach the threshold are read
+    assert consumed == [0, 1]
+    assert gzip.decompress(b''.join(body)) == b'chunk' * 5
+
+
+def make_poll_request(message_id, begin_date=None, end_date=None,
+                      subscription_id=None):
+    return tm11.PollRequest(
+        message_id=message_id,
+        collection_name='collection',
+        exclusive_begin_timestamp_label=begin_date,
+        inclusive_end_timestamp_label=end_date,
+        subscription_id=subscription_id,
+        poll_parameters=None if subscription_id else (
+            tm11.PollRequest.PollParameters(
+                content_bindings=[tm11.ContentBinding('urn:binding', ['a'])],
+                response_type='FULL')))
+
+
+def test_request_templates():
+    cache = dispatcher.RequestTemplateCache(size=2)
+    begin = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+
+    requests = [
+        make_poll_request(str(index), begin + timedelta(days=index),
+                          begin + timedelta(days=index + 1))
+        for index in range(3)]
+    requests.append(make_poll_request('3', end_date=begin))
+    requests.append(make_poll_request('4', begin, subscription_id='sub'))
+    requests.extend(
+        tm11.PollFulfillmentRequest(
+            message_id='a&{}'.format(part), collection_name='collection',
+            result_id='result', result_part_number=part)
+        for part in (1, 2))
+    requests.extend(
+        tm10.PollRequest(
+            message_id=str(index), feed_name='collection',
+            exclusive_begin_timestamp_label=begin + timedelta(days=index),
+            content_bindings=['urn:binding'])
+        for index in (1, 2))
+
+    for request in requests:
+        # Serialized compactly, identically to libtaxii
+        assert cache.serialize(request) == request.to_xml()
+
+    assert len(cache._templates) == 2
+
+    request = tm11.DiscoveryRequest(message_id='1')
+    assert cache.serialize(request) == request.to_xml()
+
+
+def test_cleanup_batch_size_validation():
+    with pytest.raises(ValueError):
+        make_parser(cleanup_batch_size=0)
+
+
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'),
+                    reason='RSS is read from /proc')
+def test_constant_memory_streaming():
+    # CABBY_TEST_HUGE_STREAM=1 streams a 5 GB response instead
+    if os.environ.get('CABBY_TEST_HUGE_STREAM'):
+        total_size = 5 * 1024 ** 3
+    else:
+        total_size = 100 * 1024 ** 2
+
+    block_size = len(CONTENT_BLOCK.format(
+        index=0, namespaces=NAMESPACES, indicators=INDICATORS))
+    blocks = total_size // block_size
+
+    parser = make_parser(content_block_factory=lambda namespace, elem: 1)
+    parsed = 0
+
+    tracemalloc.start()
+    try:
+        for index, chunk in enumerate(generate_poll_response(blocks)):
+            parsed += len(parser.feed(chunk))
+
+            if index == 100:
+                rss_before = rss()
+                traced_before, _ = tracemalloc.get_traced_memory()
+
+        rss_growth = rss() - rss_before
+        traced_growth = tracemalloc.get_traced_memory()[0] - traced_before
+    finally:
+        tracemalloc.stop()
+
+    parsed += len(parser.close())
+    # Stream marker and Poll Response included
+    assert parsed == blocks // 100 * 100 + 2
+
+    assert traced_growth < 1024 ** 2
+    assert rss_growth < 10 * 1024 ** 2